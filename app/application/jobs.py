@@ -0,0 +1,330 @@
+# app/application/jobs.py
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from .services import OrchestratorService, OrchestrationCancelled
+import os
+import socket
+import threading
+import uuid
+
+# Execuções do orquestrador rodando ao mesmo tempo e limite de execuções em aberto (na fila + rodando)
+ORCHESTRATOR_MAX_CONCURRENT_JOBS = int(os.getenv("ORCHESTRATOR_MAX_CONCURRENT_JOBS", "2"))
+ORCHESTRATOR_MAX_PENDING_JOBS = int(os.getenv("ORCHESTRATOR_MAX_PENDING_JOBS", "10"))
+# Execuções finalizadas mantidas em memória; as mais antigas continuam consultáveis no banco
+ORCHESTRATOR_JOB_HISTORY = int(os.getenv("ORCHESTRATOR_JOB_HISTORY", "100"))
+# Execuções interrompidas (processo dono encerrado) voltam para a fila; desligado, são marcadas como interrompidas
+ORCHESTRATOR_RESUME_JOBS = os.getenv("ORCHESTRATOR_RESUME_JOBS", "true").lower() == "true"
+# Intervalo do heartbeat das execuções do processo (também a espera por uma vaga e por pedidos de cancelamento)
+ORCHESTRATOR_JOB_HEARTBEAT_SECONDS = float(os.getenv("ORCHESTRATOR_JOB_HEARTBEAT_SECONDS", "5"))
+# Sem heartbeat por esse tempo, a execução é considerada órfã e assumida por outro processo
+ORCHESTRATOR_JOB_STALE_SECONDS = float(os.getenv("ORCHESTRATOR_JOB_STALE_SECONDS", "60"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+UNFINISHED_STATUSES = (QUEUED, RUNNING)
+
+class JobQueueFull(Exception):
+    """Há execuções demais na fila para aceitar uma nova"""
+
+class Job:
+    def __init__(self, job_id: str, params: Dict[str, Any], status: str = QUEUED,
+                 progress: Optional[Dict[str, Any]] = None, error: Optional[str] = None,
+                 created_at: Optional[datetime] = None, updated_at: Optional[datetime] = None):
+        self.job_id = job_id
+        self.params = params
+        self.status = status
+        self.progress = progress
+        self.error = error
+        self.created_at = created_at or datetime.now()
+        self.updated_at = updated_at or self.created_at
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in UNFINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "params": self.params,
+            "progress": self.progress if self.progress is not None else {"status": "not_started"},
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat()
+        }
+
+class JobStore:
+    """Persiste o estado das execuções em tbl_orchestrator_jobs, com conexão própria.
+
+    A tabela é a fonte de verdade compartilhada pelos processos: os limites de
+    execuções são conferidos nela sob um advisory lock, e cada execução tem um
+    dono (`owner`, host:pid) que renova o heartbeat e atende os pedidos de cancelamento.
+    """
+    def __init__(self, database, owner: Optional[str] = None):
+        self.database = database
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+
+    def save(self, job: Job):
+        with self._lock:
+            try:
+                self.database.save_job(job.job_id, job.status, job.params, job.progress, job.error, self.owner)
+                self.database.commit()
+            except Exception as e:
+                print(f"Erro ao salvar o estado da execução {job.job_id}: {str(e)}")
+                self.database.rollback()
+
+    def create(self, job: Job, max_pending: int):
+        """Grava uma nova execução se houver menos de `max_pending` em aberto em todos os processos"""
+        with self._lock:
+            try:
+                self.database.lock_jobs()
+                if self.database.count_jobs(list(UNFINISHED_STATUSES)) >= max_pending:
+                    raise JobQueueFull(f"Limite de {max_pending} execuções em aberto atingido")
+                self.database.save_job(job.job_id, job.status, job.params, job.progress, job.error, self.owner)
+                self.database.commit()
+            except Exception:
+                self.database.rollback()
+                raise
+
+    def start(self, job: Job, max_running: int, alive_seconds: float) -> bool:
+        """Passa a execução para `running` se houver vaga entre as que rodam (com dono vivo) em todos os processos"""
+        with self._lock:
+            try:
+                self.database.lock_jobs()
+                if self.database.count_jobs([RUNNING], alive_seconds) >= max_running:
+                    self.database.rollback()
+                    return False
+                self.database.set_job_status(job.job_id, RUNNING)
+                self.database.commit()
+                return True
+            except Exception:
+                self.database.rollback()
+                raise
+
+    def request_cancel(self, job_id: str) -> bool:
+        with self._lock:
+            try:
+                requested = self.database.request_job_cancel(job_id, list(UNFINISHED_STATUSES))
+                self.database.commit()
+                return requested
+            except Exception:
+                self.database.rollback()
+                raise
+
+    def heartbeat(self, job_ids: List[str]) -> List[str]:
+        """Renova o heartbeat das execuções deste processo; retorna as com cancelamento pedido"""
+        with self._lock:
+            try:
+                cancel_requested = self.database.heartbeat_jobs(job_ids, self.owner)
+                self.database.commit()
+                return cancel_requested
+            except Exception:
+                self.database.rollback()
+                raise
+
+    def claim_stale(self, stale_seconds: float, limit: int) -> List[Tuple[Job, bool]]:
+        """Assume execuções órfãs: (execução, se o cancelamento foi pedido)"""
+        with self._lock:
+            try:
+                rows = self.database.claim_stale_jobs(self.owner, list(UNFINISHED_STATUSES), stale_seconds, limit)
+                self.database.commit()
+            except Exception:
+                self.database.rollback()
+                raise
+        return [(self._to_job(row), row["fl_cancel_requested"]) for row in rows]
+
+    def load(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            rows = self.database.get_jobs(id_job=job_id, limit=1)
+            self.database.rollback()
+        return self._to_job(rows[0]) if rows else None
+
+    def load_many(self, statuses: Optional[List[str]] = None, limit: int = 50) -> List[Job]:
+        with self._lock:
+            rows = self.database.get_jobs(statuses=statuses, limit=limit)
+            self.database.rollback()
+        return [self._to_job(row) for row in rows]
+
+    @staticmethod
+    def _to_job(row: Dict[str, Any]) -> Job:
+        return Job(row["id_job"], row["js_params"], row["ds_status"], row["js_progress"],
+                   row["ds_error"], row["dt_created"], row["dt_updated"])
+
+class JobManager:
+    """Executa o orquestrador em segundo plano, em um pool limitado de workers.
+
+    Cada execução recebe um ID, uma instância própria do orquestrador (e portanto
+    conexão própria com o banco) e tem seu progresso gravado a cada atualização,
+    de forma que outro processo possa consultá-la, cancelá-la ou retomá-la. Os
+    limites valem para todos os processos que usam o mesmo banco. Uma thread de
+    acompanhamento renova o heartbeat das execuções deste processo, atende
+    cancelamentos pedidos em outros processos e assume as execuções órfãs.
+    """
+    def __init__(self, orchestrator_factory: Callable[[], OrchestratorService], store: JobStore,
+                 max_workers: int = ORCHESTRATOR_MAX_CONCURRENT_JOBS,
+                 max_pending: int = ORCHESTRATOR_MAX_PENDING_JOBS,
+                 heartbeat_interval: float = ORCHESTRATOR_JOB_HEARTBEAT_SECONDS,
+                 stale_after: float = ORCHESTRATOR_JOB_STALE_SECONDS,
+                 resume: bool = ORCHESTRATOR_RESUME_JOBS):
+        self.orchestrator_factory = orchestrator_factory
+        self.store = store
+        self.max_running = max_workers
+        self.max_pending = max_pending
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.resume = resume
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="orchestrator-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._monitor = threading.Thread(target=self._monitor_jobs, name="orchestrator-job-monitor", daemon=True)
+        self._monitor.start()
+
+    def submit(self, params: Dict[str, Any], job_id: Optional[str] = None) -> Job:
+        """Enfileira uma execução e retorna imediatamente"""
+        job = Job(job_id or str(uuid.uuid4()), params)
+        self.store.create(job, self.max_pending)
+        self._enqueue(job)
+        return job
+
+    def _enqueue(self, job: Job):
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._trim_history()
+        job.future = self._executor.submit(self._run, job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job or self.store.load(job_id)
+
+    def latest(self) -> Optional[Job]:
+        # a mais recente pode ser de outro processo
+        jobs = self.store.load_many(limit=1)
+        return jobs[0] if jobs else None
+
+    def list_jobs(self, limit: int = 50) -> List[Job]:
+        return self.store.load_many(limit=limit)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancela uma execução; as que já estão rodando param no próximo ponto de verificação.
+
+        Execuções de outro processo recebem o pedido pela tabela e param no
+        próximo heartbeat do processo dono.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            job = self.store.load(job_id)
+            if job is not None and not job.finished:
+                self.store.request_cancel(job_id)
+            return job
+        if job.finished:
+            return job
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        return job
+
+    def resume_interrupted(self, resume: Optional[bool] = None) -> List[Job]:
+        """Assume execuções em aberto cujo processo dono parou (restart, worker reciclado ou encerrado).
+
+        Como a carga é idempotente, retomar significa executar de novo no modo
+        incremental: o que já foi confirmado é pulado pelas marcas d'água.
+        """
+        resume = self.resume if resume is None else resume
+        with self._lock:
+            capacity = self.max_pending - sum(1 for job in self._jobs.values() if not job.finished)
+        if capacity <= 0:
+            return []
+        resumed = []
+        for job, cancel_requested in self.store.claim_stale(self.stale_after, capacity):
+            job.updated_at = datetime.now()
+            if cancel_requested or not resume:
+                job.status = CANCELLED if cancel_requested else INTERRUPTED
+                self.store.save(job)
+                continue
+            print(f"Retomando a execução {job.job_id} do orquestrador")
+            job.params = {**job.params, "incremental": True, "resumed": True}
+            job.status = QUEUED
+            self.store.save(job)
+            self._enqueue(job)
+            resumed.append(job)
+        return resumed
+
+    def _heartbeat(self):
+        with self._lock:
+            job_ids = [job.job_id for job in self._jobs.values() if not job.finished]
+        if not job_ids:
+            return
+        for job_id in self.store.heartbeat(job_ids):
+            self.cancel(job_id)
+
+    def _monitor_jobs(self):
+        while True:
+            try:
+                self._heartbeat()
+                self.resume_interrupted()
+            except Exception as e:
+                print(f"Erro ao acompanhar as execuções do orquestrador: {str(e)}")
+            if self._stop_event.wait(self.heartbeat_interval):
+                return
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - ORCHESTRATOR_JOB_HISTORY)]:
+            del self._jobs[job_id]
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.updated_at = datetime.now()
+        self.store.save(job)
+
+    def _update_progress(self, job: Job, progress: Dict[str, Any]):
+        job.progress = progress
+        job.updated_at = datetime.now()
+        self.store.save(job)
+
+    def _wait_for_slot(self, job: Job) -> bool:
+        """Aguarda uma vaga entre as execuções rodando em todos os processos; False se for cancelada antes"""
+        while not job.cancel_event.is_set():
+            if self.store.start(job, self.max_running, self.stale_after):
+                return True
+            job.cancel_event.wait(self.heartbeat_interval)
+        return False
+
+    def _run(self, job: Job):
+        orchestrator = None
+        try:
+            if not self._wait_for_slot(job):
+                self._finish(job, CANCELLED)
+                return
+            job.status = RUNNING
+            job.updated_at = datetime.now()
+            orchestrator = self.orchestrator_factory()
+            job.progress = orchestrator.process_and_save_data(
+                job.params["datetime_from"],
+                job.params["datetime_to"],
+                job.params.get("incremental", False),
+                progress_callback=lambda progress: self._update_progress(job, progress),
+                cancel_event=job.cancel_event
+            )
+            self._finish(job, SUCCEEDED)
+        except OrchestrationCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            print(f"Erro na execução {job.job_id} do orquestrador: {str(e)}")
+            self._finish(job, FAILED, str(e))
+        finally:
+            if orchestrator is not None:
+                orchestrator.database.close()
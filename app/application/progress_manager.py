@@ -1,4 +1,4 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 import time
 
@@ -33,11 +33,12 @@ class ProgressManager:
             }
         }
 
-    def update_progress(self, city: str, measurements_inserted: int = 0, weather_records_inserted: int = 0) -> Dict[str, Any]:
-        if measurements_inserted > 0:
+    def update_progress(self, city: str, measurements_inserted: Optional[int] = None, weather_records_inserted: Optional[int] = None) -> Dict[str, Any]:
+        # Uma cidade concluída sem registros novos (ex.: ingestão incremental) também conta como processada
+        if measurements_inserted is not None:
             self.processed_cities += 1
             self.measurements_inserted += measurements_inserted
-        if weather_records_inserted > 0:
+        if weather_records_inserted is not None:
             self.weather_cities[city] = {
                 "total_inserted": weather_records_inserted
             }
@@ -1,14 +1,64 @@
 # app/application/services.py
-from infra.openaq_api import OpenAQApi, WeatherAPI
-from infra.database import Database
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from infra.openaq_api import OpenAQApi, OpenAQError, WeatherAPI, WEATHER_HISTORY_MAX_RANGE_DAYS
+from infra.database import Database, MEASUREMENT_PERIOD, WATERMARK_MEASUREMENTS, WATERMARK_WEATHER
+from infra.feature_store import FeatureStore
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Set
 from .progress_manager import ProgressManager
-import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict, deque
+from domain.models import MeasurementBatch, remove_accents
+from itertools import islice
+import os
+import queue
+import threading
 
-def remove_accents(text: str) -> str:
-    """Remove acentos de uma string"""
-    return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
+# Quantidade máxima de sensores consultados simultaneamente na OpenAQ
+OPENAQ_FETCH_MAX_WORKERS = int(os.getenv("OPENAQ_FETCH_MAX_WORKERS", "8"))
+
+# Pipeline do orquestrador: produtores de busca em paralelo, lotes por gravação e lotes em espera na fila
+ORCHESTRATOR_FETCH_WORKERS = int(os.getenv("ORCHESTRATOR_FETCH_WORKERS", "4"))
+ORCHESTRATOR_WRITE_BATCH_SIZE = int(os.getenv("ORCHESTRATOR_WRITE_BATCH_SIZE", "1000"))
+ORCHESTRATOR_QUEUE_SIZE = int(os.getenv("ORCHESTRATOR_QUEUE_SIZE", "8"))
+QUEUE_POLL_SECONDS = 0.5
+
+# Tipos de mensagem trocados entre produtores e gravador
+MEASUREMENTS_BATCH = "measurements"
+MEASUREMENTS_DONE = "measurements_done"
+MEASUREMENTS_ERROR = "measurements_error"
+WEATHER_BATCH = "weather"
+WEATHER_DONE = "weather_done"
+WEATHER_ERROR = "weather_error"
+
+def parse_iso_datetime(value: str) -> datetime:
+    """Converte 'YYYY-MM-DD' ou 'YYYY-MM-DDTHH:MM:SS[Z|±HH:MM]' em datetime UTC sem fuso"""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def format_iso_datetime(value: datetime) -> str:
+    """Formata um datetime UTC no padrão aceito pela OpenAQ"""
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def contiguous_watermark(current: Optional[date], start: date, days: Iterable[date]) -> Optional[date]:
+    """Marca d'água do clima após uma carga: o último dia da sequência sem lacunas que segue `current`.
+
+    Sem marca d'água, a sequência começa em `start`. Um dia ausente (janela com
+    erro ou vazia, ou um intervalo entre a marca d'água e o início da carga)
+    interrompe a sequência, para que a próxima carga incremental o busque de novo.
+    """
+    days = set(days)
+    day = current + timedelta(days=1) if current is not None else start
+    while day in days:
+        day += timedelta(days=1)
+    last = day - timedelta(days=1)
+    if current is None:
+        return last if last >= start else None
+    return max(current, last)
+
+class OrchestrationCancelled(Exception):
+    """Interrompe o processamento quando o cancelamento da execução é solicitado"""
 
 class SensorService:
     def __init__(self, repository: OpenAQApi):
@@ -18,8 +68,9 @@ class SensorService:
         return self.repository.get_pm25_sensors_from_chile()
 
 class MeasurementService:
-    def __init__(self, repository: OpenAQApi):
+    def __init__(self, repository: OpenAQApi, max_workers: int = OPENAQ_FETCH_MAX_WORKERS):
         self.repository = repository
+        self.max_workers = max_workers
 
     def get_measurements_for_all_sensors(self, datetime_from: str, datetime_to: str):
         sensor_service = SensorService(self.repository)
@@ -28,18 +79,85 @@ class MeasurementService:
         if not sensors:
             return []
 
+        def fetch(sensor):
+            return self.repository.get_measurements(sensor["id"], datetime_from, datetime_to, sensor["city"])
+
         measurements = []
-        for sensor in sensors:
-            measurements.extend(self.repository.get_measurements(sensor["id"], datetime_from, datetime_to, sensor["city"]))
+        if self.max_workers <= 1:
+            for sensor in sensors:
+                measurements.extend(fetch(sensor))
+            return measurements
+
+        # executor.map devolve os resultados na ordem dos sensores, independente de qual termina primeiro
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(sensors))) as executor:
+            for sensor_measurements in executor.map(fetch, sensors):
+                measurements.extend(sensor_measurements)
 
         return measurements
 
+    def iter_measurements_for_sensors(self, sensors: List[Dict[str, Any]], datetime_from: str, datetime_to: str,
+                                      since: Optional[Dict[int, str]] = None) -> Iterator[Any]:
+        """Percorre as medições dos sensores informados sem materializá-las, sensor a sensor.
+
+        `since` permite que cada sensor comece de uma data própria (ingestão incremental).
+        """
+        since = since or {}
+        for sensor in sensors:
+            sensor_from = since.get(sensor["id"], datetime_from)
+            yield from self.repository.iter_measurements(sensor["id"], sensor_from, datetime_to, sensor["city"])
+
+    def iter_measurement_batches_for_sensors(self, sensors: List[Dict[str, Any]], datetime_from: str, datetime_to: str,
+                                             since: Optional[Dict[int, str]] = None) -> Iterator[MeasurementBatch]:
+        """Como iter_measurements_for_sensors, mas em lotes colunares preenchidos direto das páginas da API"""
+        since = since or {}
+        for sensor in sensors:
+            sensor_from = since.get(sensor["id"], datetime_from)
+            yield from self.repository.iter_measurement_batches(sensor["id"], sensor_from, datetime_to, sensor["city"])
+
+    def iter_measurements_for_all_sensors(self, datetime_from: str, datetime_to: str) -> Iterator[Any]:
+        """Versão em streaming de get_measurements_for_all_sensors: a memória não cresce com o intervalo"""
+        sensors = SensorService(self.repository).get_pm25_sensors()
+        yield from self.iter_measurements_for_sensors(sensors, datetime_from, datetime_to)
+
+    def stream_measurements_for_all_sensors(self, datetime_from: str, datetime_to: str) -> Iterator[Any]:
+        """Entrega as medições de cada sensor assim que ele termina, na ordem dos sensores.
+
+        Até `max_workers` sensores são buscados ao mesmo tempo e só as medições
+        desses sensores ficam em memória, independente do tamanho do intervalo.
+        Se o consumidor parar no meio, os sensores ainda não iniciados são cancelados.
+        """
+        sensors = SensorService(self.repository).get_pm25_sensors()
+        if not sensors:
+            return
+        if self.max_workers <= 1:
+            yield from self.iter_measurements_for_sensors(sensors, datetime_from, datetime_to)
+            return
+
+        def fetch(sensor):
+            return self.repository.get_measurements(sensor["id"], datetime_from, datetime_to, sensor["city"])
+
+        remaining = iter(sensors)
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(sensors)))
+        try:
+            pending = deque(executor.submit(fetch, sensor) for sensor in islice(remaining, self.max_workers))
+            while pending:
+                measurements = pending.popleft().result()
+                # mantém a janela cheia enquanto as medições deste sensor são consumidas
+                for sensor in islice(remaining, 1):
+                    pending.append(executor.submit(fetch, sensor))
+                yield from measurements
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
 class HistoryService:
     def __init__(self, repository: WeatherAPI):
         self.repository = repository
 
     def get_city_history(self, city: str, date: str):
         return self.repository.get_history(city, date)
+
+    def get_city_history_range(self, city: str, start_date: str, end_date: str):
+        return self.repository.get_history_range(city, start_date, end_date)
     
 class FutureService:
     def __init__(self, repository: WeatherAPI):
@@ -49,81 +167,193 @@ class FutureService:
         return self.repository.get_future(city, date)
     
 class OrchestratorService:
-    def __init__(self, measurement_service: MeasurementService, history_service: HistoryService, database: Database):
+    def __init__(self, measurement_service: MeasurementService, history_service: HistoryService, database: Database,
+                 feature_store: Optional[FeatureStore] = None):
         self.measurement_service = measurement_service
         self.history_service = history_service
         self.database = database
+        self.feature_store = feature_store or FeatureStore(database)
         self._progress = None
+        self._progress_callback = None
+        self._cancel_event = None
+        self._stop_event = None
+        self._queue = None
+        # Por cidade: [marca d'água do clima, início da carga, dias recebidos] da execução em andamento
+        self._weather_watermarks = {}
 
-    def process_city_measurements(self, measurements: List[Any], city: str) -> Dict[str, int]:
-        """Processa as medições de uma cidade específica"""
-        city_measurements = [m for m in measurements if m.city == city]
-        inserted_count = 0
+    def _set_progress(self, progress: Dict[str, Any]):
+        self._progress = progress
+        if self._progress_callback is not None:
+            self._progress_callback(progress)
 
-        for measurement in city_measurements:
-            try:
-                self.database.insert_measurement(
-                    id_sensor=measurement.sensor_id,
-                    ds_city=remove_accents(measurement.city),
-                    dt_date_from=datetime.strptime(measurement.datetime_from, "%Y-%m-%dT%H:%M:%S%z"),
-                    dt_date_to=datetime.strptime(measurement.datetime_to, "%Y-%m-%dT%H:%M:%S%z"),
-                    qt_pm25=measurement.value
-                )
-                inserted_count += 1
-            except Exception as e:
-                print(f"Erro ao inserir medição para cidade {city}: {str(e)}")
-                self.database.rollback()
-                raise
+    def _check_cancelled(self):
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise OrchestrationCancelled("Processamento cancelado")
+        if self._stop_event is not None and self._stop_event.is_set():
+            raise OrchestrationCancelled("Processamento interrompido")
+
+    def _iter_measurement_batches(self, measurements: Iterable[Any], batch_size: int = ORCHESTRATOR_WRITE_BATCH_SIZE) -> Iterator[MeasurementBatch]:
+        """Agrupa o fluxo de medições em lotes colunares, convertidos de uma só vez"""
+        iterator = iter(measurements)
+        while True:
+            self._check_cancelled()
+            chunk = list(islice(iterator, batch_size))
+            if not chunk:
+                return
+            yield MeasurementBatch.from_measurements(chunk)
+
+    def _rebatch(self, batches: Iterable[MeasurementBatch], batch_size: int = ORCHESTRATOR_WRITE_BATCH_SIZE) -> Iterator[MeasurementBatch]:
+        """Junta os lotes pequenos (uma página por sensor) em lotes de pelo menos `batch_size` linhas"""
+        pending, rows = [], 0
+        for batch in batches:
+            self._check_cancelled()
+            pending.append(batch)
+            rows += len(batch)
+            if rows >= batch_size:
+                yield MeasurementBatch.concat(pending)
+                pending, rows = [], 0
+        if rows:
+            yield MeasurementBatch.concat(pending)
+
+    @staticmethod
+    def _features_since(batch: MeasurementBatch) -> date:
+        # Um dia de folga: o dia da medição no banco segue o fuso da sessão, não UTC
+        return batch.earliest_date() - timedelta(days=1)
+
+    @staticmethod
+    def _merge_watermarks(watermarks: Dict[int, datetime], batch: MeasurementBatch):
+        for sensor_id, latest in batch.latest_by_sensor().items():
+            if sensor_id not in watermarks or latest > watermarks[sensor_id]:
+                watermarks[sensor_id] = latest
+
+    def partition_measurements(self, measurements: Iterable[Any]) -> Dict[str, MeasurementBatch]:
+        """Separa as medições por cidade em uma única passada sobre a lista"""
+        return MeasurementBatch.from_measurements(measurements).partition_by_city()
+
+    def process_city_measurements(self, measurements: Any, city: str) -> Dict[str, int]:
+        """Processa as medições de uma cidade específica e avança a marca d'água de cada sensor.
+
+        Aceita um iterável de Measurement ou um MeasurementBatch já particionado
+        (ver `partition_measurements`); medições de outras cidades são ignoradas.
+        """
+        ds_city = remove_accents(city)
+        batches = [measurements] if isinstance(measurements, MeasurementBatch) else self._iter_measurement_batches(measurements)
+        watermarks: Dict[int, datetime] = {}
+        try:
+            inserted_count = 0
+            for batch in batches:
+                batch = batch.for_city(city)
+                if not len(batch):
+                    continue
+                inserted = self.database.insert_measurements_bulk(batch.to_rows(ds_city))
+                if inserted:
+                    self.feature_store.mark_pending(ds_city, self._features_since(batch))
+                inserted_count += inserted
+                self._merge_watermarks(watermarks, batch)
+            for sensor_id, watermark in watermarks.items():
+                self.database.set_watermark(WATERMARK_MEASUREMENTS, str(sensor_id), watermark)
+        except Exception as e:
+            print(f"Erro ao inserir medições para cidade {city}: {str(e)}")
+            self.database.rollback()
+            raise
 
         return {"measurements_inserted": inserted_count}
 
-    def process_city_weather(self, city: str, datetime_from: str, datetime_to: str) -> Dict[str, int]:
-        """Processa o histórico do clima de uma cidade específica para cada dia do intervalo"""
+    def measurement_start_dates(self, sensors: List[Dict[str, Any]], datetime_from: str) -> Dict[int, str]:
+        """Data inicial de cada sensor na ingestão incremental: a maior entre `datetime_from` e a marca d'água"""
+        start = parse_iso_datetime(datetime_from)
+        since = {}
+        for sensor in sensors:
+            watermark = self.database.get_watermark(WATERMARK_MEASUREMENTS, str(sensor["id"]))
+            if watermark is not None and watermark > start:
+                # O período da marca d'água é buscado de novo; a constraint natural descarta a repetição
+                since[sensor["id"]] = format_iso_datetime(watermark)
+        return since
+
+    def measurement_watermark_sensors(self, sensors: List[Dict[str, Any]], datetime_from: str, since: Dict[int, str]) -> Set[int]:
+        """Sensores cuja marca d'água pode avançar nesta carga: sem marca d'água ou com a carga começando até ela.
+
+        Uma carga que começa depois da marca d'água deixa um buraco antes de si, que
+        a carga incremental seguinte, partindo da marca d'água, nunca buscaria.
+        """
+        allowed = set()
+        for sensor in sensors:
+            watermark = self.database.get_watermark(WATERMARK_MEASUREMENTS, str(sensor["id"]))
+            start = parse_iso_datetime(since.get(sensor["id"], datetime_from))
+            if watermark is None or start <= watermark + MEASUREMENT_PERIOD:
+                allowed.add(sensor["id"])
+        return allowed
+
+    def weather_date_range(self, city: str, datetime_from: str, datetime_to: str, incremental: bool = False):
+        """Dias (início, fim) de histórico do clima a buscar para a cidade.
+
+        O dia corrente fica de fora, pois ainda não tem histórico fechado; no modo
+        incremental, o início é o dia seguinte à marca d'água da cidade.
+        """
+        start_date = datetime.strptime(datetime_from.split('T')[0], "%Y-%m-%d")
+        end_date = datetime.strptime(datetime_to.split('T')[0], "%Y-%m-%d")
+        end_date = min(end_date, datetime.combine(datetime.now().date() - timedelta(days=1), datetime.min.time()))
+        if incremental:
+            watermark = self.database.get_watermark(WATERMARK_WEATHER, remove_accents(city))
+            if watermark is not None:
+                start_date = max(start_date, watermark + timedelta(days=1))
+        return start_date, end_date
+
+    def _iter_weather_windows(self, city: str, start_date: datetime, end_date: datetime) -> Iterator[tuple]:
+        """Busca o histórico em janelas de vários dias, devolvendo (início, fim, registros) de cada uma"""
+        city_without_accents = remove_accents(city)
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            self._check_cancelled()
+            chunk_end = min(end_date, chunk_start + timedelta(days=WEATHER_HISTORY_MAX_RANGE_DAYS - 1))
+            print(f"\nProcessando dados climáticos para {city} de {chunk_start.date()} a {chunk_end.date()}")
+
+            weather_data = self.history_service.get_city_history_range(
+                city_without_accents, chunk_start.strftime("%Y-%m-%d"), chunk_end.strftime("%Y-%m-%d")
+            )
+            if not weather_data:
+                print(f"Nenhum dado climático encontrado para a cidade {city} entre {chunk_start.date()} e {chunk_end.date()}")
+
+            yield chunk_start, chunk_end, weather_data
+            chunk_start = chunk_end + timedelta(days=1)
+
+    def process_city_weather(self, city: str, datetime_from: str, datetime_to: str, incremental: bool = False) -> Dict[str, int]:
+        """Processa o histórico do clima de uma cidade específica para todos os dias do intervalo.
+
+        No modo incremental, começa no dia seguinte à marca d'água da cidade.
+        """
         try:
-            # Converte as strings de data para objetos datetime
-            start_date = datetime.strptime(datetime_from.split('T')[0], "%Y-%m-%d")
-            end_date = datetime.strptime(datetime_to.split('T')[0], "%Y-%m-%d")
-            
-            total_inserted = 0
-            current_date = start_date
-            days_processed = 0
-            total_days = (end_date - start_date).days + 1
-            
-            # Remove acentos do nome da cidade
+            start_date, end_date = self.weather_date_range(city, datetime_from, datetime_to, incremental)
             city_without_accents = remove_accents(city)
             print(f"\nProcessando dados climáticos para {city} (sem acentos: {city_without_accents})")
-            
-            while current_date <= end_date:
-                date_str = current_date.strftime("%Y-%m-%d")
-                print(f"\nProcessando dados climáticos para {city} na data: {date_str}")
-                
-                weather_data = self.history_service.get_city_history(city_without_accents, date_str)
-                if not weather_data:
-                    print(f"Nenhum dado climático encontrado para a cidade {city} na data {date_str}")
-                    current_date += timedelta(days=1)
-                    days_processed += 1
-                    continue
 
-                for weather in weather_data:
-                    try:
-                        self.database.insert_weather_history(
-                            ds_city=weather["city"],
-                            dt_date=datetime.strptime(weather["date"], "%Y-%m-%d"),
-                            qt_avg_humidity=weather["avg_humidity"],
-                            qt_avg_temp_c=weather["avg_temp_c"],
-                            qt_avg_vis_km=weather["avg_vis_km"],
-                            qt_max_wind_kph=weather["max_wind_kph"],
-                            qt_total_precip_mm=weather["total_precip_mm"],
-                            qt_pressure_mb=weather["pressure_mb"]
-                        )
-                        total_inserted += 1
-                    except Exception as e:
-                        print(f"Erro ao inserir histórico do clima para cidade {city}: {str(e)}")
-                        self.database.rollback()
-                        raise
+            days_processed = 0
+            total_days = max(0, (end_date - start_date).days + 1)
+            watermark = self.database.get_watermark(WATERMARK_WEATHER, city_without_accents)
+            watermark = watermark.date() if watermark is not None else None
+            received = set()
+
+            def weather_rows():
+                nonlocal days_processed
+                for chunk_start, chunk_end, weather_data in self._iter_weather_windows(city, start_date, end_date):
+                    for weather in weather_data:
+                        received.add(date.fromisoformat(weather["date"]))
+                        yield weather
+                    days_processed += (chunk_end - chunk_start).days + 1
 
-                current_date += timedelta(days=1)
-                days_processed += 1
+            try:
+                total_inserted = self.database.insert_weather_history_bulk(weather_rows())
+                # só avança até o primeiro dia que faltou, para a próxima carga buscá-lo de novo
+                new_watermark = contiguous_watermark(watermark, start_date.date(), received)
+                if new_watermark is not None and new_watermark != watermark:
+                    self.database.set_watermark(WATERMARK_WEATHER, city_without_accents,
+                                                datetime.combine(new_watermark, datetime.min.time()))
+                if total_inserted:
+                    self.feature_store.mark_pending(city_without_accents, start_date.date())
+            except Exception as e:
+                print(f"Erro ao inserir histórico do clima para cidade {city}: {str(e)}")
+                self.database.rollback()
+                raise
 
             return {
                 "weather_history_inserted": total_inserted, 
@@ -142,72 +372,228 @@ class OrchestratorService:
             return {"status": "not_started"}
         return self._progress
 
-    def process_and_save_data(self, datetime_from: str, datetime_to: str):
-        """Processa e salva dados por cidade, fazendo commit após cada cidade"""
+    def _put(self, item: tuple):
+        """Entrega um lote ao gravador, desistindo se o processamento for interrompido"""
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=QUEUE_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+        raise OrchestrationCancelled("Processamento interrompido")
+
+    def _produce_measurements(self, city: str, sensors: List[Dict[str, Any]], datetime_from: str, datetime_to: str,
+                              since: Dict[int, str], watermark_sensors: Set[int]):
+        """Produtor: busca as medições da cidade e as entrega em lotes ao gravador.
+
+        Um sensor cuja busca falha (OpenAQError) é pulado e não avança a marca
+        d'água nem a cobertura, para ser buscado de novo. As marcas d'água só
+        seguem nos lotes depois que a busca do sensor terminou; ao final são
+        entregues as marcas d'água e os intervalos buscados dos sensores completos,
+        registrados só quando a cidade inteira foi gravada.
+        """
+        try:
+            print(f"\nProcessando medições para cidade: {city}")
+            completed: Set[int] = set()
+            errors: Dict[int, str] = {}
+
+            def sensor_batches():
+                for sensor in sensors:
+                    try:
+                        yield from self.measurement_service.iter_measurement_batches_for_sensors([sensor], datetime_from, datetime_to, since)
+                    except OpenAQError as e:
+                        print(f"Erro ao buscar medições do sensor {sensor['id']} ({city}): {str(e)}")
+                        errors[sensor["id"]] = str(e)
+                        continue
+                    completed.add(sensor["id"])
+
+            ds_city = remove_accents(city)
+            watermarks: Dict[int, datetime] = {}
+            for batch in self._rebatch(sensor_batches()):
+                batch = batch.for_city(city)
+                if not len(batch):
+                    continue
+                self._merge_watermarks(watermarks, batch)
+                advanced = {sensor_id: watermark for sensor_id, watermark in watermarks.items()
+                            if sensor_id in watermark_sensors and sensor_id in completed}
+                self._put((MEASUREMENTS_BATCH, city, (batch.to_rows(ds_city), advanced, self._features_since(batch))))
+            coverage = [
+                (sensor["id"], parse_iso_datetime(since.get(sensor["id"], datetime_from)), parse_iso_datetime(datetime_to))
+                for sensor in sensors if sensor["id"] in completed
+            ]
+            advanced = {sensor_id: watermark for sensor_id, watermark in watermarks.items()
+                        if sensor_id in watermark_sensors and sensor_id in completed}
+            self._put((MEASUREMENTS_DONE, city, (coverage, advanced, errors)))
+        except OrchestrationCancelled:
+            pass
+        except Exception as e:
+            self._put((MEASUREMENTS_ERROR, city, e))
+
+    def _produce_weather(self, city: str, start_date: datetime, end_date: datetime):
+        """Produtor: busca o histórico do clima da cidade e entrega cada janela ao gravador"""
+        try:
+            print(f"\nProcessando histórico do clima para cidade: {city}")
+            for _, _, weather_data in self._iter_weather_windows(city, start_date, end_date):
+                if weather_data:
+                    self._put((WEATHER_BATCH, city, weather_data))
+            self._put((WEATHER_DONE, city, None))
+        except OrchestrationCancelled:
+            pass
+        except Exception as e:
+            self._put((WEATHER_ERROR, city, e))
+
+    def _write(self, kind: str, city: str, payload: Any) -> int:
+        """Grava um lote vindo dos produtores e confirma a transação (dados + marca d'água)"""
+        if kind == MEASUREMENTS_BATCH:
+            rows, watermarks, since = payload
+            inserted = self.database.insert_measurements_bulk(rows)
+            for sensor_id, watermark in watermarks.items():
+                self.database.set_watermark(WATERMARK_MEASUREMENTS, str(sensor_id), watermark)
+        else:
+            inserted = self.database.insert_weather_history_bulk(payload)
+            days = [date.fromisoformat(weather["date"]) for weather in payload]
+            since = min(days)
+            # como em process_city_weather: janelas que falharam ou vieram vazias seguram a marca d'água
+            state = self._weather_watermarks[city]
+            state[2].update(days)
+            watermark = contiguous_watermark(state[0], state[1], state[2])
+            if watermark is not None and watermark != state[0]:
+                self.database.set_watermark(WATERMARK_WEATHER, remove_accents(city), datetime.combine(watermark, datetime.min.time()))
+        if inserted:
+            self.feature_store.mark_pending(remove_accents(city), since)
+        self.database.commit()
+        if kind == WEATHER_BATCH:
+            state[0] = watermark
+        return inserted
+
+    def _write_coverage(self, coverage: List[tuple], watermarks: Dict[int, datetime]):
+        """Registra os intervalos buscados de cada sensor como ingeridos (lidos por /sensor-data) e suas marcas d'água"""
+        for sensor_id, dt_from, dt_to in coverage:
+            self.database.add_measurement_coverage(sensor_id, dt_from, dt_to)
+        for sensor_id, watermark in watermarks.items():
+            self.database.set_watermark(WATERMARK_MEASUREMENTS, str(sensor_id), watermark)
+        self.database.commit()
+
+    def _refresh_features(self):
+        """Atualiza as features diárias das cidades que receberam dados (inclusive de execuções interrompidas)"""
+        try:
+            refreshed = self.feature_store.refresh_pending()
+            for city, rows in refreshed.items():
+                print(f"Features diárias atualizadas para {city}: {rows}")
+        except Exception as e:
+            print(f"Erro ao atualizar as features diárias: {str(e)}")
+            self.database.rollback()
+
+    def process_and_save_data(self, datetime_from: str, datetime_to: str, incremental: bool = False,
+                              progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                              cancel_event: Optional[threading.Event] = None):
+        """Processa e salva medições e histórico do clima de todas as cidades em pipeline.
+
+        Produtores (um por cidade e tipo de dado) buscam os dados em paralelo e os
+        entregam a uma fila limitada; esta thread grava os lotes à medida que chegam,
+        com um commit por lote. Assim rede e banco trabalham ao mesmo tempo e a
+        memória fica limitada pelo tamanho da fila, não pelo volume total.
+
+        No modo incremental, cada sensor e cidade busca apenas o que é mais novo que
+        a sua marca d'água, limitado ao intervalo informado. `progress_callback`
+        recebe cada atualização de progresso e `cancel_event`, quando sinalizado,
+        interrompe o processamento com OrchestrationCancelled (o que já foi
+        confirmado por commit permanece gravado).
+        """
+        self._progress_callback = progress_callback
+        self._cancel_event = cancel_event
+        self._stop_event = threading.Event()
+        self._queue = queue.Queue(maxsize=ORCHESTRATOR_QUEUE_SIZE)
+        executor = None
         try:
             print("\n=== INICIANDO PROCESSAMENTO DE DADOS ===")
-            
-            # ETAPA 1: Processamento das medições
-            print("\n=== ETAPA 1: Processando medições dos sensores ===")
-            measurements = self.measurement_service.get_measurements_for_all_sensors(datetime_from, datetime_to)
-            cities = list(set(m.city for m in measurements))
-            
+            sensors = SensorService(self.measurement_service.repository).get_pm25_sensors()
+            cities = list(dict.fromkeys(sensor["city"] for sensor in sensors))
+            since = self.measurement_start_dates(sensors, datetime_from) if incremental else {}
+            watermark_sensors = self.measurement_watermark_sensors(sensors, datetime_from, since)
+            weather_ranges = {city: self.weather_date_range(city, datetime_from, datetime_to, incremental) for city in cities}
+            for city in cities:
+                watermark = self.database.get_watermark(WATERMARK_WEATHER, remove_accents(city))
+                self._weather_watermarks[city] = [watermark.date() if watermark is not None else None,
+                                                  weather_ranges[city][0].date(), set()]
+            # As leituras acima fecham a transação antes de o gravador começar
+            self.database.commit()
+
             # Inicializa o gerenciador de progresso
             progress_manager = ProgressManager(len(cities))
-            self._progress = progress_manager._calculate_progress()
-            
-            # Processa medições por cidade
-            for city in cities:
-                try:
-                    print(f"\nProcessando medições para cidade: {city}")
-                    measurement_result = self.process_city_measurements(measurements, city)
-                    self.database.commit()
-                    print(f"Medições inseridas para {city}: {measurement_result['measurements_inserted']}")
-                    
-                    # Atualiza progresso
-                    self._progress = progress_manager.update_progress(
-                        city=city,
-                        measurements_inserted=measurement_result["measurements_inserted"]
-                    )
-                    
-                except Exception as e:
-                    print(f"Erro ao processar medições para cidade {city}: {str(e)}")
-                    self.database.rollback()
-                    self._progress = progress_manager.add_error(
-                        city=city,
-                        error_type="measurement_error",
-                        error_message=str(e)
-                    )
-
-            # ETAPA 2: Processamento do histórico do clima
-            print("\n=== ETAPA 2: Processando histórico do clima ===")
-            
+            self._set_progress(progress_manager._calculate_progress())
+
+            executor = ThreadPoolExecutor(max_workers=ORCHESTRATOR_FETCH_WORKERS, thread_name_prefix="orchestrator-fetch")
             for city in cities:
+                city_sensors = [sensor for sensor in sensors if sensor["city"] == city]
+                executor.submit(self._produce_measurements, city, city_sensors, datetime_from, datetime_to, since,
+                                watermark_sensors)
+                executor.submit(self._produce_weather, city, *weather_ranges[city])
+
+            inserted = {MEASUREMENTS_BATCH: defaultdict(int), WEATHER_BATCH: defaultdict(int)}
+            failed = set()
+            pending = 2 * len(cities)
+            while pending:
+                self._check_cancelled()
                 try:
-                    print(f"\nProcessando histórico do clima para cidade: {city}")
-                    weather_result = self.process_city_weather(city, datetime_from, datetime_to)
-                    self.database.commit()
-                    print(f"Registros climáticos inseridos para {city}: {weather_result['weather_history_inserted']}")
-                    
-                    # Atualiza progresso
-                    self._progress = progress_manager.update_progress(
-                        city=city,
-                        weather_records_inserted=weather_result["weather_history_inserted"]
-                    )
-                    
-                except Exception as e:
-                    print(f"Erro ao processar histórico do clima para cidade {city}: {str(e)}")
-                    self.database.rollback()
-                    self._progress = progress_manager.add_error(
-                        city=city,
-                        error_type="weather_error",
-                        error_message=str(e)
-                    )
+                    kind, city, payload = self._queue.get(timeout=QUEUE_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+
+                stage = MEASUREMENTS_BATCH if kind.startswith("measurements") else WEATHER_BATCH
+                error_type = "measurement_error" if stage == MEASUREMENTS_BATCH else "weather_error"
+                if kind in (MEASUREMENTS_BATCH, WEATHER_BATCH):
+                    if (stage, city) in failed:
+                        continue
+                    try:
+                        inserted[stage][city] += self._write(kind, city, payload)
+                    except Exception as e:
+                        print(f"Erro ao gravar dados da cidade {city}: {str(e)}")
+                        self.database.rollback()
+                        failed.add((stage, city))
+                        self._set_progress(progress_manager.add_error(city=city, error_type=error_type, error_message=str(e)))
+                elif kind in (MEASUREMENTS_DONE, WEATHER_DONE):
+                    pending -= 1
+                    if (stage, city) in failed:
+                        continue
+                    if stage == MEASUREMENTS_BATCH:
+                        coverage, watermarks, errors = payload
+                        for sensor_id, error in errors.items():
+                            self._set_progress(progress_manager.add_error(city=city, error_type="measurement_error",
+                                                                          error_message=f"Sensor {sensor_id}: {error}"))
+                        try:
+                            self._write_coverage(coverage, watermarks)
+                        except Exception as e:
+                            print(f"Erro ao registrar a cobertura das medições da cidade {city}: {str(e)}")
+                            self.database.rollback()
+                        print(f"Medições inseridas para {city}: {inserted[stage][city]}")
+                        self._set_progress(progress_manager.update_progress(city=city, measurements_inserted=inserted[stage][city]))
+                    else:
+                        print(f"Registros climáticos inseridos para {city}: {inserted[stage][city]}")
+                        self._set_progress(progress_manager.update_progress(city=city, weather_records_inserted=inserted[stage][city]))
+                else:
+                    pending -= 1
+                    print(f"Erro ao processar dados da cidade {city}: {str(payload)}")
+                    failed.add((stage, city))
+                    self._set_progress(progress_manager.add_error(city=city, error_type=error_type, error_message=str(payload)))
 
+            self._refresh_features()
             print("\n=== PROCESSAMENTO CONCLUÍDO ===")
             return progress_manager.get_final_result()
 
+        except OrchestrationCancelled:
+            print("\n=== PROCESSAMENTO CANCELADO ===")
+            self.database.rollback()
+            raise
         except Exception as e:
             print(f"\nErro geral no processamento: {str(e)}")
             self.database.rollback()
-            raise
\ No newline at end of file
+            raise
+        finally:
+            self._stop_event.set()
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            self._progress_callback = None
+            self._cancel_event = None
+            self._stop_event = None
+            self._weather_watermarks = {}
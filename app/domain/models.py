@@ -1,13 +1,179 @@
 # app/domain/models.py
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, Sequence, Union
+import numpy as np
+import sys
+import unicodedata
+
+@lru_cache(maxsize=1024)
+def remove_accents(text: str) -> str:
+    """Remove acentos de uma string (memoizado: o conjunto de cidades é pequeno)"""
+    return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
+
 class Sensor:
     def __init__(self, sensor_id: int, name: str):
         self.sensor_id = sensor_id
         self.name = name
 
+@lru_cache(maxsize=64)
+def _shared_timezone(offset: timedelta) -> timezone:
+    return timezone(offset)
+
+def parse_timestamp(value: Union[str, datetime]) -> datetime:
+    """'YYYY-MM-DDTHH:MM:SS[±HH:MM|Z]' em datetime com fuso; o objeto de fuso é compartilhado entre as medições"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.replace(tzinfo=_shared_timezone(value.utcoffset()))
+
 class Measurement:
-    def __init__(self, sensor_id: int, value: float, datetime_from: str, datetime_to: str, city: str):
+    """Medição de um sensor; datas já convertidas (com o fuso local da OpenAQ) e cidade internada.
+
+    Com `__slots__` e sem `__dict__`, uma medição ocupa uma fração do objeto
+    comum; para grandes volumes, prefira MeasurementBatch.
+    """
+    __slots__ = ("sensor_id", "value", "datetime_from", "datetime_to", "city")
+
+    def __init__(self, sensor_id: int, value: float, datetime_from: Union[str, datetime],
+                 datetime_to: Union[str, datetime], city: str):
+        self.sensor_id = sensor_id
+        self.value = value
+        self.datetime_from = parse_timestamp(datetime_from)
+        self.datetime_to = parse_timestamp(datetime_to)
+        self.city = sys.intern(city)
+
+
+def _iso_to_utc(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.replace(microsecond=0)
+
+def parse_iso_to_utc(values: Sequence[str]) -> np.ndarray:
+    """Converte datas 'YYYY-MM-DDTHH:MM:SS[.ffffff][±HH:MM|Z]' em datetime64[s] UTC.
+
+    O formato da OpenAQ ('YYYY-MM-DDTHH:MM:SS±HH:MM', 25 caracteres) é convertido
+    de uma só vez, sem laço em Python: o deslocamento é lido direto dos códigos
+    dos caracteres. Lotes com outro formato (sufixo Z, frações de segundo, sem
+    fuso, que vale como UTC) são convertidos data a data; frações de segundo são truncadas.
+    """
+    text = np.asarray(values, dtype=str)
+    if not len(text):
+        return np.array([], dtype="datetime64[s]")
+    if text.dtype.itemsize == 25 * 4:
+        chars = text.view(np.uint32).reshape(len(text), 25)
+        if np.isin(chars[:, 19], (ord("+"), ord("-"))).all() and (chars[:, 22] == ord(":")).all():
+            local = text.astype("U19").astype("datetime64[s]")
+            digits = chars[:, [20, 21, 23, 24]].astype(np.int64) - ord("0")
+            minutes = (digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 2] * 10 + digits[:, 3]
+            sign = np.where(chars[:, 19] == ord("-"), -1, 1)
+            return local - (sign * minutes).astype("timedelta64[m]")
+    return np.array([_iso_to_utc(value) for value in text.tolist()], dtype="datetime64[s]")
+
+
+class MeasurementBatch:
+    """Lote colunar de medições, com uma coluna NumPy por atributo.
+
+    As datas ficam em datetime64[s] UTC e a cidade como código inteiro
+    (`cities[city_code]`), o que permite converter, particionar e gravar
+    milhões de linhas sem percorrê-las objeto a objeto.
+    """
+    def __init__(self, sensor_id: np.ndarray, value: np.ndarray, datetime_from: np.ndarray,
+                 datetime_to: np.ndarray, city_code: np.ndarray, cities: List[str]):
         self.sensor_id = sensor_id
         self.value = value
         self.datetime_from = datetime_from
         self.datetime_to = datetime_to
-        self.city = city
+        self.city_code = city_code
+        self.cities = cities
+
+    def __len__(self) -> int:
+        return len(self.sensor_id)
+
+    @classmethod
+    def from_measurements(cls, measurements: Iterable[Measurement]) -> "MeasurementBatch":
+        codes: Dict[str, int] = {}
+        sensor_ids, values, froms, tos, city_codes = [], [], [], [], []
+        for measurement in measurements:
+            sensor_ids.append(measurement.sensor_id)
+            values.append(measurement.value)
+            froms.append(int(measurement.datetime_from.timestamp()))
+            tos.append(int(measurement.datetime_to.timestamp()))
+            city_codes.append(codes.setdefault(measurement.city, len(codes)))
+        return cls(
+            np.array(sensor_ids, dtype=np.int64),
+            np.array(values, dtype=np.float64),
+            np.array(froms, dtype="datetime64[s]"),
+            np.array(tos, dtype="datetime64[s]"),
+            np.array(city_codes, dtype=np.int16),
+            list(codes)
+        )
+
+    @classmethod
+    def from_api_results(cls, sensor_id: int, city: str, results: List[Dict[str, Any]]) -> "MeasurementBatch":
+        """Lote direto de uma página de /sensors/{id}/measurements/daily da OpenAQ, sem objetos por medição"""
+        count = len(results)
+        return cls(
+            np.full(count, sensor_id, dtype=np.int64),
+            np.fromiter((result["value"] for result in results), dtype=np.float64, count=count),
+            parse_iso_to_utc([result["period"]["datetimeFrom"]["local"] for result in results]),
+            parse_iso_to_utc([result["period"]["datetimeTo"]["local"] for result in results]),
+            np.zeros(count, dtype=np.int16),
+            [city]
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["MeasurementBatch"]) -> "MeasurementBatch":
+        """Junta lotes em um só, unificando as tabelas de cidades"""
+        if not batches:
+            return cls.from_measurements([])
+        cities = list(dict.fromkeys(city for batch in batches for city in batch.cities))
+        codes = [
+            np.array([cities.index(city) for city in batch.cities], dtype=np.int16)[batch.city_code]
+            for batch in batches
+        ]
+        return cls(
+            np.concatenate([batch.sensor_id for batch in batches]),
+            np.concatenate([batch.value for batch in batches]),
+            np.concatenate([batch.datetime_from for batch in batches]),
+            np.concatenate([batch.datetime_to for batch in batches]),
+            np.concatenate(codes),
+            cities
+        )
+
+    def take(self, index: np.ndarray) -> "MeasurementBatch":
+        return MeasurementBatch(self.sensor_id[index], self.value[index], self.datetime_from[index],
+                                self.datetime_to[index], self.city_code[index], self.cities)
+
+    def partition_by_city(self) -> Dict[str, "MeasurementBatch"]:
+        """Separa o lote por cidade em uma única passada (ordenação estável por código da cidade)"""
+        order = np.argsort(self.city_code, kind="stable")
+        counts = np.bincount(self.city_code, minlength=len(self.cities))
+        parts = np.split(order, np.cumsum(counts)[:-1])
+        return {city: self.take(index) for city, index in zip(self.cities, parts) if len(index)}
+
+    def for_city(self, city: str) -> "MeasurementBatch":
+        if city not in self.cities:
+            return self.take(np.zeros(0, dtype=np.int64))
+        return self.take(np.flatnonzero(self.city_code == self.cities.index(city)))
+
+    def latest_by_sensor(self) -> Dict[int, datetime]:
+        """Maior datetime_from (UTC) de cada sensor do lote"""
+        latest = {}
+        for sensor_id in np.unique(self.sensor_id):
+            value = self.datetime_from[self.sensor_id == sensor_id].max()
+            latest[int(sensor_id)] = value.astype(datetime).replace(tzinfo=timezone.utc)
+        return latest
+
+    def earliest_date(self) -> date:
+        """Data (UTC) do período mais antigo do lote"""
+        return self.datetime_from.min().astype(datetime).date()
+
+    def to_rows(self, ds_city: str) -> List[tuple]:
+        """Linhas de tbl_measurements; as datas seguem como texto ISO em UTC (gravadas via ::timestamptz)"""
+        froms = np.datetime_as_string(self.datetime_from, unit="s", timezone="UTC").tolist()
+        tos = np.datetime_as_string(self.datetime_to, unit="s", timezone="UTC").tolist()
+        return list(zip(self.sensor_id.tolist(), repeat(ds_city), froms, tos, self.value.tolist()))
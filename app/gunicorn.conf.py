@@ -0,0 +1,87 @@
+# app/gunicorn.conf.py
+# Perfil de produção: gunicorn -c app/gunicorn.conf.py wsgi:app (a partir da raiz do repositório)
+import gc
+import multiprocessing
+import os
+import tempfile
+
+# Torna main.py e wsgi.py importáveis sem mudar o diretório de trabalho (MODEL_PATH etc. são relativos à raiz)
+pythonpath = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8080')}")
+# Processos: a previsão usa CPU e escala com os núcleos
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count())))
+# Threads por processo: /sensor-data e as chamadas às APIs externas passam a maior parte do tempo esperando rede
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Recicla workers após N pedidos (0 = nunca), com variação para não reiniciarem todos juntos
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+# create_app (migrações, modelo e aquecimento) roda uma vez no mestre; os workers herdam o estado por copy-on-write
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+# Com preload, o aquecimento (pilha de ML, modelo) roda uma vez no mestre; sem ele, cada worker pagaria o custo
+if preload_app:
+    os.environ.setdefault("APP_WARMUP", "true")
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+# Pasta em que cada worker grava o retrato das suas métricas, somados por /metrics; definida antes de
+# carregar o app, pois infra.metrics lê a variável na importação
+if not os.getenv("METRICS_MULTIPROC_DIR"):
+    os.environ["METRICS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="api-metrics-")
+
+def when_ready(server):
+    from infra.metrics import registry
+
+    # Retratos de uma execução anterior do servidor somariam métricas que não são desta
+    registry.clear_snapshots()
+    # Objetos criados até aqui (modelo, módulos) vão para a geração permanente do coletor:
+    # sem isso, cada coleta nos workers tocaria seus cabeçalhos e copiaria as páginas herdadas
+    gc.collect()
+    gc.freeze()
+
+def post_fork(server, worker):
+    from infra.connection_pool import dispose_engine
+    from infra.forecast_cache import reset_forecast_cache
+    from infra.http_client import reset_http_client
+    from infra.metrics import registry
+    from infra.response_cache import reset_response_cache
+
+    # As conexões abertas pelo mestre (migrações, aquecimento) não podem ser compartilhadas entre processos:
+    # pool do Postgres, sessão HTTP das APIs externas e conexão SQLite do cache de respostas
+    dispose_engine(close=False)
+    reset_http_client()
+    reset_response_cache()
+    reset_forecast_cache()
+    # As métricas do mestre (subida) ficariam somadas uma vez por worker
+    registry.reset_process()
+
+def post_worker_init(worker):
+    from infra.connection_pool import DB_POOL_SIZE, open_connections
+    from infra.metrics import registry
+    from presentation.controllers import get_job_manager
+
+    registry.start_snapshot_writer()
+    try:
+        open_connections(min(DB_POOL_SIZE, threads))
+    except Exception as e:
+        print(f"Não foi possível abrir as conexões do pool: {str(e)}")
+    # Todo worker acompanha as execuções: renova o heartbeat das suas e assume as de workers que pararam
+    try:
+        get_job_manager()
+    except Exception as e:
+        print(f"Não foi possível iniciar o gerenciador de execuções: {str(e)}")
+
+def worker_exit(server, worker):
+    from infra.metrics import registry
+
+    # Grava os últimos valores do worker, que seguem somados em /metrics depois que ele sai
+    try:
+        registry.write_snapshot()
+    except Exception as e:
+        print(f"Não foi possível gravar o retrato das métricas: {str(e)}")
@@ -0,0 +1,104 @@
+# app/infra/connection_pool.py
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from infra.metrics import DB_POOL_EVENTS, DB_POOL_WAIT_SECONDS, registry
+
+# Conexões mantidas abertas, extras permitidas em picos e espera máxima por uma conexão livre
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+# Conexões mais antigas que isso são recriadas; o pre-ping descarta as que caíram antes do uso
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def _create_engine() -> Engine:
+    engine = create_engine(
+        os.getenv("DATABASE_URL"),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_POOL_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=DB_POOL_PRE_PING
+    )
+    event.listen(engine, "connect", lambda *args: DB_POOL_EVENTS.inc("connect"))
+    event.listen(engine, "invalidate", lambda *args: DB_POOL_EVENTS.inc("invalidate"))
+    return engine
+
+def get_engine() -> Engine:
+    """Retorna o engine (e pool de conexões) compartilhado pelo processo, configurado por DATABASE_URL"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_engine()
+    return _engine
+
+def borrow_connection():
+    """Empresta uma conexão psycopg2 do pool; `close()` a devolve (com rollback do que não foi confirmado)"""
+    start = time.perf_counter()
+    try:
+        connection = get_engine().raw_connection()
+    except PoolTimeoutError:
+        DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start, "timeout")
+        raise
+    DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start, "ok")
+    return connection
+
+registry.gauge("db_pool_checked_out", "Conexões do pool emprestadas no momento",
+               lambda: _engine.pool.checkedout() if _engine is not None else None)
+registry.gauge("db_pool_idle", "Conexões do pool ociosas no momento",
+               lambda: _engine.pool.checkedin() if _engine is not None else None)
+
+def open_connections(count: int = DB_POOL_SIZE):
+    """Abre `count` conexões de uma vez e as devolve ao pool, para que os primeiros pedidos não paguem a conexão"""
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(borrow_connection())
+    finally:
+        for connection in connections:
+            connection.close()
+
+def dispose_engine(close: bool = True):
+    """Descarta as conexões do pool; novas são abertas no próximo uso.
+
+    Em um processo filho criado por fork (workers do gunicorn), use `close=False`:
+    as conexões herdadas são abandonadas sem fechar os sockets, que continuam do processo pai.
+    """
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose(close=close)
+
+def pool_stats() -> Dict[str, Any]:
+    """Resumo do pool deste processo, a partir das métricas de /metrics e do estado atual do engine"""
+    checkouts, ok_seconds = DB_POOL_WAIT_SECONDS.totals("ok")
+    timeouts, timeout_seconds = DB_POOL_WAIT_SECONDS.totals("timeout")
+    waits, wait_seconds = checkouts + timeouts, ok_seconds + timeout_seconds
+    stats = {
+        "checkouts": checkouts,
+        "timeouts": timeouts,
+        "connects": int(DB_POOL_EVENTS.value("connect")),
+        "invalidated": int(DB_POOL_EVENTS.value("invalidate")),
+        "wait_total_seconds": round(wait_seconds, 4),
+        "wait_avg_seconds": round(wait_seconds / waits, 6) if waits else 0
+    }
+    if _engine is not None:
+        pool = _engine.pool
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": DB_POOL_MAX_OVERFLOW
+        })
+    return stats
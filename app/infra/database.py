@@ -1,12 +1,76 @@
 import os
-import psycopg2
-from psycopg2.extras import DictCursor
-from datetime import datetime
+import threading
+from psycopg2.extensions import cursor as PlainCursor
+from psycopg2.extras import DictCursor, Json, execute_values
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from infra.connection_pool import borrow_connection
+from infra.metrics import DB_STATEMENT_SECONDS, METRICS_ENABLED, sql_operation
+
+# Quantidade de linhas enviadas por comando nas cargas em lote
+BULK_BATCH_SIZE = int(os.getenv("DB_BULK_BATCH_SIZE", "1000"))
+
+MeasurementRow = Tuple[int, str, Union[datetime, str], Union[datetime, str], float]
+
+# Colunas de tbl_daily_features além da chave (ds_city, dt_date)
+DAILY_FEATURE_COLUMNS = [
+    "qt_avg_humidity", "qt_avg_temp_c", "qt_avg_vis_km", "qt_max_wind_kph", "qt_total_precip_mm", "qt_pressure_mb",
+    "qt_pm25", "qt_pm25_ma3", "qt_pm25_ma7", "qt_pm25_ma14", "qt_pm25_ema", "qt_pm25_std7", "qt_pm25_trend"
+]
+
+# Duração de um período de medição (/sensors/{id}/measurements/daily)
+MEASUREMENT_PERIOD = timedelta(days=1)
+
+# Origens das marcas d'água de ingestão (coluna ds_source de tbl_ingestion_watermarks)
+WATERMARK_MEASUREMENTS = "measurements"
+WATERMARK_WEATHER = "weather"
+
+# Meses de tbl_measurements cuja partição já foi conferida por este processo
+_partition_months = set()
+_partition_months_lock = threading.Lock()
+# Se fn_ensure_measurement_partitions (migração 0002) existe no banco; conferido uma vez por processo
+_partitioning_available = None
+
+def _month_start(value: Union[datetime, str]) -> date:
+    """Primeiro dia do mês de uma data de medição (datetime ou texto ISO)"""
+    if isinstance(value, str):
+        return date(int(value[:4]), int(value[5:7]), 1)
+    return date(value.year, value.month, 1)
+
+def _batches(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Agrupa um iterável em listas de no máximo `size` elementos, sem materializá-lo"""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+class _TimedCursorMixin:
+    """Mede cada comando do cursor (inclusive os enviados por execute_values) no histograma de SQL"""
+    def execute(self, query, vars=None):
+        with DB_STATEMENT_SECONDS.time(sql_operation(query), stage="db"):
+            return super().execute(query, vars)
+
+class TimedCursor(_TimedCursorMixin, PlainCursor):
+    pass
+
+class TimedDictCursor(_TimedCursorMixin, DictCursor):
+    pass
+
+# Com as métricas desligadas os cursores são os do psycopg2, sem nenhuma camada extra
+CURSOR_FACTORY = TimedCursor if METRICS_ENABLED else PlainCursor
+DICT_CURSOR_FACTORY = TimedDictCursor if METRICS_ENABLED else DictCursor
 
 class Database:
+    """Acesso ao banco com uma conexão emprestada do pool do processo (devolvida em `close`)"""
     def __init__(self):
-        self.conn = psycopg2.connect(os.getenv('DATABASE_URL'))
-        self.cur = self.conn.cursor()
+        self.conn = borrow_connection()
+        self.cur = self.conn.cursor(cursor_factory=CURSOR_FACTORY)
+        self._closed = False
+        # Partições criadas na transação aberta; só passam a _partition_months após o commit
+        self._pending_partition_months = set()
 
     def check_measurement_exists(self, id_sensor: int, dt_date_from: datetime, dt_date_to: datetime):
         query = """
@@ -50,14 +114,416 @@ class Database:
                                    qt_avg_vis_km, qt_max_wind_kph, qt_total_precip_mm, 
                                    qt_pressure_mb))
 
+    def insert_measurements_bulk(self, rows: Iterable[MeasurementRow], batch_size: int = BULK_BATCH_SIZE) -> int:
+        """Insere medições em lote (id_sensor, ds_city, dt_date_from, dt_date_to, qt_pm25).
+
+        As linhas são consumidas em blocos de `batch_size` e enviadas com um único
+        INSERT por bloco; registros já existentes são ignorados pela constraint
+        natural da tabela. Retorna a quantidade de linhas efetivamente inseridas.
+        """
+        query = """
+            INSERT INTO public.tbl_measurements
+            (id_sensor, ds_city, dt_date_from, dt_date_to, qt_pm25)
+            VALUES %s
+            ON CONFLICT (id_sensor, dt_date_from, dt_date_to) DO NOTHING
+            RETURNING id
+        """
+        # As datas podem vir como datetime ou texto ISO com fuso (MeasurementBatch.to_rows)
+        template = "(%s, %s, %s::timestamptz, %s::timestamptz, %s)"
+        inserted = 0
+        for batch in _batches(rows, batch_size):
+            self.ensure_measurement_partitions(row[2] for row in batch)
+            inserted += len(execute_values(self.cur, query, batch, template=template, page_size=len(batch), fetch=True))
+        return inserted
+
+    def ensure_measurement_partitions(self, dates: Iterable[Union[datetime, str]]):
+        """Garante as partições mensais de tbl_measurements para as datas informadas.
+
+        Só consulta o banco para meses ainda não conferidos pelo processo; linhas de
+        meses sem partição cairiam na partição padrão. Os meses só são dados como
+        conferidos no commit, pois um rollback desfaz as partições criadas. Sem a
+        migração 0002 (ex.: DB_MIGRATE_ON_STARTUP=false) a tabela não é particionada
+        e nada é feito.
+        """
+        months = {_month_start(value) for value in dates} - self._pending_partition_months
+        with _partition_months_lock:
+            missing = months - _partition_months
+        if not missing or not self._partitioning_available():
+            return
+        self.cur.execute("SELECT public.fn_ensure_measurement_partitions(%s, %s)", (min(missing), max(missing)))
+        self._pending_partition_months.update(missing)
+
+    def _partitioning_available(self) -> bool:
+        global _partitioning_available
+        if _partitioning_available is None:
+            self.cur.execute("SELECT to_regprocedure('public.fn_ensure_measurement_partitions(timestamp, timestamp)') IS NOT NULL")
+            available = self.cur.fetchone()[0]
+            if not available:
+                print("Aviso: fn_ensure_measurement_partitions não existe (migrações pendentes); partições mensais não serão criadas")
+            _partitioning_available = available
+        return _partitioning_available
+
+    def insert_weather_history_bulk(self, rows: Iterable[Dict[str, Any]], batch_size: int = BULK_BATCH_SIZE) -> int:
+        """Insere em lote registros de clima no formato retornado por WeatherAPI.get_history.
+
+        Registros já existentes para (ds_city, dt_date) são ignorados. Retorna a
+        quantidade de linhas efetivamente inseridas.
+        """
+        query = """
+            INSERT INTO public.tbl_weather_history
+            (ds_city, dt_date, qt_avg_humidity, qt_avg_temp_c, qt_avg_vis_km,
+             qt_max_wind_kph, qt_total_precip_mm, qt_pressure_mb)
+            VALUES %s
+            ON CONFLICT (ds_city, dt_date) DO NOTHING
+            RETURNING id
+        """
+        values = (
+            (weather["city"], datetime.strptime(weather["date"], "%Y-%m-%d"), weather["avg_humidity"],
+             weather["avg_temp_c"], weather["avg_vis_km"], weather["max_wind_kph"],
+             weather["total_precip_mm"], weather["pressure_mb"])
+            for weather in rows
+        )
+        inserted = 0
+        for batch in _batches(values, batch_size):
+            inserted += len(execute_values(self.cur, query, batch, page_size=len(batch), fetch=True))
+        return inserted
+
+    def get_watermark(self, ds_source: str, ds_key: str) -> Optional[datetime]:
+        """Retorna a marca d'água de ingestão de um sensor/cidade.
+
+        Sem registro na tabela de estado, usa o maior período já gravado na
+        tabela de dados correspondente (bases carregadas antes desta tabela existir).
+        """
+        self.cur.execute(
+            "SELECT dt_watermark FROM public.tbl_ingestion_watermarks WHERE ds_source = %s AND ds_key = %s",
+            (ds_source, ds_key)
+        )
+        row = self.cur.fetchone()
+        if row:
+            return row[0]
+
+        if ds_source == WATERMARK_MEASUREMENTS:
+            self.cur.execute("SELECT MAX(dt_date_from) FROM public.tbl_measurements WHERE id_sensor = %s", (int(ds_key),))
+        elif ds_source == WATERMARK_WEATHER:
+            self.cur.execute("SELECT MAX(dt_date) FROM public.tbl_weather_history WHERE ds_city = %s", (ds_key,))
+        else:
+            return None
+        value = self.cur.fetchone()[0]
+        if value is not None and not isinstance(value, datetime):
+            value = datetime.combine(value, datetime.min.time())
+        return value
+
+    def get_measurement_coverage(self, id_sensor: int, dt_from: datetime, dt_to: datetime) -> List[Tuple[datetime, datetime]]:
+        """Trechos já ingeridos do sensor que cruzam [dt_from, dt_to): (início, fim) em ordem, já unidos"""
+        self.cur.execute(
+            """
+            SELECT dt_from, dt_to FROM public.tbl_measurement_coverage
+            WHERE id_sensor = %s AND dt_from < %s AND dt_to > %s
+            ORDER BY dt_from
+            """,
+            (id_sensor, dt_to, dt_from)
+        )
+        coverage = []
+        for start, end in self.cur.fetchall():
+            if coverage and start <= coverage[-1][1]:
+                coverage[-1] = (coverage[-1][0], max(coverage[-1][1], end))
+            else:
+                coverage.append((start, end))
+        return coverage
+
+    def add_measurement_coverage(self, id_sensor: int, dt_from: datetime, dt_to: datetime):
+        """Registra como ingeridos os períodos do sensor com início em [dt_from, dt_to); efetivado no commit.
+
+        Só entram períodos já encerrados (o do dia corrente ainda muda), e o trecho
+        é unido aos que ele encosta ou sobrepõe.
+        """
+        dt_to = min(dt_to, datetime.now(timezone.utc).replace(tzinfo=None) - MEASUREMENT_PERIOD)
+        if dt_to <= dt_from:
+            return
+        query = """
+            WITH merged AS (
+                DELETE FROM public.tbl_measurement_coverage
+                WHERE id_sensor = %(id_sensor)s AND dt_from <= %(dt_to)s AND dt_to >= %(dt_from)s
+                RETURNING dt_from, dt_to
+            )
+            INSERT INTO public.tbl_measurement_coverage (id_sensor, dt_from, dt_to)
+            SELECT %(id_sensor)s, LEAST(%(dt_from)s, MIN(dt_from)), GREATEST(%(dt_to)s, MAX(dt_to)) FROM merged
+        """
+        self.cur.execute(query, {"id_sensor": id_sensor, "dt_from": dt_from, "dt_to": dt_to})
+
+    def get_measurements(self, id_sensor: int, dt_from: datetime, dt_to: datetime) -> List[tuple]:
+        """(dt_date_from, dt_date_to, qt_pm25) gravados do sensor com dt_date_from em [dt_from, dt_to), em ordem"""
+        query = """
+            SELECT dt_date_from, dt_date_to, qt_pm25 FROM public.tbl_measurements
+            WHERE id_sensor = %s AND dt_date_from >= %s AND dt_date_from < %s
+            ORDER BY dt_date_from
+        """
+        self.cur.execute(query, (id_sensor, dt_from, dt_to))
+        return self.cur.fetchall()
+
+    def set_watermark(self, ds_source: str, ds_key: str, dt_watermark: datetime):
+        """Avança a marca d'água (nunca a recua); efetivada junto com o commit dos dados"""
+        query = """
+            INSERT INTO public.tbl_ingestion_watermarks (ds_source, ds_key, dt_watermark, dt_updated)
+            VALUES (%s, %s, %s, now())
+            ON CONFLICT (ds_source, ds_key) DO UPDATE
+            SET dt_watermark = GREATEST(tbl_ingestion_watermarks.dt_watermark, EXCLUDED.dt_watermark),
+                dt_updated = now()
+        """
+        self.cur.execute(query, (ds_source, ds_key, dt_watermark))
+
+    def mark_features_pending(self, ds_city: str, dt_since: date):
+        """Registra que as features da cidade precisam ser recalculadas a partir de `dt_since`"""
+        query = """
+            INSERT INTO public.tbl_daily_features_pending (ds_city, dt_since)
+            VALUES (%s, %s)
+            ON CONFLICT (ds_city) DO UPDATE
+            SET dt_since = LEAST(tbl_daily_features_pending.dt_since, EXCLUDED.dt_since)
+        """
+        self.cur.execute(query, (ds_city, dt_since))
+
+    def get_features_pending(self, ds_city: Optional[str] = None) -> Dict[str, date]:
+        if ds_city is None:
+            self.cur.execute("SELECT ds_city, dt_since FROM public.tbl_daily_features_pending")
+        else:
+            self.cur.execute("SELECT ds_city, dt_since FROM public.tbl_daily_features_pending WHERE ds_city = %s", (ds_city,))
+        return dict(self.cur.fetchall())
+
+    def clear_features_pending(self, ds_city: str, dt_since: date):
+        # Uma marcação mais antiga gravada nesse meio-tempo por outra execução é preservada
+        self.cur.execute(
+            "DELETE FROM public.tbl_daily_features_pending WHERE ds_city = %s AND dt_since >= %s",
+            (ds_city, dt_since)
+        )
+
+    def get_daily_feature_source(self, ds_city: str, dt_since: Optional[date] = None) -> List[tuple]:
+        """Clima do dia + média diária de PM2.5 da cidade (dias com ambos), em ordem de data"""
+        query = """
+            SELECT w.dt_date, w.qt_avg_humidity, w.qt_avg_temp_c, w.qt_avg_vis_km, w.qt_max_wind_kph,
+                   w.qt_total_precip_mm, w.qt_pressure_mb, m.qt_pm25
+            FROM public.tbl_weather_history w
+            JOIN (
+                SELECT dt_date_from::date AS dt_date, AVG(qt_pm25) AS qt_pm25
+                FROM public.tbl_measurements
+                WHERE ds_city = %(city)s AND (%(since)s::date IS NULL OR dt_date_from >= %(since)s::date)
+                GROUP BY dt_date_from::date
+            ) m ON m.dt_date = w.dt_date
+            WHERE w.ds_city = %(city)s AND (%(since)s::date IS NULL OR w.dt_date >= %(since)s::date)
+            ORDER BY w.dt_date
+        """
+        self.cur.execute(query, {"city": ds_city, "since": dt_since})
+        return self.cur.fetchall()
+
+    def get_daily_features(self, ds_city: str, dt_before: Optional[date] = None, limit: int = 14) -> List[Dict[str, Any]]:
+        """Últimas `limit` linhas de features da cidade (anteriores a `dt_before`), em ordem de data"""
+        query = """
+            SELECT * FROM (
+                SELECT * FROM public.tbl_daily_features
+                WHERE ds_city = %(city)s AND (%(before)s::date IS NULL OR dt_date < %(before)s::date)
+                ORDER BY dt_date DESC
+                LIMIT %(limit)s
+            ) latest
+            ORDER BY dt_date
+        """
+        with self.conn.cursor(cursor_factory=DICT_CURSOR_FACTORY) as cur:
+            cur.execute(query, {"city": ds_city, "before": dt_before, "limit": limit})
+            return [dict(row) for row in cur.fetchall()]
+
+    def get_daily_features_watermark(self, ds_city: str) -> Optional[str]:
+        """Identifica a última atualização das features da cidade (toda atualização recalcula a linha mais recente)"""
+        self.cur.execute(
+            "SELECT dt_date, dt_updated FROM public.tbl_daily_features WHERE ds_city = %s ORDER BY dt_date DESC LIMIT 1",
+            (ds_city,)
+        )
+        row = self.cur.fetchone()
+        return f"{row[0].isoformat()}@{row[1].isoformat()}" if row else None
+
+    def get_daily_features_many(self, cities: List[str], limit: int = 14) -> Dict[str, List[Dict[str, Any]]]:
+        """Últimas `limit` linhas de features de cada cidade, em uma única consulta"""
+        query = """
+            SELECT * FROM (
+                SELECT f.*, ROW_NUMBER() OVER (PARTITION BY ds_city ORDER BY dt_date DESC) AS nr_row
+                FROM public.tbl_daily_features f
+                WHERE ds_city = ANY(%s)
+            ) latest
+            WHERE nr_row <= %s
+            ORDER BY ds_city, dt_date
+        """
+        features: Dict[str, List[Dict[str, Any]]] = {city: [] for city in cities}
+        with self.conn.cursor(cursor_factory=DICT_CURSOR_FACTORY) as cur:
+            cur.execute(query, (list(cities), limit))
+            for row in cur.fetchall():
+                row = dict(row)
+                row.pop("nr_row")
+                features[row["ds_city"]].append(row)
+        return features
+
+    def upsert_daily_features(self, ds_city: str, rows: Iterable[Dict[str, Any]], batch_size: int = BULK_BATCH_SIZE) -> int:
+        columns = DAILY_FEATURE_COLUMNS
+        query = f"""
+            INSERT INTO public.tbl_daily_features (ds_city, dt_date, {", ".join(columns)})
+            VALUES %s
+            ON CONFLICT (ds_city, dt_date) DO UPDATE
+            SET {", ".join(f"{column} = EXCLUDED.{column}" for column in columns)}, dt_updated = now()
+        """
+        total = 0
+        values = ((ds_city, row["dt_date"], *(row[column] for column in columns)) for row in rows)
+        for batch in _batches(values, batch_size):
+            execute_values(self.cur, query, batch, page_size=len(batch))
+            total += len(batch)
+        return total
+
+    def get_daily_feature_cities(self) -> List[str]:
+        self.cur.execute("SELECT DISTINCT ds_city FROM public.tbl_daily_features")
+        return [row[0] for row in self.cur.fetchall()]
+
+    def save_job(self, id_job: str, ds_status: str, js_params: Dict[str, Any],
+                 js_progress: Optional[Dict[str, Any]] = None, ds_error: Optional[str] = None,
+                 ds_owner: Optional[str] = None):
+        """Grava (ou atualiza) o estado de uma execução do orquestrador, renovando o heartbeat do dono"""
+        query = """
+            INSERT INTO public.tbl_orchestrator_jobs
+            (id_job, ds_status, js_params, js_progress, ds_error, ds_owner, dt_heartbeat)
+            VALUES (%s, %s, %s, %s, %s, %s, now())
+            ON CONFLICT (id_job) DO UPDATE
+            SET ds_status = EXCLUDED.ds_status,
+                js_params = EXCLUDED.js_params,
+                js_progress = EXCLUDED.js_progress,
+                ds_error = EXCLUDED.ds_error,
+                ds_owner = COALESCE(EXCLUDED.ds_owner, tbl_orchestrator_jobs.ds_owner),
+                dt_heartbeat = now(),
+                dt_updated = now()
+        """
+        self.cur.execute(query, (id_job, ds_status, Json(js_params), Json(js_progress), ds_error, ds_owner))
+
+    def lock_jobs(self):
+        """Serializa, até o fim da transação, as decisões sobre os limites de execuções entre processos"""
+        self.cur.execute("SELECT pg_advisory_xact_lock(hashtext('tbl_orchestrator_jobs'))")
+
+    def count_jobs(self, statuses: List[str], alive_seconds: Optional[float] = None) -> int:
+        """Execuções nos status informados; com `alive_seconds`, só as de dono com heartbeat recente"""
+        query = "SELECT COUNT(*) FROM public.tbl_orchestrator_jobs WHERE ds_status = ANY(%s)"
+        params: list = [list(statuses)]
+        if alive_seconds is not None:
+            query += " AND dt_heartbeat > now() - make_interval(secs => %s)"
+            params.append(alive_seconds)
+        self.cur.execute(query, params)
+        return self.cur.fetchone()[0]
+
+    def set_job_status(self, id_job: str, ds_status: str):
+        self.cur.execute(
+            "UPDATE public.tbl_orchestrator_jobs SET ds_status = %s, dt_heartbeat = now(), dt_updated = now() WHERE id_job = %s",
+            (ds_status, id_job)
+        )
+
+    def request_job_cancel(self, id_job: str, statuses: List[str]) -> bool:
+        """Marca o pedido de cancelamento de uma execução em aberto; o processo dono o atende"""
+        self.cur.execute(
+            """
+            UPDATE public.tbl_orchestrator_jobs SET dt_cancel_requested = COALESCE(dt_cancel_requested, now())
+            WHERE id_job = %s AND ds_status = ANY(%s)
+            """,
+            (id_job, list(statuses))
+        )
+        return self.cur.rowcount > 0
+
+    def heartbeat_jobs(self, id_jobs: List[str], ds_owner: str) -> List[str]:
+        """Renova o heartbeat das execuções do processo; retorna as que tiveram cancelamento pedido"""
+        self.cur.execute(
+            """
+            UPDATE public.tbl_orchestrator_jobs SET dt_heartbeat = now()
+            WHERE id_job = ANY(%s) AND ds_owner = %s
+            RETURNING id_job, dt_cancel_requested IS NOT NULL
+            """,
+            (list(id_jobs), ds_owner)
+        )
+        return [id_job for id_job, cancel_requested in self.cur.fetchall() if cancel_requested]
+
+    def claim_stale_jobs(self, ds_owner: str, statuses: List[str], stale_seconds: float, limit: int) -> List[Dict[str, Any]]:
+        """Assume as execuções em aberto cujo dono parou de renovar o heartbeat (processo encerrado)"""
+        query = """
+            UPDATE public.tbl_orchestrator_jobs SET ds_owner = %s, dt_heartbeat = now()
+            WHERE id_job IN (
+                SELECT id_job FROM public.tbl_orchestrator_jobs
+                WHERE ds_status = ANY(%s)
+                  AND ds_owner IS DISTINCT FROM %s
+                  AND (dt_heartbeat IS NULL OR dt_heartbeat < now() - make_interval(secs => %s))
+                ORDER BY dt_created
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id_job, ds_status, js_params, js_progress, ds_error, dt_created, dt_updated,
+                      dt_cancel_requested IS NOT NULL AS fl_cancel_requested
+        """
+        with self.conn.cursor(cursor_factory=DICT_CURSOR_FACTORY) as cur:
+            cur.execute(query, (ds_owner, list(statuses), ds_owner, stale_seconds, limit))
+            return [dict(row) for row in cur.fetchall()]
+
+    def get_jobs(self, id_job: Optional[str] = None, statuses: Optional[List[str]] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Consulta execuções do orquestrador, das mais recentes para as mais antigas"""
+        conditions, params = [], []
+        if id_job is not None:
+            conditions.append("id_job = %s")
+            params.append(id_job)
+        if statuses:
+            conditions.append("ds_status = ANY(%s)")
+            params.append(list(statuses))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+            SELECT id_job, ds_status, js_params, js_progress, ds_error, dt_created, dt_updated
+            FROM public.tbl_orchestrator_jobs
+            {where}
+            ORDER BY dt_created DESC
+            LIMIT %s
+        """
+        with self.conn.cursor(cursor_factory=DICT_CURSOR_FACTORY) as cur:
+            cur.execute(query, (*params, limit))
+            return [dict(row) for row in cur.fetchall()]
+
+    def ensure_schema_migrations(self):
+        self.cur.execute("""
+            CREATE TABLE IF NOT EXISTS public.schema_migrations (
+                ds_version varchar(250) NOT NULL,
+                dt_applied timestamp NOT NULL DEFAULT now(),
+                CONSTRAINT pk_schema_migrations PRIMARY KEY (ds_version)
+            )
+        """)
+
+    def get_applied_migrations(self) -> List[str]:
+        self.cur.execute("SELECT ds_version FROM public.schema_migrations ORDER BY ds_version")
+        return [row[0] for row in self.cur.fetchall()]
+
+    def apply_migration(self, ds_version: str, sql: str):
+        """Executa o script de uma migração e a registra em schema_migrations; não faz commit"""
+        self.cur.execute(sql)
+        self.cur.execute("INSERT INTO public.schema_migrations (ds_version) VALUES (%s)", (ds_version,))
+
+    def advisory_lock(self, key: int):
+        """Trava de sessão do Postgres, para tarefas que só um processo deve executar por vez"""
+        self.cur.execute("SELECT pg_advisory_lock(%s)", (key,))
+
+    def advisory_unlock(self, key: int):
+        self.cur.execute("SELECT pg_advisory_unlock(%s)", (key,))
+
     def commit(self):
-        self.conn.commit()
+        with DB_STATEMENT_SECONDS.time("COMMIT", stage="db"):
+            self.conn.commit()
+        if self._pending_partition_months:
+            with _partition_months_lock:
+                _partition_months.update(self._pending_partition_months)
+            self._pending_partition_months.clear()
 
     def rollback(self):
-        self.conn.rollback()
+        self._pending_partition_months.clear()
+        with DB_STATEMENT_SECONDS.time("ROLLBACK", stage="db"):
+            self.conn.rollback()
+
+    def close(self):
+        if getattr(self, '_closed', True):
+            return
+        self._closed = True
+        self.cur.close()
+        self.conn.close()
 
     def __del__(self):
-        if hasattr(self, 'cur'):
-            self.cur.close()
-        if hasattr(self, 'conn'):
-            self.conn.close() 
\ No newline at end of file
+        self.close() 
\ No newline at end of file
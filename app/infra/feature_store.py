@@ -0,0 +1,98 @@
+# app/infra/feature_store.py
+from datetime import date
+from statistics import fmean, stdev
+from typing import Any, Dict, List, Optional
+from infra.database import Database
+from infra.forecast_cache import get_forecast_cache
+
+# Maior janela móvel usada pelo modelo (qt_pm25_ma14)
+FEATURE_WINDOW = 14
+# Suavização exponencial de qt_pm25_ema (equivale a ewm(span=7, adjust=False) do pandas)
+EMA_ALPHA = 2 / (7 + 1)
+
+WEATHER_COLUMNS = [
+    "qt_avg_humidity", "qt_avg_temp_c", "qt_avg_vis_km", "qt_max_wind_kph", "qt_total_precip_mm", "qt_pressure_mb"
+]
+
+class FeatureStore:
+    """Features diárias por cidade do modelo de PM2.5, materializadas em tbl_daily_features.
+
+    Cada linha junta o clima do dia à média diária de PM2.5 e guarda as janelas
+    móveis (MA3/MA7/MA14, EMA, desvio padrão de 7 dias e tendência) calculadas
+    sobre as linhas anteriores da cidade. A atualização é incremental: recalcula
+    apenas a partir da data marcada como pendente, partindo do estado das 13
+    linhas anteriores já gravadas.
+    """
+    def __init__(self, database: Database):
+        self.database = database
+
+    def mark_pending(self, ds_city: str, since: date):
+        """Marca a cidade para atualização; gravado na mesma transação dos dados novos"""
+        self.database.mark_features_pending(ds_city, since)
+
+    def refresh_pending(self, ds_city: Optional[str] = None) -> Dict[str, int]:
+        """Atualiza as cidades marcadas como pendentes (ou só `ds_city`) e confirma cada uma"""
+        pending = self.database.get_features_pending(ds_city)
+        self.database.commit()
+        refreshed = {}
+        for city, since in pending.items():
+            try:
+                refreshed[city] = self.refresh_city(city, since)
+                self.database.clear_features_pending(city, since)
+                self.database.commit()
+                get_forecast_cache().invalidate_city(city)
+            except Exception as e:
+                print(f"Erro ao atualizar as features da cidade {city}: {str(e)}")
+                self.database.rollback()
+        return refreshed
+
+    def refresh_city(self, ds_city: str, since: Optional[date] = None) -> int:
+        """Recalcula as features da cidade a partir de `since` (None = histórico inteiro); não faz commit"""
+        if since is not None and not self.database.get_daily_features(ds_city, limit=1):
+            since = None
+        previous = self.database.get_daily_features(ds_city, dt_before=since, limit=FEATURE_WINDOW - 1) if since else []
+        window = [row["qt_pm25"] for row in previous]
+        ema = previous[-1]["qt_pm25_ema"] if previous else None
+
+        rows = []
+        for source in self.database.get_daily_feature_source(ds_city, since):
+            row = {"dt_date": source[0], **{column: float(value) for column, value in zip(WEATHER_COLUMNS, source[1:7])}}
+            pm25 = float(source[7])
+            window = (window + [pm25])[-FEATURE_WINDOW:]
+            ema = pm25 if ema is None else EMA_ALPHA * pm25 + (1 - EMA_ALPHA) * ema
+            last7 = window[-7:]
+            row.update({
+                "qt_pm25": pm25,
+                "qt_pm25_ma3": fmean(window[-3:]),
+                "qt_pm25_ma7": fmean(last7),
+                "qt_pm25_ma14": fmean(window),
+                "qt_pm25_ema": ema,
+                "qt_pm25_std7": stdev(last7) if len(last7) > 1 else 0.0,
+            })
+            row["qt_pm25_trend"] = row["qt_pm25_ma7"] - row["qt_pm25_ma3"]
+            rows.append(row)
+        return self.database.upsert_daily_features(ds_city, rows)
+
+    def latest(self, ds_city: str, limit: int = FEATURE_WINDOW) -> List[Dict[str, Any]]:
+        """Últimas `limit` linhas de features da cidade, em ordem de data"""
+        rows = self.database.get_daily_features(ds_city, limit=limit)
+        self.database.rollback()
+        return rows
+
+    def latest_many(self, cities: List[str], limit: int = FEATURE_WINDOW) -> Dict[str, List[Dict[str, Any]]]:
+        """Últimas `limit` linhas de features de várias cidades, lidas de uma vez"""
+        rows = self.database.get_daily_features_many(cities, limit=limit)
+        self.database.rollback()
+        return rows
+
+    def watermark(self, ds_city: str) -> Optional[str]:
+        """Marca d'água das features da cidade (muda a cada atualização); None se ainda não há features"""
+        watermark = self.database.get_daily_features_watermark(ds_city)
+        self.database.rollback()
+        return watermark
+
+    def cities(self) -> List[str]:
+        """Cidades com features, na ordem das colunas ds_city_* do one-hot do modelo"""
+        cities = sorted(self.database.get_daily_feature_cities())
+        self.database.rollback()
+        return cities
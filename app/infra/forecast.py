@@ -0,0 +1,153 @@
+# app/infra/forecast.py
+# Previsão de PM2.5: modelo, pandas e RecursiveForecaster. Importado só no primeiro pedido de previsão
+# ou no aquecimento da API, para que processos que não preveem não carreguem a pilha de ML.
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+import pandas as pd
+from infra.database import Database
+from infra.feature_store import FeatureStore
+from infra.forecast_cache import get_forecast_cache
+from infra.forecaster import RecursiveForecaster, steps_until
+from infra.metrics import FORECAST_CACHE_REQUESTS, forecast_stage
+from infra.model_registry import get_model_registry
+from infra.openaq_api import WeatherAPI, WEATHER_FETCH_MAX_WORKERS
+
+class PM25Forecaster:
+    """Previsão de PM2.5 a partir das features gravadas (tbl_daily_features) e da previsão do tempo da WeatherAPI"""
+    def __init__(self, weather_api: WeatherAPI = None, forecast_cache=None):
+        self.weather_api = weather_api or WeatherAPI()
+        self.forecast_cache = forecast_cache or get_forecast_cache()
+
+    def _load_forecast_histories(self, cities: List[str]) -> Tuple[Dict[str, List[dict]], List[str]]:
+        """Últimas linhas de features de cada cidade (tbl_daily_features) e as cidades do one-hot, com uma conexão"""
+        database = Database()
+        try:
+            feature_store = FeatureStore(database)
+            histories = feature_store.latest_many(cities)
+            for city in cities:
+                if not histories[city]:
+                    # base carregada antes de existir a tabela de features: calcula a cidade uma única vez
+                    feature_store.refresh_city(city)
+                    database.commit()
+                    histories[city] = feature_store.latest(city)
+            all_cities = feature_store.cities()
+        finally:
+            database.close()
+        return histories, all_cities
+
+    def forecast_pm25(self, city: str, date_str: str, model=None):
+        """Obtém a previsão do pm 2.5 na cidade e data escolhidas.
+
+        Sem `model`, usa o modelo mantido em memória pelo registro de modelos.
+        """
+        if model is None:
+            model = get_model_registry().get().model
+
+        with forecast_stage("features"):
+            histories, cities = self._load_forecast_histories([city])
+        history = histories[city]
+        if not history:
+            raise ValueError(f"Sem dados históricos para a cidade {city}")
+
+        # prevê dia a dia, do fim do histórico até a data pedida
+        last_date = history[-1]['dt_date']
+        horizon = steps_until(last_date, pd.to_datetime(date_str).to_pydatetime().date())
+        # a previsão do tempo de todo o horizonte é buscada antes; só o passo do modelo é sequencial
+        days = [last_date + timedelta(days=step) for step in range(1, horizon + 1)]
+        with forecast_stage("weather"):
+            weather_by_day = self.weather_api.get_future_range(city, days)
+        weather = [weather_by_day[day.isoformat()] for day in days]
+        forecaster = RecursiveForecaster(model, cities)
+        with forecast_stage("predict"):
+            trajectory = forecaster.forecast([city], [history], [weather])[0]
+        last_row = trajectory[-1] if trajectory else forecaster.history_row(city, history[-1])
+
+        return pd.DataFrame([last_row]).to_json(orient='records', index=False)
+
+    def forecast_pm25_cached(self, city: str, date_str: str, loaded_model) -> Tuple[str, bool]:
+        """forecast_pm25 com cache de resultados; retorna (previsão, se veio do cache).
+
+        A chave inclui a versão do modelo e a marca d'água das features da cidade,
+        então uma nova ingestão ou um novo modelo nunca reaproveitam resultados antigos.
+        """
+        with forecast_stage("cache_lookup"):
+            database = Database()
+            try:
+                watermark = FeatureStore(database).watermark(city)
+            finally:
+                database.close()
+            cached = self.forecast_cache.get(city, date_str, loaded_model.version, watermark) if watermark is not None else None
+        if cached is not None:
+            FORECAST_CACHE_REQUESTS.inc("hit")
+            return cached, True
+        FORECAST_CACHE_REQUESTS.inc("miss")
+        forecast = self.forecast_pm25(city, date_str, model=loaded_model.model)
+        if watermark is not None:
+            self.forecast_cache.set(city, date_str, loaded_model.version, watermark, forecast)
+        return forecast, False
+
+    def forecast_pm25_batch(self, cities: List[str], start_date: date, horizon: int, model=None) -> Dict[str, Any]:
+        """Previsão do pm 2.5 de várias cidades para os `horizon` dias a partir de `start_date`.
+
+        O histórico de todas as cidades é lido de uma vez, a previsão do tempo de
+        cada cidade é buscada por get_future_range (cidades em paralelo) e o modelo roda uma vez por dia
+        para todas as cidades. Cidades sem histórico ou sem previsão do tempo vão
+        para `errors`.
+        """
+        if model is None:
+            model = get_model_registry().get().model
+
+        with forecast_stage("features"):
+            histories, all_cities = self._load_forecast_histories(cities)
+        end_date = start_date + timedelta(days=horizon - 1)
+        errors = {city: "Sem dados históricos" for city in cities if not histories[city]}
+        days = {
+            city: [histories[city][-1]['dt_date'] + timedelta(days=step)
+                   for step in range(1, steps_until(histories[city][-1]['dt_date'], end_date) + 1)]
+            for city in cities if city not in errors
+        }
+        weather = {}
+        if days:
+            with forecast_stage("weather"), ThreadPoolExecutor(max_workers=min(WEATHER_FETCH_MAX_WORKERS, len(days))) as executor:
+                weather = dict(zip(days, executor.map(lambda city: self.weather_api.get_future_range(city, days[city]), days)))
+        for city, city_days in days.items():
+            if any(not weather[city][day.isoformat()] for day in city_days):
+                errors[city] = "Previsão do tempo indisponível"
+
+        series = [city for city in days if city not in errors]
+        with forecast_stage("predict"):
+            trajectories = RecursiveForecaster(model, all_cities).forecast(
+                series,
+                [histories[city] for city in series],
+                [[weather[city][day.isoformat()] for day in days[city]] for city in series]
+            )
+
+        forecasts = {}
+        for city, trajectory in zip(series, trajectories):
+            rows = [(day, row["qt_pm25"]) for day, row in zip(days[city], trajectory)]
+            # dias do intervalo que já têm histórico usam o valor observado
+            rows += [(row["dt_date"], float(row["qt_pm25"])) for row in histories[city]]
+            forecasts[city] = [
+                {"date": day.isoformat(), "qt_pm25": value}
+                for day, value in sorted(rows) if start_date <= day <= end_date
+            ]
+        return {"start_date": start_date.isoformat(), "horizon": horizon, "forecasts": forecasts, "errors": errors}
+
+def warm_up():
+    """Deixa o processo pronto para prever: modelo em memória, colunas das features e o modelo já exercitado.
+
+    Com o gunicorn em preload, roda no processo mestre e os workers herdam tudo
+    por copy-on-write após o fork.
+    """
+    try:
+        loaded_model = get_model_registry().get()
+    except OSError as e:
+        print(f"Modelo de PM2.5 indisponível na inicialização: {str(e)}")
+        return
+    database = Database()
+    try:
+        cities = FeatureStore(database).cities()
+    finally:
+        database.close()
+    RecursiveForecaster(loaded_model.model, cities).warm_up()
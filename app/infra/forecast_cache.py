@@ -0,0 +1,128 @@
+# app/infra/forecast_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from infra.response_cache import get_response_cache
+
+FORECAST_CACHE_ENABLED = os.getenv("FORECAST_CACHE_ENABLED", "true").lower() == "true"
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", "1024"))
+# A previsão usa a previsão do tempo, que também expira (WEATHER_FORECAST_CACHE_TTL_HOURS)
+FORECAST_CACHE_TTL_SECONDS = float(os.getenv("FORECAST_CACHE_TTL_SECONDS", "10800"))
+# Também guarda os resultados no cache SQLite de respostas, compartilhado entre processos
+FORECAST_CACHE_SHARED = os.getenv("FORECAST_CACHE_SHARED", "false").lower() == "true"
+
+class ForecastCache:
+    """Cache de resultados de /forecast_pm25 por (cidade, data, versão do modelo, marca d'água dos dados).
+
+    A marca d'água muda sempre que as features da cidade são recalculadas após
+    uma ingestão, de modo que entradas antigas deixam de ser encontradas mesmo
+    em outros processos; no processo que fez a ingestão elas também são
+    descartadas na hora (`invalidate_city`). A memória local é um LRU com TTL e,
+    opcionalmente, o cache de respostas em SQLite serve de segundo nível.
+    """
+    def __init__(self, max_entries: int = FORECAST_CACHE_MAX_ENTRIES, ttl_seconds: float = FORECAST_CACHE_TTL_SECONDS,
+                 shared=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _shared_endpoint(model_version: str, watermark: str) -> str:
+        return f"forecast_pm25:{model_version}:{watermark}"
+
+    def get(self, city: str, date_str: str, model_version: str, watermark: str) -> Optional[Any]:
+        key = (city, date_str, model_version, watermark)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+        if self.shared is not None:
+            value = self.shared.get(self._shared_endpoint(model_version, watermark), city, date_str)
+            if value is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                self._store(key, value, now)
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, city: str, date_str: str, model_version: str, watermark: str, value: Any):
+        self._store((city, date_str, model_version, watermark), value, time.monotonic())
+        if self.shared is not None:
+            self.shared.set(self._shared_endpoint(model_version, watermark), city, date_str, value,
+                            ttl_seconds=self.ttl_seconds)
+
+    def _store(self, key: tuple, value: Any, now: float):
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_city(self, city: str) -> int:
+        """Descarta as previsões em memória da cidade (chamado ao recalcular suas features)"""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == city]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0
+            }
+
+class NullForecastCache:
+    """Cache de previsões desligado (FORECAST_CACHE_ENABLED=false)"""
+    def get(self, city: str, date_str: str, model_version: str, watermark: str) -> Optional[Any]:
+        return None
+
+    def set(self, city: str, date_str: str, model_version: str, watermark: str, value: Any):
+        pass
+
+    def invalidate_city(self, city: str) -> int:
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": 0, "hits": 0, "shared_hits": 0, "misses": 0, "hit_ratio": 0}
+
+_forecast_cache = None
+_forecast_cache_lock = threading.Lock()
+
+def get_forecast_cache():
+    """Retorna o cache de previsões compartilhado pelo processo"""
+    global _forecast_cache
+    if _forecast_cache is None:
+        with _forecast_cache_lock:
+            if _forecast_cache is None:
+                if FORECAST_CACHE_ENABLED:
+                    _forecast_cache = ForecastCache(shared=get_response_cache() if FORECAST_CACHE_SHARED else None)
+                else:
+                    _forecast_cache = NullForecastCache()
+    return _forecast_cache
+
+def reset_forecast_cache():
+    """Descarta o cache do processo, que guarda a referência ao cache de respostas (ver reset_response_cache)"""
+    global _forecast_cache
+    with _forecast_cache_lock:
+        _forecast_cache = None
@@ -0,0 +1,166 @@
+# app/infra/forecaster.py
+import math
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+
+# Maior janela móvel das features (qt_pm25_ma14)
+WINDOW = 14
+# Suavização de qt_pm25_ema (span=7, como no ewm(span=7, adjust=False) do treino)
+EMA_ALPHA = 2 / (7 + 1)
+
+WEATHER_FEATURES = ["qt_avg_humidity", "qt_avg_temp_c", "qt_avg_vis_km", "qt_max_wind_kph", "qt_total_precip_mm", "qt_pressure_mb"]
+# Campos de WeatherAPI.get_future correspondentes a WEATHER_FEATURES
+WEATHER_KEYS = ["avg_humidity", "avg_temp_c", "avg_vis_km", "max_wind_kph", "total_precip_mm", "pressure_mb"]
+ROLLING_FEATURES = ["qt_pm25_ma3", "qt_pm25_ma7", "qt_pm25_ma14", "qt_pm25_ema", "qt_pm25_std7", "qt_pm25_trend"]
+CALENDAR_FEATURES = ["dia_semana", "mes_ano", "estacao"]
+INTERACTION_FEATURES = ["temp_umidade", "pressao_umidade", "vento_umidade"]
+
+@lru_cache(maxsize=32)
+def _feature_columns(cities: Tuple[str, ...]) -> Tuple[str, ...]:
+    return tuple(WEATHER_FEATURES + ROLLING_FEATURES + CALENDAR_FEATURES + INTERACTION_FEATURES
+                 + [f"ds_city_{city}" for city in cities])
+
+def feature_columns(cities: Sequence[str]) -> List[str]:
+    """Colunas de entrada do modelo, na ordem do treino (montadas uma vez por conjunto de cidades)"""
+    return list(_feature_columns(tuple(cities)))
+
+def steps_until(last_date: date, target: date) -> int:
+    """Quantidade de dias a prever depois de `last_date` até alcançar `target`"""
+    return max(0, math.ceil((target - last_date) / timedelta(days=1)))
+
+class RecursiveForecaster:
+    """Previsão recursiva de PM2.5 dia a dia para uma ou mais séries (cidades) ao mesmo tempo.
+
+    Cada série guarda os últimos 14 valores de PM2.5 em um buffer circular e
+    somas acumuladas das janelas de 3, 7 e 14 dias, de modo que MA, EMA e
+    desvio padrão são atualizados em O(1) por passo. As features de todas as
+    séries ativas vão para um array pré-alocado e o modelo é chamado uma vez
+    por passo. A EMA continua recursivamente a partir da EMA histórica.
+    """
+    def __init__(self, model: Any, cities: Sequence[str]):
+        self.model = model
+        self.cities = list(cities)
+        self.columns = feature_columns(self.cities)
+        # Modelos treinados com DataFrame conferem os nomes das colunas
+        self._named_features = hasattr(model, "feature_names_in_")
+
+    def _init_state(self, histories: Sequence[List[Dict[str, Any]]]):
+        n_series = len(histories)
+        self._buffer = np.zeros((n_series, WINDOW))
+        self._head = np.zeros(n_series, dtype=np.int64)
+        self._count = np.zeros(n_series, dtype=np.int64)
+        self._sums = np.zeros((n_series, 3))
+        self._sumsq7 = np.zeros(n_series)
+        self._ema = np.zeros(n_series)
+        for series, history in enumerate(histories):
+            index = np.array([series])
+            for row in history[-WINDOW:]:
+                self._push(index, np.array([float(row["qt_pm25"])]))
+            self._ema[series] = float(history[-1]["qt_pm25_ema"])
+
+    def _push(self, index: np.ndarray, values: np.ndarray):
+        head = self._head[index]
+        count = self._count[index]
+        for column, window in enumerate((3, 7, WINDOW)):
+            leaving = np.where(count >= window, self._buffer[index, (head - window) % WINDOW], 0.0)
+            self._sums[index, column] += values - leaving
+            if window == 7:
+                self._sumsq7[index] += values ** 2 - leaving ** 2
+        self._buffer[index, head] = values
+        self._head[index] = (head + 1) % WINDOW
+        self._count[index] = np.minimum(count + 1, WINDOW)
+        self._ema[index] = EMA_ALPHA * values + (1 - EMA_ALPHA) * self._ema[index]
+
+    def _rolling(self, index: np.ndarray) -> np.ndarray:
+        """MA3, MA7, MA14, EMA, desvio padrão de 7 dias (0 com menos de 7 valores) e tendência"""
+        count = self._count[index]
+        ma3 = self._sums[index, 0] / np.minimum(count, 3)
+        ma7 = self._sums[index, 1] / np.minimum(count, 7)
+        ma14 = self._sums[index, 2] / count
+        variance = (self._sumsq7[index] - self._sums[index, 1] ** 2 / 7) / 6
+        std7 = np.where(count >= 7, np.sqrt(np.maximum(variance, 0.0)), 0.0)
+        return np.column_stack([ma3, ma7, ma14, self._ema[index], std7, ma7 - ma3])
+
+    def _predict(self, features: np.ndarray) -> np.ndarray:
+        if self._named_features:
+            import pandas as pd
+            features = pd.DataFrame(features, columns=self.columns)
+        return np.asarray(self.model.predict(features), dtype=float).reshape(-1)
+
+    def warm_up(self):
+        """Uma previsão com features zeradas, para que validação de colunas e inicialização do modelo não caiam no primeiro pedido"""
+        self._predict(np.zeros((1, len(self.columns))))
+
+    def _row(self, city: str, day: date, weather: np.ndarray, pm25: float, rolling: np.ndarray) -> Dict[str, Any]:
+        row = dict(zip(WEATHER_FEATURES, weather.tolist()))
+        row.update({"qt_pm25": pm25, "ano": day.year, "mes": day.month, "dia": day.day})
+        row.update(zip(ROLLING_FEATURES, rolling.tolist()))
+        row.update({"dia_semana": day.weekday(), "mes_ano": day.month, "estacao": day.month % 12 // 3 + 1})
+        row.update({
+            "temp_umidade": row["qt_avg_temp_c"] * row["qt_avg_humidity"],
+            "pressao_umidade": row["qt_pressure_mb"] * row["qt_avg_humidity"],
+            "vento_umidade": row["qt_max_wind_kph"] * row["qt_avg_humidity"]
+        })
+        row.update({f"ds_city_{other_city}": 1.0 if other_city == city else 0.0 for other_city in self.cities})
+        return row
+
+    def history_row(self, city: str, history_row: Dict[str, Any]) -> Dict[str, Any]:
+        """Linha histórica (tbl_daily_features) no mesmo formato das linhas previstas"""
+        return self._row(
+            city, history_row["dt_date"],
+            np.array([float(history_row[column]) for column in WEATHER_FEATURES]),
+            float(history_row["qt_pm25"]),
+            np.array([float(history_row[column]) for column in ROLLING_FEATURES])
+        )
+
+    def forecast(self, cities: Sequence[str], histories: Sequence[List[Dict[str, Any]]],
+                 weather: Sequence[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        """Prevê cada série por `len(weather[i])` dias seguidos ao fim do seu histórico.
+
+        `histories[i]` são as últimas linhas de features da cidade `cities[i]`, em
+        ordem de data; `weather[i]` traz a previsão do tempo de cada dia a prever.
+        Retorna a trajetória de cada série (uma linha por dia previsto).
+        """
+        n_series = len(cities)
+        steps = np.array([len(days) for days in weather])
+        self._init_state(histories)
+        last_dates = [history[-1]["dt_date"] for history in histories]
+        weather_values = np.zeros((n_series, int(steps.max(initial=0)), len(WEATHER_KEYS)))
+        for series, days in enumerate(weather):
+            for step, day in enumerate(days):
+                weather_values[series, step] = [float(day[key]) for key in WEATHER_KEYS]
+        one_hot = np.array([[1.0 if other_city == city else 0.0 for other_city in self.cities] for city in cities])
+
+        n_rolling = len(WEATHER_FEATURES)
+        n_calendar = n_rolling + len(ROLLING_FEATURES)
+        n_interaction = n_calendar + len(CALENDAR_FEATURES)
+        n_city = n_interaction + len(INTERACTION_FEATURES)
+        buffer = np.empty((n_series, len(self.columns)))
+        # O primeiro passo usa as médias da última linha histórica, como no laço antigo
+        # (com menos de 7 dias, o desvio padrão gravado não é recalculável a partir do buffer)
+        rolling = np.array([[float(history[-1][column]) for column in ROLLING_FEATURES] for history in histories])
+        trajectories: List[List[Dict[str, Any]]] = [[] for _ in range(n_series)]
+
+        for step in range(weather_values.shape[1]):
+            active = np.flatnonzero(steps > step)
+            days = [last_dates[series] + timedelta(days=step + 1) for series in active]
+            features = buffer[:len(active)]
+            current = weather_values[active, step]
+            features[:, :n_rolling] = current
+            features[:, n_rolling:n_calendar] = rolling[active]
+            features[:, n_calendar:n_interaction] = [(day.weekday(), day.month, day.month % 12 // 3 + 1) for day in days]
+            features[:, n_interaction] = current[:, 1] * current[:, 0]
+            features[:, n_interaction + 1] = current[:, 5] * current[:, 0]
+            features[:, n_interaction + 2] = current[:, 3] * current[:, 0]
+            features[:, n_city:] = one_hot[active]
+
+            predictions = self._predict(features)
+            self._push(active, predictions)
+            rolling[active] = self._rolling(active)
+            for position, series in enumerate(active):
+                trajectories[series].append(
+                    self._row(cities[series], days[position], current[position], float(predictions[position]), rolling[series])
+                )
+        return trajectories
@@ -0,0 +1,122 @@
+# app/infra/http_client.py
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from infra.metrics import HTTP_CLIENT_RETRIES, HTTP_CLIENT_SECONDS
+
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE_SECONDS = float(os.getenv("HTTP_BACKOFF_BASE_SECONDS", "0.5"))
+HTTP_BACKOFF_MAX_SECONDS = float(os.getenv("HTTP_BACKOFF_MAX_SECONDS", "30"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_MAX_CONCURRENCY_PER_HOST = int(os.getenv("HTTP_MAX_CONCURRENCY_PER_HOST", "8"))
+
+# Respostas que indicam falha transitória e merecem nova tentativa
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class HttpClient:
+    """Transporte HTTP compartilhado pelos clientes das APIs externas.
+
+    Reaproveita conexões (pool + keep-alive), limita requisições simultâneas por
+    host e repete falhas transitórias (429/5xx e erros de conexão) com backoff
+    exponencial com jitter, respeitando o cabeçalho Retry-After.
+    """
+    def __init__(self, timeout: float = HTTP_TIMEOUT_SECONDS, max_retries: int = HTTP_MAX_RETRIES,
+                 backoff_base: float = HTTP_BACKOFF_BASE_SECONDS, backoff_max: float = HTTP_BACKOFF_MAX_SECONDS,
+                 pool_maxsize: int = HTTP_POOL_MAXSIZE, max_concurrency_per_host: int = HTTP_MAX_CONCURRENCY_PER_HOST):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_limit(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_concurrency_per_host)
+            return self._host_limits[host]
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(self.backoff_max, max(0.0, delay))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET com pool de conexões e novas tentativas; devolve a última resposta obtida"""
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlparse(url).netloc
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            with self._host_limit(host):
+                start = time.perf_counter()
+                try:
+                    response = self.session.get(url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout):
+                    elapsed = time.perf_counter() - start
+                    HTTP_CLIENT_SECONDS.observe(elapsed, host, "error", stage="http")
+                    if last_attempt:
+                        raise
+                    delay = self._backoff(attempt)
+                else:
+                    elapsed = time.perf_counter() - start
+                    HTTP_CLIENT_SECONDS.observe(elapsed, host, str(response.status_code), stage="http")
+                    if response.status_code not in RETRY_STATUSES or last_attempt:
+                        return response
+                    delay = self._retry_after(response)
+                    if delay is None:
+                        delay = self._backoff(attempt)
+                    response.close()
+            # a espera acontece fora do semáforo para não bloquear outras requisições ao host
+            HTTP_CLIENT_RETRIES.inc(host)
+            time.sleep(delay)
+
+_http_client = None
+_http_client_lock = threading.Lock()
+# Instâncias herdadas do processo pai: mantidas vivas para que o coletor não as feche no filho
+_http_client_inherited = []
+
+def get_http_client() -> HttpClient:
+    """Retorna o cliente HTTP compartilhado pelo processo"""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HttpClient()
+    return _http_client
+
+def reset_http_client():
+    """Descarta o cliente do processo; o próximo get_http_client() cria outro.
+
+    Em um processo filho criado por fork (workers do gunicorn), a sessão herdada
+    é abandonada sem ser fechada: seus sockets continuam do processo pai.
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client_inherited.append(_http_client)
+        _http_client = None
@@ -0,0 +1,404 @@
+# app/infra/metrics.py
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Coleta contadores, histogramas e tempos por etapa; desligada, cada ponto instrumentado custa só a checagem da flag
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Pasta compartilhada pelos processos da API (workers do gunicorn): cada um grava ali um retrato das suas
+# métricas e /metrics soma todos; sem ela, /metrics mostra só o processo que atendeu
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+# Intervalo entre as gravações do retrato de cada processo (o que atende /metrics grava o seu na hora)
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Devolvido por `time()` com as métricas desligadas, para não criar objetos no caminho quente
+_NOOP = nullcontext()
+
+# Tempo acumulado por etapa na requisição atual ({etapa: [segundos, ocorrências]}), para o cabeçalho Server-Timing
+_request_stages: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_stages", default=None)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+def begin_request():
+    """Inicia a contagem de tempo por etapa da requisição atual"""
+    _request_stages.set({})
+
+def request_stages() -> Dict[str, Tuple[float, int]]:
+    """Etapas registradas na requisição atual: {etapa: (segundos, ocorrências)}"""
+    stages = _request_stages.get()
+    return {name: (total, int(count)) for name, (total, count) in stages.items()} if stages else {}
+
+def record_stage(stage: str, seconds: float):
+    """Soma `seconds` à etapa da requisição atual (ignorado fora de uma requisição ou em outras threads)"""
+    stages = _request_stages.get()
+    if stages is None:
+        return
+    entry = stages.get(stage)
+    if entry is None:
+        stages[stage] = [seconds, 1]
+    else:
+        entry[0] += seconds
+        entry[1] += 1
+
+def server_timing(stages: Dict[str, Tuple[float, int]], total_seconds: Optional[float] = None) -> str:
+    """Valor do cabeçalho Server-Timing (durações em milissegundos)"""
+    parts = [f'{name};dur={seconds * 1000:.1f};desc="{count}x"' for name, (seconds, count) in stages.items()]
+    if total_seconds is not None:
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+class _Timer:
+    """Mede o bloco `with` e registra a duração no histograma e, se houver, na etapa da requisição"""
+    __slots__ = ("histogram", "labels", "stage", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Tuple[str, ...], stage: Optional[str]):
+        self.histogram = histogram
+        self.labels = labels
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels, stage=self.stage)
+        return False
+
+class Counter:
+    """Contador monotônico por combinação de rótulos"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def state(self) -> list:
+        """Valores em formato JSON ([[rótulos, valor], ...]), para o retrato do processo"""
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    @staticmethod
+    def merge(values: Dict[Tuple[str, ...], float], state: list):
+        """Soma a `values` o estado de outro processo"""
+        for labels, value in state:
+            labels = tuple(labels)
+            values[labels] = values.get(labels, 0.0) + value
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def value(self, *labels: str) -> float:
+        """Valor atual neste processo para os rótulos informados"""
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def samples(self, values: Optional[Dict[Tuple[str, ...], float]] = None) -> List[str]:
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_number(value)}" for labels, value in sorted(values.items())]
+
+class Histogram:
+    """Histograma de durações (buckets cumulativos, soma e contagem) por combinação de rótulos"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # {rótulos: [contagem por bucket (+ o bucket +Inf), soma]}
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels: str, stage: Optional[str] = None):
+        if not METRICS_ENABLED:
+            return
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += seconds
+        if stage is not None:
+            record_stage(stage, seconds)
+
+    def time(self, *labels: str, stage: Optional[str] = None):
+        """Context manager que mede o bloco; `stage` também o soma ao Server-Timing da requisição"""
+        if not METRICS_ENABLED:
+            return _NOOP
+        return _Timer(self, labels, stage)
+
+    def state(self) -> list:
+        """Valores em formato JSON ([[rótulos, contagens por bucket, soma], ...]), para o retrato do processo"""
+        with self._lock:
+            return [[list(labels), list(counts), total] for labels, (counts, total) in self._values.items()]
+
+    @staticmethod
+    def merge(values: Dict[Tuple[str, ...], list], state: list):
+        """Soma a `values` o estado de outro processo (bucket a bucket)"""
+        for labels, counts, total in state:
+            labels = tuple(labels)
+            entry = values.get(labels)
+            if entry is None:
+                values[labels] = [list(counts), total]
+            else:
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def totals(self, *labels: str) -> Tuple[int, float]:
+        """(contagem, soma) neste processo para os rótulos informados"""
+        with self._lock:
+            entry = self._values.get(labels)
+            return (sum(entry[0]), entry[1]) if entry is not None else (0, 0.0)
+
+    def samples(self, values: Optional[Dict[Tuple[str, ...], list]] = None) -> List[str]:
+        if values is None:
+            with self._lock:
+                values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        lines = []
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class MetricsRegistry:
+    """Métricas do processo, exportadas no formato texto do Prometheus.
+
+    Com METRICS_MULTIPROC_DIR, cada processo grava periodicamente um retrato
+    (JSON) das suas métricas na pasta e `render` soma os de todos: contadores e
+    histogramas incluem os processos já encerrados (os totais não recuam quando
+    um worker é reciclado), e os gauges só os processos vivos.
+    """
+    def __init__(self):
+        self._metrics: List = []
+        self._gauges: List[Tuple[str, str, Callable[[], Optional[float]]]] = []
+        self._lock = threading.Lock()
+        self._snapshot_file = None
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, label_names, buckets)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], Optional[float]]):
+        """Valor lido na hora da exportação (`read` devolve None quando não há valor)"""
+        with self._lock:
+            self._gauges.append((name, documentation, read))
+
+    def _read_gauges(self) -> Dict[str, float]:
+        with self._lock:
+            gauges = list(self._gauges)
+        values = {}
+        for name, _, read in gauges:
+            try:
+                value = read()
+            except Exception as e:
+                print(f"Erro ao ler a métrica {name}: {str(e)}")
+                continue
+            if value is not None:
+                values[name] = value
+        return values
+
+    def reset_process(self):
+        """Zera as métricas herdadas do processo pai (após o fork) e passa a gravar em um retrato próprio"""
+        with self._lock:
+            metrics = list(self._metrics)
+            self._snapshot_file = None
+        for metric in metrics:
+            metric.reset()
+
+    def write_snapshot(self, path: Optional[str] = METRICS_MULTIPROC_DIR):
+        """Grava o retrato deste processo em `path` (troca atômica, para leitores nunca verem um arquivo pela metade)"""
+        if not path:
+            return
+        with self._lock:
+            metrics = list(self._metrics)
+            if self._snapshot_file is None:
+                # o pid pode ser reaproveitado por outro worker: o sufixo evita sobrescrever um retrato encerrado
+                self._snapshot_file = f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+            target = os.path.join(path, self._snapshot_file)
+        snapshot = {
+            "pid": os.getpid(),
+            "metrics": {metric.name: metric.state() for metric in metrics},
+            "gauges": self._read_gauges()
+        }
+        temporary = f"{target}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(snapshot, file)
+        os.replace(temporary, target)
+
+    def start_snapshot_writer(self, path: Optional[str] = METRICS_MULTIPROC_DIR, interval: float = METRICS_FLUSH_SECONDS):
+        """Grava o retrato do processo a cada `interval` segundos, em segundo plano"""
+        if not path:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_snapshot(path)
+                except Exception as e:
+                    print(f"Erro ao gravar o retrato das métricas: {str(e)}")
+
+        threading.Thread(target=run, name="metrics-snapshot", daemon=True).start()
+
+    @staticmethod
+    def clear_snapshots(path: Optional[str] = METRICS_MULTIPROC_DIR):
+        """Remove os retratos de uma execução anterior (chamado pelo mestre antes de criar os workers)"""
+        if not path:
+            return
+        for name in os.listdir(path):
+            if name.endswith(".json") or name.endswith(".tmp"):
+                os.remove(os.path.join(path, name))
+
+    def _read_snapshots(self, path: str) -> Tuple[Dict[str, dict], Dict[str, float]]:
+        """Soma os retratos de todos os processos: {métrica: valores} e {gauge: valor}"""
+        with self._lock:
+            metrics = {metric.name: metric for metric in self._metrics}
+        values = {name: {} for name in metrics}
+        gauges: Dict[str, float] = {}
+        for name in os.listdir(path):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(path, name), encoding="utf-8") as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError) as e:
+                print(f"Erro ao ler o retrato de métricas {name}: {str(e)}")
+                continue
+            for metric_name, state in snapshot["metrics"].items():
+                if metric_name in metrics:
+                    metrics[metric_name].merge(values[metric_name], state)
+            if _process_alive(snapshot["pid"]):
+                for gauge_name, value in snapshot["gauges"].items():
+                    gauges[gauge_name] = gauges.get(gauge_name, 0) + value
+        return values, gauges
+
+    def render(self) -> str:
+        with self._lock:
+            metrics, gauges = list(self._metrics), list(self._gauges)
+        if METRICS_MULTIPROC_DIR:
+            self.write_snapshot()
+            values, gauge_values = self._read_snapshots(METRICS_MULTIPROC_DIR)
+        else:
+            values, gauge_values = {}, self._read_gauges()
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(values.get(metric.name)))
+        for name, documentation, _ in gauges:
+            if name not in gauge_values:
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_number(gauge_values[name])}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+HTTP_SERVER_SECONDS = registry.histogram(
+    "http_server_request_duration_seconds", "Duração das requisições atendidas pela API",
+    ["method", "endpoint", "status"]
+)
+HTTP_CLIENT_SECONDS = registry.histogram(
+    "http_client_request_duration_seconds", "Duração de cada tentativa de requisição às APIs externas",
+    ["host", "status"]
+)
+HTTP_CLIENT_RETRIES = registry.counter(
+    "http_client_retries_total", "Novas tentativas de requisições às APIs externas", ["host"]
+)
+DB_STATEMENT_SECONDS = registry.histogram(
+    "db_statement_duration_seconds", "Duração dos comandos SQL, commits e rollbacks", ["operation"]
+)
+DB_POOL_WAIT_SECONDS = registry.histogram(
+    "db_pool_wait_duration_seconds", "Espera por uma conexão do pool (result: ok ou timeout)", ["result"]
+)
+DB_POOL_EVENTS = registry.counter(
+    "db_pool_connection_events_total", "Conexões do pool abertas e invalidadas", ["event"]
+)
+FORECAST_STAGE_SECONDS = registry.histogram(
+    "forecast_stage_duration_seconds", "Duração das etapas da previsão de PM2.5", ["stage"]
+)
+FORECAST_CACHE_REQUESTS = registry.counter(
+    "forecast_cache_requests_total", "Consultas ao cache de previsões por resultado", ["result"]
+)
+
+def forecast_stage(stage: str):
+    """Mede uma etapa da previsão (histograma por etapa e Server-Timing da requisição)"""
+    return FORECAST_STAGE_SECONDS.time(stage, stage=stage)
+
+# Primeiras palavras de comando aceitas como rótulo `operation` (as demais viram OTHER)
+_SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "CREATE", "ALTER", "DROP"}
+
+def sql_operation(query) -> str:
+    """Rótulo de um comando SQL pela primeira palavra (textos, bytes de execute_values ou sql.Composed)"""
+    # só o início do comando interessa (os de execute_values trazem milhares de linhas)
+    if isinstance(query, bytes):
+        query = query[:256].decode("ascii", errors="ignore")
+    if not isinstance(query, str):
+        return "OTHER"
+    words = query[:256].split(None, 1)
+    operation = words[0].upper() if words else ""
+    return operation if operation in _SQL_OPERATIONS else "OTHER"
@@ -0,0 +1,65 @@
+# app/infra/migrations.py
+import os
+import re
+from typing import List, Tuple
+from infra.database import Database
+
+# Scripts .sql aplicados em ordem de nome (ex.: 0001_descricao.sql) sobre o esquema de init.sql
+DB_MIGRATIONS_PATH = os.getenv(
+    "DB_MIGRATIONS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "docker", "postgres", "migrations")
+)
+# Aplica as migrações pendentes na subida da API
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"
+
+# Chave da trava (pg_advisory_lock) que impede dois processos de migrarem ao mesmo tempo
+MIGRATIONS_LOCK_KEY = 3_031_018
+
+_MIGRATION_FILE = re.compile(r"^(\d+)_[\w-]+\.sql$")
+
+def discover_migrations(path: str = DB_MIGRATIONS_PATH) -> List[Tuple[str, str]]:
+    """Lista (versão, caminho) dos scripts de migração, em ordem de versão"""
+    migrations = []
+    for name in sorted(os.listdir(path)):
+        if _MIGRATION_FILE.match(name):
+            migrations.append((name[:-len(".sql")], os.path.join(path, name)))
+    return migrations
+
+def run_migrations(path: str = DB_MIGRATIONS_PATH) -> List[str]:
+    """Aplica as migrações ainda não registradas em schema_migrations e retorna as aplicadas.
+
+    Cada migração roda na sua própria transação: se falhar, é desfeita e as
+    seguintes não são executadas.
+    """
+    database = Database()
+    applied_now = []
+    try:
+        database.advisory_lock(MIGRATIONS_LOCK_KEY)
+        try:
+            database.ensure_schema_migrations()
+            applied = set(database.get_applied_migrations())
+            database.commit()
+            for version, file_path in discover_migrations(path):
+                if version in applied:
+                    continue
+                print(f"Aplicando migração {version}")
+                with open(file_path, encoding="utf-8") as file:
+                    sql = file.read()
+                try:
+                    database.apply_migration(version, sql)
+                    database.commit()
+                except Exception:
+                    database.rollback()
+                    raise
+                applied_now.append(version)
+        finally:
+            database.advisory_unlock(MIGRATIONS_LOCK_KEY)
+            database.commit()
+    finally:
+        database.close()
+    return applied_now
+
+if __name__ == "__main__":
+    # python -m infra.migrations (a partir de app/)
+    applied = run_migrations()
+    print(f"Migrações aplicadas: {', '.join(applied) if applied else 'nenhuma pendente'}")
@@ -0,0 +1,97 @@
+# app/infra/model_registry.py
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from infra.metrics import forecast_stage
+
+MODEL_PATH = os.getenv("MODEL_PATH", "app/model.pkl")
+# Carrega os arrays do modelo com mmap (joblib.load(mmap_mode='r')), compartilhando páginas entre processos
+MODEL_MMAP = os.getenv("MODEL_MMAP", "false").lower() == "true"
+# Intervalo mínimo entre verificações do arquivo (mtime/tamanho) para recarga a quente
+MODEL_RELOAD_CHECK_SECONDS = float(os.getenv("MODEL_RELOAD_CHECK_SECONDS", "5"))
+
+class LoadedModel:
+    """Modelo carregado e seus metadados (versão = prefixo do sha256 do arquivo)"""
+    def __init__(self, model: Any, version: str, loaded_at: datetime, path: str):
+        self.model = model
+        self.version = version
+        self.loaded_at = loaded_at
+        self.path = path
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": self.version, "loaded_at": self.loaded_at.isoformat(), "path": self.path}
+
+class ModelRegistry:
+    """Mantém o modelo de PM2.5 em memória entre requisições.
+
+    O arquivo é lido uma única vez; depois disso, a cada `check_interval`
+    segundos compara-se mtime e tamanho e, se mudaram, o hash do conteúdo.
+    Só um hash diferente provoca a recarga, de modo que um `touch` não
+    desserializa o modelo de novo.
+    """
+    def __init__(self, path: str = MODEL_PATH, mmap: bool = MODEL_MMAP,
+                 check_interval: float = MODEL_RELOAD_CHECK_SECONDS):
+        self.path = path
+        self.mmap = mmap
+        self.check_interval = check_interval
+        self._loaded: Optional[LoadedModel] = None
+        self._stat = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _load(self, version: str) -> LoadedModel:
+        # joblib (e o scikit-learn que o modelo puxa) só é importado ao carregar o primeiro modelo
+        import joblib
+        with forecast_stage("model_load"):
+            model = joblib.load(self.path, mmap_mode="r" if self.mmap else None)
+        print(f"Modelo {self.path} carregado (versão {version})")
+        return LoadedModel(model, version, datetime.now(timezone.utc), self.path)
+
+    def get(self) -> LoadedModel:
+        """Retorna o modelo atual, recarregando-o se o arquivo tiver mudado"""
+        now = time.monotonic()
+        loaded = self._loaded
+        if loaded is not None and now - self._last_check < self.check_interval:
+            return loaded
+        with self._lock:
+            if self._loaded is not None and now - self._last_check < self.check_interval:
+                return self._loaded
+            try:
+                stat = os.stat(self.path)
+                current = (stat.st_mtime_ns, stat.st_size)
+                if self._loaded is None or current != self._stat:
+                    version = self._hash_file(self.path)[:12]
+                    if self._loaded is None or version != self._loaded.version:
+                        self._loaded = self._load(version)
+                    self._stat = current
+            except Exception as e:
+                # Arquivo sendo substituído ou inválido: segue com o modelo já carregado
+                if self._loaded is None:
+                    raise
+                print(f"Erro ao recarregar o modelo {self.path}: {str(e)}")
+            self._last_check = now
+            return self._loaded
+
+_model_registry = None
+_model_registry_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """Retorna o registro de modelos compartilhado pelo processo"""
+    global _model_registry
+    if _model_registry is None:
+        with _model_registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+    return _model_registry
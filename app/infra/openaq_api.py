@@ -1,15 +1,15 @@
 # app/infra/openaq_api.py
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
 from interfaces.sensor_repository import SensorRepository
 from interfaces.measurement_repository import MeasurementRepository
-from domain.models import Measurement
+from domain.models import Measurement, MeasurementBatch
+from infra.rate_limiter import TokenBucket
+from infra.http_client import HttpClient, get_http_client
+from infra.response_cache import get_response_cache
 import numpy as np
 from datetime import date, timedelta
-from flask import jsonify
-import pandas as pd
-import pickle
-from sqlalchemy import create_engine
-from sklearn.preprocessing import OneHotEncoder
+from zoneinfo import ZoneInfo
 import os
 from dotenv import load_dotenv
 
@@ -17,61 +17,142 @@ from dotenv import load_dotenv
 load_dotenv()
 OpenAQApi_key = os.getenv("X_API_KEY")
 weatherAPI_key = os.getenv("WEATHER_API_KEY")
-import joblib
+
+# Cota da OpenAQ por chave de API (padrão do plano gratuito: 60 requisições por minuto)
+OPENAQ_RATE_LIMIT_PER_MINUTE = float(os.getenv("OPENAQ_RATE_LIMIT_PER_MINUTE", "60"))
+OPENAQ_RATE_LIMIT_BURST = float(os.getenv("OPENAQ_RATE_LIMIT_BURST", "10"))
+
+# Validade no cache das previsões do tempo; o histórico não muda e nunca expira
+WEATHER_FORECAST_CACHE_TTL_HOURS = float(os.getenv("WEATHER_FORECAST_CACHE_TTL_HOURS", "3"))
+
+# Maior intervalo (em dias) pedido à WeatherAPI em uma única consulta de histórico
+WEATHER_HISTORY_MAX_RANGE_DAYS = int(os.getenv("WEATHER_HISTORY_MAX_RANGE_DAYS", "30"))
+
+# Dias à frente (a partir de hoje) devolvidos por uma chamada a forecast.json; depois disso vale future.json
+WEATHER_FORECAST_MAX_DAYS = int(os.getenv("WEATHER_FORECAST_MAX_DAYS", "14"))
+
+# Consultas simultâneas à WeatherAPI na previsão de várias cidades ou dias
+WEATHER_FETCH_MAX_WORKERS = int(os.getenv("WEATHER_FETCH_MAX_WORKERS", "8"))
+
+# Cidades chilenas acompanhadas
+CHILE_CITIES = ['Santiago', 'Puerto Montt', 'Puerto Varas', 'Valparaíso', 'Viña del Mar']
+
+# Fuso das cidades acompanhadas, em que a OpenAQ devolve o horário "local" das medições (com horário de verão)
+CHILE_TIMEZONE = ZoneInfo(os.getenv("CHILE_TIMEZONE", "America/Santiago"))
+
+# Tamanho das páginas pedidas à OpenAQ
+OPENAQ_LOCATIONS_PAGE_SIZE = int(os.getenv("OPENAQ_LOCATIONS_PAGE_SIZE", "200"))
+OPENAQ_MEASUREMENTS_PAGE_SIZE = int(os.getenv("OPENAQ_MEASUREMENTS_PAGE_SIZE", "1000"))
+
+# Limitador compartilhado pelo processo, pois a cota é da chave e não de cada instância
+openaq_rate_limiter = TokenBucket(OPENAQ_RATE_LIMIT_PER_MINUTE / 60, OPENAQ_RATE_LIMIT_BURST)
+
+class OpenAQError(Exception):
+    """Resposta de erro da OpenAQ, já esgotadas as novas tentativas do cliente HTTP.
+
+    Distingue uma busca que falhou de uma busca sem resultados: quem grava o que
+    foi buscado (cobertura, marcas d'água) não pode tratar as duas da mesma forma.
+    """
 
 class OpenAQApi(SensorRepository, MeasurementRepository):
     BASE_URL = "https://api.openaq.org/v3"
     HEADERS = {"accept": "application/json", "X-API-Key": OpenAQApi_key}
 
+    def __init__(self, base_url: str = None, rate_limiter: TokenBucket = None, http_client: HttpClient = None):
+        self.base_url = base_url or self.BASE_URL
+        self.rate_limiter = rate_limiter or openaq_rate_limiter
+        self.http = http_client or get_http_client()
+
+    def _iter_pages(self, url: str, params: dict, page_size: int) -> Iterator[list]:
+        """Percorre as páginas de um endpoint paginado da OpenAQ.
+
+        A próxima página é buscada em segundo plano enquanto a atual é consumida;
+        a paginação termina quando uma página volta com menos de `page_size` itens.
+        Uma página com erro interrompe a paginação com OpenAQError.
+        """
+        def fetch(page: int):
+            self.rate_limiter.acquire()
+            response = self.http.get(url, headers=self.HEADERS, params={**params, "limit": page_size, "page": page})
+            if response.status_code != 200:
+                raise OpenAQError(f"Erro na API OpenAQ: {url} página {page} retornou {response.status_code}")
+            return response.json().get("results", [])
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            page = 1
+            future = executor.submit(fetch, page)
+            try:
+                while True:
+                    results = future.result()
+                    has_next = len(results) >= page_size
+                    if has_next:
+                        page += 1
+                        future = executor.submit(fetch, page)
+                    if results:
+                        yield results
+                    if not has_next:
+                        return
+            finally:
+                future.cancel()
+
+    def iter_pm25_sensors_from_chile(self) -> Iterator[dict]:
+        """ Percorre, página a página, os sensores de PM2.5 no Chile """
+        url = f"{self.base_url}/locations"
+        params = {"order_by": "id", "sort_order": "asc", "iso": "CL"}
+        for page in self._iter_pages(url, params, OPENAQ_LOCATIONS_PAGE_SIZE):
+            for location in page:
+                if location.get("country", {}).get("code") == "CL" and location.get("locality") in CHILE_CITIES:
+                    for sensor in location.get("sensors", []):
+                        if sensor.get("parameter", {}).get("name") == "pm25":
+                            yield {
+                                "id": sensor["id"],
+                                "city": location["locality"]
+                            }
+
     def get_pm25_sensors_from_chile(self):
         """ Obtém os sensores de PM2.5 no Chile """
-        url = f"{self.BASE_URL}/locations"
-        params = {"limit": 200, "page": 1, "order_by": "id", "sort_order": "asc", "iso": "CL"}
-        response = requests.get(url, headers=self.HEADERS, params=params)
-        data = response.json()
+        return list(self.iter_pm25_sensors_from_chile())
 
-        sensors = []
-        city_list = ['Santiago', 'Puerto Montt', 'Puerto Varas', 'Valparaíso', 'Viña del Mar']
-        for location in data.get("results", []):
-            if location.get("country", {}).get("code") == "CL" and location.get("locality") in city_list:
-                for sensor in location.get("sensors", []):
-                    if sensor.get("parameter", {}).get("name") == "pm25":
-                        sensors.append({
-                            "id": sensor["id"],
-                            "city": location["locality"]
-                        })
-        return sensors
+    def _iter_measurement_pages(self, sensor_id: int, datetime_from: str, datetime_to: str) -> Iterator[list]:
+        url = f"{self.base_url}/sensors/{sensor_id}/measurements/daily"
+        params = {"datetime_from": datetime_from, "datetime_to": datetime_to}
+        return self._iter_pages(url, params, OPENAQ_MEASUREMENTS_PAGE_SIZE)
 
-    def get_measurements(self, sensor_id: int, datetime_from: str, datetime_to: str, city: str):
-        """ Obtém medições de um sensor específico """
-        url = f"{self.BASE_URL}/sensors/{sensor_id}/measurements/daily"
-        params = {"datetime_from": datetime_from, "datetime_to": datetime_to, "limit": 1000}
-        response = requests.get(url, headers=self.HEADERS, params=params)
+    def iter_measurement_batches(self, sensor_id: int, datetime_from: str, datetime_to: str, city: str) -> Iterator[MeasurementBatch]:
+        """ Percorre as medições de um sensor como lotes colunares, um por página, sem criar objetos por medição """
+        for page in self._iter_measurement_pages(sensor_id, datetime_from, datetime_to):
+            yield MeasurementBatch.from_api_results(sensor_id, city, page)
 
-        if response.status_code != 200:
-            return []
-
-        data = response.json()
-        measurements = []
+    def get_measurement_batch(self, sensor_id: int, datetime_from: str, datetime_to: str, city: str) -> MeasurementBatch:
+        """ Obtém as medições de um sensor em um único lote colunar """
+        return MeasurementBatch.concat(list(self.iter_measurement_batches(sensor_id, datetime_from, datetime_to, city)))
 
-        for result in data.get("results", []):
-            measurements.append(
-                Measurement(
+    def iter_measurements(self, sensor_id: int, datetime_from: str, datetime_to: str, city: str) -> Iterator[Measurement]:
+        """ Percorre, página a página, as medições de um sensor específico """
+        for page in self._iter_measurement_pages(sensor_id, datetime_from, datetime_to):
+            for result in page:
+                yield Measurement(
                     sensor_id=sensor_id,
                     value=result["value"],
                     datetime_from=result["period"]["datetimeFrom"]["local"],
                     datetime_to=result["period"]["datetimeTo"]["local"],
                     city=city
                 )
-            )
 
-        return measurements
+    def get_measurements(self, sensor_id: int, datetime_from: str, datetime_to: str, city: str):
+        """ Obtém medições de um sensor específico """
+        return list(self.iter_measurements(sensor_id, datetime_from, datetime_to, city))
 
 class WeatherAPI():
     BASE_URL = "http://api.weatherapi.com/v1/"
+
+    def __init__(self, base_url: str = None, http_client: HttpClient = None, cache=None):
+        self.base_url = base_url or self.BASE_URL
+        self.http = http_client or get_http_client()
+        self.cache = cache or get_response_cache()
+
     def get_history(self, city: str, date_str: str):
         """Obtém dados históricos de um determinado dia e uma cidade específica"""
-        url = f"{self.BASE_URL}/history.json"
+        url = f"{self.base_url}/history.json"
         data_obj = date.fromisoformat(date_str)
         today = date.today()
         interval = (today - data_obj).days
@@ -83,9 +164,13 @@ class WeatherAPI():
             # Ajusta a data para exatamente um ano atrás
             data_obj = today - timedelta(days=365)
             print(f"Usando data ajustada: {data_obj}")
-            
+
+        cached = self.cache.get("history", city, data_obj.isoformat())
+        if cached is not None:
+            return cached
+
         params = {"key": weatherAPI_key, "q": city, "dt": data_obj.strftime("%Y-%m-%d")}
-        response = requests.get(url, params=params)
+        response = self.http.get(url, params=params)
         data = response.json()
         
         if response.status_code != 200:
@@ -99,30 +184,112 @@ class WeatherAPI():
             return []
             
         try:
-            city = data["location"]["name"]
-            date_var = data["forecast"]["forecastday"][0]["date"]
-            avg_humidity = data["forecast"]["forecastday"][0]["day"]["avghumidity"]
-            avg_temp_c = data["forecast"]["forecastday"][0]["day"]["avgtemp_c"]
-            avg_vis_km = data["forecast"]["forecastday"][0]["day"]["avgvis_km"]
-            max_wind_kph = data["forecast"]["forecastday"][0]["day"]["maxwind_kph"]
-            total_precip_mm = data["forecast"]["forecastday"][0]["day"]["totalprecip_mm"]
-            hours = data["forecast"]["forecastday"][0]["hour"]
-            pressure_mb = float(np.mean([hour["pressure_mb"] for hour in hours]))
-            
-            return [{
-                "city": city,
-                "date": date_var,
-                "avg_humidity": avg_humidity,
-                "avg_temp_c": avg_temp_c,
-                "avg_vis_km": avg_vis_km,
-                "max_wind_kph": max_wind_kph,
-                "total_precip_mm": total_precip_mm,
-                "pressure_mb": pressure_mb
-            }]
+            history = [self._parse_forecastday(data["location"]["name"], data["forecast"]["forecastday"][0])]
+            # dados históricos não mudam: a entrada fica no cache sem expiração
+            self.cache.set("history", params["q"], params["dt"], history)
+            return history
         except Exception as e:
             print(f"Erro ao processar dados para {city} em {data_obj}: {str(e)}")
             return []
 
+    @staticmethod
+    def _parse_forecastday(city: str, forecastday: dict) -> dict:
+        """Converte um item de `forecast.forecastday` no registro diário usado pela aplicação"""
+        day = forecastday["day"]
+        return {
+            "city": city,
+            "date": forecastday["date"],
+            "avg_humidity": day["avghumidity"],
+            "avg_temp_c": day["avgtemp_c"],
+            "avg_vis_km": day["avgvis_km"],
+            "max_wind_kph": day["maxwind_kph"],
+            "total_precip_mm": day["totalprecip_mm"],
+            "pressure_mb": float(np.mean([hour["pressure_mb"] for hour in forecastday["hour"]]))
+        }
+
+    def _fetch_history_range(self, city: str, start: date, end: date) -> Optional[List[dict]]:
+        """Consulta history.json uma única vez para o intervalo [start, end] (dt/end_dt); None se a API responder com erro"""
+        url = f"{self.base_url}/history.json"
+        params = {"key": weatherAPI_key, "q": city, "dt": start.isoformat(), "end_dt": end.isoformat()}
+        response = self.http.get(url, params=params)
+
+        if response.status_code != 200:
+            try:
+                data = response.json()
+            except ValueError:
+                data = {}
+            error = data.get("error", {}) if isinstance(data, dict) else {}
+            print(f"Erro na API Weather: HTTP {response.status_code}, código {error.get('code')} - {error.get('message')}")
+            return None
+
+        try:
+            data = response.json()
+            location = data["location"]["name"]
+            return [self._parse_forecastday(location, forecastday) for forecastday in data["forecast"]["forecastday"]]
+        except Exception as e:
+            print(f"Erro ao processar dados para {city} entre {start} e {end}: {str(e)}")
+            return None
+
+    def get_history_range(self, city: str, start_date: str, end_date: str) -> List[dict]:
+        """Obtém o histórico diário de uma cidade entre duas datas (inclusive).
+
+        Os dias já presentes no cache não são consultados; os demais são agrupados
+        em janelas de até WEATHER_HISTORY_MAX_RANGE_DAYS dias, cada uma buscada com
+        uma única chamada. Dias que a API deixar de fora de uma resposta com dados
+        (ex.: planos sem suporte a `end_dt`) são buscados individualmente por
+        get_history. Uma janela com erro ou sem nenhum dia fica de fora, sem
+        consultas dia a dia que só gastariam a cota durante a falha.
+        """
+        start = date.fromisoformat(start_date)
+        end = date.fromisoformat(end_date)
+        # A API só permite consultas até 1 ano atrás
+        earliest = date.today() - timedelta(days=365)
+        if start < earliest:
+            print(f"Aviso: A data {start} está muito distante. Usando data ajustada: {earliest}")
+            start = earliest
+
+        records = []
+        missing = []
+        current = start
+        while current <= end:
+            cached = self.cache.get("history", city, current.isoformat())
+            if cached is not None:
+                records.extend(cached)
+            else:
+                missing.append(current)
+            current += timedelta(days=1)
+
+        while missing:
+            # janela contígua de dias ausentes, limitada ao tamanho máximo aceito pela API
+            window = [missing[0]]
+            for day in missing[1:WEATHER_HISTORY_MAX_RANGE_DAYS]:
+                if (day - window[-1]).days != 1:
+                    break
+                window.append(day)
+            missing = missing[len(window):]
+
+            response = self._fetch_history_range(city, window[0], window[-1])
+            if not response:
+                continue
+            fetched = {}
+            for record in response:
+                if window[0].isoformat() <= record["date"] <= window[-1].isoformat():
+                    fetched[record["date"]] = record
+            fallback = True
+            for day in window:
+                record = fetched.get(day.isoformat())
+                if record is None:
+                    if fallback:
+                        history = self.get_history(city, day.isoformat())
+                        records.extend(history)
+                        # dia vazio ou com erro: os demais da janela ficam para a próxima carga
+                        fallback = bool(history)
+                    continue
+                self.cache.set("history", city, day.isoformat(), [record])
+                records.append(record)
+
+        return sorted(records, key=lambda record: record["date"])
+
     def get_future(self, city: str, date_str: str):
         """Obtém dados da previsão do tempo de um determinado dia e uma cidade específica"""
         
@@ -133,13 +300,19 @@ class WeatherAPI():
         interval = (data_obj - today).days
         if interval <= 14:
             # forecast
-            url = f"{self.BASE_URL}/forecast.json"
+            endpoint = "forecast"
             params["aqi"] = "no"
             params["alerts"] = "no"
         else:
             # future
-            url = f"{self.BASE_URL}/future.json"
-        response = requests.get(url, params=params)
+            endpoint = "future"
+        url = f"{self.base_url}/{endpoint}.json"
+
+        cached = self.cache.get(endpoint, city, date_str)
+        if cached is not None:
+            return cached
+
+        response = self.http.get(url, params=params)
 
         if response.status_code != 200:
             return []
@@ -156,9 +329,9 @@ class WeatherAPI():
         # extracting hour list
         hours = data["forecast"]["forecastday"][0]["hour"]
         # taking pressure_mb values and taking its mean
-        pressure_mb = np.mean([hour["pressure_mb"] for hour in hours])
+        pressure_mb = float(np.mean([hour["pressure_mb"] for hour in hours]))
         #"http://127.0.0.1:5000/weather-future?city=Santiago&date=2025-04-20"
-        return {
+        future = {
         "city": city,
         "date": date_var,
         "avg_humidity": avg_humidity,
@@ -168,148 +341,67 @@ class WeatherAPI():
         "total_precip_mm": total_precip_mm,
         "pressure_mb": pressure_mb
         }
+        self.cache.set(endpoint, params["q"], date_str, future, ttl_seconds=WEATHER_FORECAST_CACHE_TTL_HOURS * 3600)
+        return future
     
-    def forecast_pm25(self, city: str, date_str: str):
-        """Obtém a previsão do pm 2.5 na cidade e data escolhidas"""
-        # load the saved model
-        model = joblib.load("app/model.pkl")
-
-        # load the most recent historical data - same logic as the notebook
-        # configure postgres connection 
-        USER = "postgres"
-        PASSWORD = "password"
-        HOST = "db" 
-        PORT = "5432" 
-        DB_NAME = "db_measurements"
-        # connection string
-        conn_str = f"postgresql+psycopg2://{USER}:{PASSWORD}@{HOST}:{PORT}/{DB_NAME}"
-        # create connection engine
-        engine = create_engine(conn_str)
-        # test connection and load data into a dataframe
-        query = "SELECT * FROM tbl_weather_history"
-        df_weather_history = pd.read_sql(query, engine)
-        query = "SELECT * FROM tbl_measurements"
-        df_measurements = pd.read_sql(query, engine)
-        # date transformations
-        df_weather_history['dt_date'] = df_weather_history['dt_date'].apply(lambda x: x.isoformat() if pd.notnull(x) else None)
-        df_measurements['dt_date'] = df_measurements['dt_date_from'].apply(lambda x: x.date().isoformat() if pd.notnull(x) else None)
-        # merge both dataframes
-        df = pd.merge(df_weather_history, df_measurements, on=['ds_city', 'dt_date'], how='inner')
-        # drop columns
-        df.drop(columns=['id_x', 'id_y', 'id_sensor', 'dt_date_from', 'dt_date_to'], inplace=True)
-        # mean pm2.5 column
-        df = df.groupby(['ds_city', 'dt_date']).mean().reset_index()
-         # Converter dt_date para datetime
-        df['dt_date'] = pd.to_datetime(df['dt_date'])
-        
-        # Adicionar features de data
-        df["ano"] = df["dt_date"].dt.year
-        df["mes"] = df["dt_date"].dt.month
-        df["dia"] = df["dt_date"].dt.day
-        
-        # Ordenar por cidade e data
-        df = df.sort_values(['ds_city', 'dt_date'])
-        
-        # Criar médias móveis para diferentes períodos
-        df['qt_pm25_ma3'] = df.groupby('ds_city')['qt_pm25'].transform(lambda x: x.rolling(window=3, min_periods=1).mean())
-        df['qt_pm25_ma7'] = df.groupby('ds_city')['qt_pm25'].transform(lambda x: x.rolling(window=7, min_periods=1).mean())
-        df['qt_pm25_ma14'] = df.groupby('ds_city')['qt_pm25'].transform(lambda x: x.rolling(window=14, min_periods=1).mean())
-        df['qt_pm25_ema'] = df.groupby('ds_city')['qt_pm25'].transform(lambda x: x.ewm(span=7, adjust=False).mean())
-        df['qt_pm25_std7'] = df.groupby('ds_city')['qt_pm25'].transform(lambda x: x.rolling(window=7, min_periods=1).std().fillna(0))
-        df['qt_pm25_trend'] = df['qt_pm25_ma7'] - df['qt_pm25_ma3']
-        
-        # Features de sazonalidade
-        df['dia_semana'] = df['dt_date'].dt.dayofweek
-        df['mes_ano'] = df['dt_date'].dt.month
-        df['estacao'] = df['dt_date'].dt.month % 12 // 3 + 1
-        
-        # Features de interação
-        df['temp_umidade'] = df['qt_avg_temp_c'] * df['qt_avg_humidity']
-        df['pressao_umidade'] = df['qt_pressure_mb'] * df['qt_avg_humidity']
-        df['vento_umidade'] = df['qt_max_wind_kph'] * df['qt_avg_humidity']
-        
-        # instanciating one hot encoder class
-        encoder = OneHotEncoder()
-        encoded_data = encoder.fit_transform(df[['ds_city']]).toarray()
-        df_encoded = pd.DataFrame(encoded_data, columns=encoder.get_feature_names_out(['ds_city']))
-        # concatenate new data codifying the data
-        df_encoded = pd.concat([df, df_encoded], axis=1)
-        df = df_encoded
-        # filter data based on the chosen city
-        df = df.query(f'ds_city == "{city}"')
-        df.drop(columns=['ds_city'], inplace = True)
-        # drop previous date column and order by date
-        df = df.sort_values(by=['ano', 'mes', 'dia'])
-        last_date = pd.to_datetime(df['dt_date'].iloc[-1])
-        df.drop(columns=['dt_date'], inplace=True)
-        
-        # create a dataframe to store future predictions
-        df_prev = df.copy()
-        
-        # get features from the dataframe
-        features = [
-            'qt_avg_humidity', 'qt_avg_temp_c', 'qt_avg_vis_km', 
-            'qt_max_wind_kph', 'qt_total_precip_mm', 'qt_pressure_mb',
-            'qt_pm25_ma3', 'qt_pm25_ma7', 'qt_pm25_ma14',
-            'qt_pm25_ema', 'qt_pm25_std7', 'qt_pm25_trend',
-            'dia_semana', 'mes_ano', 'estacao',
-            'temp_umidade', 'pressao_umidade', 'vento_umidade'#,
-            #'ano', 'mes', 'dia'
-        ] + [col for col in df.columns if col.startswith('ds_city_')]
-        
-        # iterate over days for prediction        
-        while last_date < pd.to_datetime(date_str):
-            # update last_date
-            last_date = pd.to_datetime(last_date)
-            last_date += pd.Timedelta(days=1)
-            # get preview from API
-            weather_data = self.get_future(city, last_date.strftime('%Y-%m-%d'))
-            new_entry = df_prev.iloc[-1:].copy()
-            # format json data to create a new entry for the history dataframe
-            new_entry['qt_avg_humidity'] = weather_data['avg_humidity']
-            new_entry['qt_avg_temp_c'] = weather_data['avg_temp_c']
-            new_entry['qt_avg_vis_km'] = weather_data['avg_vis_km']
-            new_entry['qt_max_wind_kph'] = weather_data['max_wind_kph']
-            new_entry['qt_total_precip_mm'] = weather_data['total_precip_mm']
-            new_entry['qt_pressure_mb'] = weather_data['pressure_mb']
-
-            # atualizar data
-            new_entry['ano'] = last_date.year
-            new_entry['mes'] = last_date.month
-            new_entry['dia'] = last_date.day
-            new_entry['dia_semana'] = last_date.dayofweek
-            new_entry['mes_ano'] = last_date.month
-            new_entry['estacao'] = last_date.month % 12 // 3 + 1
-            
-            # atualizar features de interação
-            new_entry['temp_umidade'] = new_entry['qt_avg_temp_c'] * new_entry['qt_avg_humidity']
-            new_entry['pressao_umidade'] = new_entry['qt_pressure_mb'] * new_entry['qt_avg_humidity']
-            new_entry['vento_umidade'] = new_entry['qt_max_wind_kph'] * new_entry['qt_avg_humidity']
-            
-            # garantir que colunas ds_city estejam corretas
-            for column in new_entry.columns:
-                if column.startswith('ds_city_'):
-                    if column == f'ds_city_{city}':
-                        new_entry[column] = 1
-                    else:
-                        new_entry[column] = 0
-            
-            # fazer previsão
-            new_entry['qt_pm25'] = model.predict(new_entry[features])
-            
-            # atualizar médias móveis para a próxima iteração
-            df_prev = pd.concat([df_prev, new_entry], ignore_index=True)
-            
-            # Recalcular médias móveis após adicionar nova entrada
-            last_rows = df_prev.tail(14).copy()  # Pegamos as últimas 14 linhas para garantir cálculos corretos
-            new_entry['qt_pm25_ma3'] = last_rows['qt_pm25'].tail(3).mean()
-            new_entry['qt_pm25_ma7'] = last_rows['qt_pm25'].tail(7).mean()
-            new_entry['qt_pm25_ma14'] = last_rows['qt_pm25'].tail(14).mean()
-            new_entry['qt_pm25_ema'] = last_rows['qt_pm25'].ewm(span=7, adjust=False).mean().iloc[-1]
-            new_entry['qt_pm25_std7'] = last_rows['qt_pm25'].tail(7).std() if len(last_rows) >= 7 else 0
-            new_entry['qt_pm25_trend'] = new_entry['qt_pm25_ma7'] - new_entry['qt_pm25_ma3']
-            
-            # Atualizar a última entrada com os valores recalculados
-            df_prev.iloc[-1] = new_entry
+    def _fetch_forecast_days(self, city: str, days: int) -> List[dict]:
+        """Consulta forecast.json uma única vez para os próximos `days` dias (a partir de hoje)"""
+        url = f"{self.base_url}/forecast.json"
+        params = {"key": weatherAPI_key, "q": city, "days": days, "aqi": "no", "alerts": "no"}
+        response = self.http.get(url, params=params)
+        data = response.json()
+
+        if response.status_code != 200:
+            error = data.get("error", {}) if isinstance(data, dict) else {}
+            print(f"Erro na API Weather: Código {error.get('code')} - {error.get('message')}")
+            return []
+
+        try:
+            location = data["location"]["name"]
+            return [self._parse_forecastday(location, forecastday) for forecastday in data["forecast"]["forecastday"]]
+        except Exception as e:
+            print(f"Erro ao processar a previsão de {days} dias para {city}: {str(e)}")
+            return []
+
+    def get_future_range(self, city: str, days: List[date]) -> Dict[str, Any]:
+        """Dados do tempo de vários dias de uma cidade, buscados de uma vez antes da previsão.
+
+        Dias passados vêm do histórico (get_history_range); os dias ainda não
+        cacheados dentro da janela de forecast.json são pedidos em uma única
+        chamada com `days`, e os demais (future.json, ou os que faltarem na
+        resposta) são buscados em paralelo por get_future. Retorna
+        {data ISO: registro}, com [] nos dias que a API não devolver.
+        """
+        today = date.today()
+        results = {}
+
+        past = sorted(day for day in days if day < today)
+        if past:
+            history = {record["date"]: record for record in self.get_history_range(city, past[0].isoformat(), past[-1].isoformat())}
+            for day in past:
+                results[day.isoformat()] = history.get(day.isoformat(), [])
+
+        missing = []
+        for day in sorted(day for day in days if day >= today):
+            # mesma chave de cache usada por get_future
+            cached = self.cache.get("forecast" if (day - today).days <= 14 else "future", city, day.isoformat())
+            if cached is not None:
+                results[day.isoformat()] = cached
+            else:
+                missing.append(day)
+
+        window = [day for day in missing if (day - today).days < WEATHER_FORECAST_MAX_DAYS]
+        if window:
+            fetched = {record["date"]: record for record in self._fetch_forecast_days(city, (window[-1] - today).days + 1)}
+            for day in window:
+                record = fetched.get(day.isoformat())
+                if record is not None:
+                    self.cache.set("forecast", city, day.isoformat(), record, ttl_seconds=WEATHER_FORECAST_CACHE_TTL_HOURS * 3600)
+                    results[day.isoformat()] = record
 
-        return df_prev.tail(1).to_json(orient='records', index=False)
\ No newline at end of file
+        remaining = [day for day in missing if day.isoformat() not in results]
+        if remaining:
+            with ThreadPoolExecutor(max_workers=min(WEATHER_FETCH_MAX_WORKERS, len(remaining))) as executor:
+                for day, record in zip(remaining, executor.map(lambda day: self.get_future(city, day.isoformat()), remaining)):
+                    results[day.isoformat()] = record
+        return results
@@ -0,0 +1,34 @@
+# app/infra/rate_limiter.py
+import threading
+import time
+
+class TokenBucket:
+    """Limitador de taxa por token bucket, seguro para uso entre threads.
+
+    `rate` é a quantidade de tokens repostos por segundo e `capacity` o tamanho
+    máximo da rajada. `acquire` bloqueia até haver tokens disponíveis.
+    """
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate e capacity devem ser positivos")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, tokens: float = 1):
+        """Consome `tokens`, aguardando a reposição quando o balde estiver vazio"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,124 @@
+# app/infra/read_through_repository.py
+import os
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+from interfaces.sensor_repository import SensorRepository
+from interfaces.measurement_repository import MeasurementRepository
+from domain.models import Measurement, MeasurementBatch, remove_accents
+from infra.database import Database, MEASUREMENT_PERIOD, WATERMARK_MEASUREMENTS
+from infra.feature_store import FeatureStore
+from infra.openaq_api import OpenAQApi, CHILE_TIMEZONE
+
+# /sensor-data responde a partir do banco nos períodos já ingeridos (`?source=live` força a OpenAQ)
+SENSOR_DATA_READ_THROUGH = os.getenv("SENSOR_DATA_READ_THROUGH", "true").lower() == "true"
+# Grava no banco as lacunas buscadas na OpenAQ, para que o próximo pedido igual saia inteiro do banco
+SENSOR_DATA_WRITE_BACK = os.getenv("SENSOR_DATA_WRITE_BACK", "false").lower() == "true"
+
+def _parse_utc(value: str) -> datetime:
+    """'YYYY-MM-DD[THH:MM:SS][Z|±HH:MM]' em datetime UTC sem fuso, como gravado em tbl_measurements"""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _format_utc(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _utc_naive(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _local(value: datetime) -> datetime:
+    """UTC sem fuso (tbl_measurements) no horário local da OpenAQ, com o deslocamento vigente na data"""
+    return value.replace(tzinfo=timezone.utc).astimezone(CHILE_TIMEZONE)
+
+class ReadThroughMeasurementRepository(SensorRepository, MeasurementRepository):
+    """Medições servidas do Postgres nos períodos já ingeridos; só as lacunas vão à OpenAQ.
+
+    A cobertura de cada sensor são os trechos registrados pelas cargas em
+    tbl_measurement_coverage, que podem ter buracos entre si. Partes do pedido
+    fora deles são buscadas em `upstream` e, com `write_back`, os períodos já
+    encerrados são gravados e passam a fazer parte da cobertura; a marca d'água
+    só avança quando a lacuna começa até ela, para não pular dias. Datas lidas
+    do banco (gravadas em UTC) voltam ao horário local com deslocamento, como as
+    buscadas na OpenAQ, de modo que a resposta tem um único formato.
+    """
+    def __init__(self, upstream: Optional[OpenAQApi] = None, write_back: bool = SENSOR_DATA_WRITE_BACK):
+        self.upstream = upstream or OpenAQApi()
+        self.write_back = write_back
+
+    def iter_pm25_sensors_from_chile(self):
+        return self.upstream.iter_pm25_sensors_from_chile()
+
+    def get_pm25_sensors_from_chile(self):
+        return self.upstream.get_pm25_sensors_from_chile()
+
+    def _fetch_gap(self, sensor_id: int, start: datetime, end: datetime, city: str) -> List[Measurement]:
+        """Busca na OpenAQ os períodos com início em [start, end) e, com write_back, grava os já encerrados"""
+        measurements = [
+            measurement
+            for measurement in self.upstream.iter_measurements(sensor_id, _format_utc(start), _format_utc(end), city)
+            if start <= _utc_naive(measurement.datetime_from) < end
+        ]
+        if self.write_back:
+            self._write_back(sensor_id, start, end, measurements, city)
+        return measurements
+
+    def _write_back(self, sensor_id: int, start: datetime, end: datetime, measurements: List[Measurement], city: str):
+        # O período do dia corrente ainda pode mudar; só entram períodos já encerrados
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        closed = [measurement for measurement in measurements if _utc_naive(measurement.datetime_to) <= now]
+        ds_city = remove_accents(city)
+        database = Database()
+        try:
+            inserted = 0
+            if closed:
+                batch = MeasurementBatch.from_measurements(closed)
+                inserted = database.insert_measurements_bulk(batch.to_rows(ds_city))
+                watermark = database.get_watermark(WATERMARK_MEASUREMENTS, str(sensor_id))
+                # uma lacuna depois da marca d'água deixaria dias sem carga para trás
+                if watermark is None or start <= watermark + MEASUREMENT_PERIOD:
+                    for latest in batch.latest_by_sensor().values():
+                        database.set_watermark(WATERMARK_MEASUREMENTS, str(sensor_id), latest)
+                if inserted:
+                    FeatureStore(database).mark_pending(ds_city, batch.earliest_date() - timedelta(days=1))
+            database.add_measurement_coverage(sensor_id, start, end)
+            database.commit()
+        except Exception as e:
+            # a leitura não depende da gravação: o pedido segue com o que veio da OpenAQ
+            print(f"Erro ao gravar medições do sensor {sensor_id} lidas da OpenAQ: {str(e)}")
+            database.rollback()
+        finally:
+            database.close()
+
+    def iter_measurements(self, sensor_id: int, datetime_from: str, datetime_to: str, city: str) -> Iterator[Measurement]:
+        """Medições do sensor em ordem de data, alternando trechos gravados e lacunas buscadas na OpenAQ"""
+        start, end = _parse_utc(datetime_from), _parse_utc(datetime_to)
+        database = Database()
+        try:
+            coverage = database.get_measurement_coverage(sensor_id, start, end)
+            stored = database.get_measurements(sensor_id, start, end) if coverage else []
+            database.rollback()
+        finally:
+            database.close()
+
+        stored_from = [row[0] for row in stored]
+        cursor = start
+        for covered_from, covered_to in coverage:
+            covered_from, covered_to = max(covered_from, start), min(covered_to, end)
+            rows = stored[bisect_left(stored_from, covered_from):bisect_left(stored_from, covered_to)]
+            # Os períodos são contíguos: se o primeiro gravado começa a menos de um período do início
+            # da lacuna, nenhum outro período cabe nela (pedidos que não caem no início do período local)
+            if cursor < covered_from and not (rows and rows[0][0] - (rows[0][1] - rows[0][0]) < cursor):
+                yield from self._fetch_gap(sensor_id, cursor, covered_from, city)
+            for dt_date_from, dt_date_to, qt_pm25 in rows:
+                yield Measurement(sensor_id, float(qt_pm25), _local(dt_date_from), _local(dt_date_to), city)
+            cursor = max(cursor, covered_to)
+        if cursor < end:
+            yield from self._fetch_gap(sensor_id, cursor, end, city)
+
+    def get_measurements(self, sensor_id: int, datetime_from: str, datetime_to: str, city: str):
+        return list(self.iter_measurements(sensor_id, datetime_from, datetime_to, city))
+
+    def iter_measurement_batches(self, sensor_id: int, datetime_from: str, datetime_to: str, city: str) -> Iterator[MeasurementBatch]:
+        yield MeasurementBatch.from_measurements(self.iter_measurements(sensor_id, datetime_from, datetime_to, city))
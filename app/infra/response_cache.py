@@ -0,0 +1,137 @@
+# app/infra/response_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", ".cache/responses.sqlite3")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "100000"))
+
+# A limpeza de expirados/excedentes roda a cada N gravações, não em todas
+EVICTION_INTERVAL = 100
+
+class ResponseCache:
+    """Cache persistente (SQLite) de respostas já interpretadas das APIs externas.
+
+    As entradas são endereçadas pelo hash de (endpoint, cidade, data). Cada
+    gravação define seu próprio TTL (None = nunca expira) e, acima de
+    `max_entries`, as entradas menos acessadas recentemente são descartadas.
+    O arquivo usa WAL, podendo ser compartilhado por vários processos.
+    """
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)")
+
+    @staticmethod
+    def make_key(endpoint: str, city: str, date_str: str) -> str:
+        raw = json.dumps([endpoint, city.strip().lower(), date_str])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, endpoint: str, city: str, date_str: str) -> Optional[Any]:
+        """Retorna o valor armazenado ou None quando ausente/expirado"""
+        key = self.make_key(endpoint, city, date_str)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, endpoint: str, city: str, date_str: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Armazena `value` (serializável em JSON); `ttl_seconds=None` nunca expira"""
+        key = self.make_key(endpoint, city, date_str)
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, payload, created_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, json.dumps(value), now, expires_at, now)
+            )
+            self._writes += 1
+            if self._writes % EVICTION_INTERVAL == 0:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0
+            }
+
+class NullResponseCache:
+    """Cache desligado (RESPONSE_CACHE_ENABLED=false): nunca encontra nem armazena nada"""
+    def get(self, endpoint: str, city: str, date_str: str) -> Optional[Any]:
+        return None
+
+    def set(self, endpoint: str, city: str, date_str: str, value: Any, ttl_seconds: Optional[float] = None):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": 0, "hits": 0, "misses": 0, "hit_ratio": 0}
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+# Instâncias herdadas do processo pai: mantidas vivas para que o coletor não as feche no filho
+_response_cache_inherited = []
+
+def get_response_cache():
+    """Retorna o cache de respostas compartilhado pelo processo"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache() if RESPONSE_CACHE_ENABLED else NullResponseCache()
+    return _response_cache
+
+def reset_response_cache():
+    """Descarta o cache do processo; o próximo get_response_cache() abre outra conexão.
+
+    Em um processo filho criado por fork, a conexão SQLite herdada não pode ser
+    usada nem fechada (fechá-la liberaria as travas do processo pai): é abandonada.
+    """
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is not None:
+            _response_cache_inherited.append(_response_cache)
+        _response_cache = None
@@ -5,3 +5,11 @@ class MeasurementRepository(ABC):
     @abstractmethod
     def get_measurements(self, sensor_id: int, datetime_from: str, datetime_to: str, city: str):
         pass
+
+    @abstractmethod
+    def iter_measurements(self, sensor_id: int, datetime_from: str, datetime_to: str, city: str):
+        pass
+
+    @abstractmethod
+    def iter_measurement_batches(self, sensor_id: int, datetime_from: str, datetime_to: str, city: str):
+        pass
@@ -3,4 +3,8 @@ from abc import ABC, abstractmethod
 class SensorRepository(ABC):
     @abstractmethod
     def get_pm25_sensors_from_chile(self):
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def iter_pm25_sensors_from_chile(self):
+        pass
@@ -1,16 +1,42 @@
+import os
 from flask import Flask
-from presentation.controllers import sensor_bp, weather_bp, orchestrator_bp
+from presentation.controllers import sensor_bp, weather_bp, orchestrator_bp, metrics_bp
 from flask_cors import CORS
+from infra.migrations import DB_MIGRATE_ON_STARTUP, run_migrations
+
+# Prepara modelo, metadados das features e uma previsão de teste na subida, e não no primeiro pedido.
+# Desligado por padrão, para que processos de desenvolvimento e de linha de comando não carreguem a pilha
+# de ML; o gunicorn com preload o liga no mestre (gunicorn.conf.py), e os workers herdam o resultado
+APP_WARMUP = os.getenv("APP_WARMUP", "false").lower() == "true"
 
 def create_app():
     app = Flask(__name__)
     app.register_blueprint(sensor_bp)
     app.register_blueprint(weather_bp)
     app.register_blueprint(orchestrator_bp)
-    CORS(app)
-    
+    app.register_blueprint(metrics_bp)
+    CORS(app, expose_headers=["X-Model-Version", "X-Model-Loaded-At", "X-Cache", "Server-Timing"])
+
+    # Aplica as migrações pendentes do banco (docker/postgres/migrations); sem elas a API não sobe,
+    # pois marcas d'água, execuções e features dependem das tabelas criadas pelas migrações
+    if DB_MIGRATE_ON_STARTUP:
+        try:
+            run_migrations()
+        except Exception as e:
+            print(f"Erro ao aplicar as migrações do banco: {str(e)}")
+            raise
+
+    if APP_WARMUP:
+        try:
+            # importa a pilha de ML já na subida; sem o aquecimento, isso fica para o primeiro pedido de previsão
+            from infra.forecast import warm_up
+            warm_up()
+        except Exception as e:
+            print(f"Erro no aquecimento da API: {str(e)}")
+
     return app
 
 if __name__ == "__main__":
+    # Servidor de desenvolvimento; em produção use o gunicorn (gunicorn.conf.py)
     app = create_app()
-    app.run(host="0.0.0.0", port=8080, debug=True)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=int(os.getenv("PORT", "8080")), debug=os.getenv("FLASK_DEBUG", "false").lower() == "true")
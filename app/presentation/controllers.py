@@ -1,28 +1,103 @@
 # app/presentation/controllers.py
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, g, jsonify, make_response, request, stream_with_context
 from application.services import SensorService, MeasurementService, HistoryService, FutureService, OrchestratorService
-from infra.openaq_api import OpenAQApi, WeatherAPI
+from application.services import parse_iso_datetime, format_iso_datetime, remove_accents
+from application.jobs import JobManager, JobStore, JobQueueFull
+from infra.openaq_api import OpenAQApi, OpenAQError, WeatherAPI, CHILE_CITIES
 from infra.database import Database
-import pandas as pd
-import pickle
-from sqlalchemy import create_engine
-from sklearn.preprocessing import OneHotEncoder
+from infra.connection_pool import pool_stats
+from infra.response_cache import get_response_cache
+from infra.model_registry import get_model_registry
+from infra.forecast_cache import get_forecast_cache
+from infra.read_through_repository import ReadThroughMeasurementRepository, SENSOR_DATA_READ_THROUGH
+from infra.metrics import (METRICS_ENABLED, HTTP_SERVER_SECONDS, begin_request, request_stages, server_timing,
+                           registry as metrics_registry)
+from datetime import date, datetime, timezone
+from typing import Iterator
+import json
+import os
+import threading
+import time
 
 sensor_bp = Blueprint("sensor", __name__)
 weather_bp = Blueprint("weather", __name__)
 orchestrator_bp = Blueprint("orchestrator", __name__)
+metrics_bp = Blueprint("metrics", __name__)
 
-# Instância global do OrchestratorService
-_orchestrator = None
+# Intervalo padrão da carga completa do orquestrador
+DEFAULT_DATETIME_FROM = "2024-04-03T00:00:00Z"
+DEFAULT_DATETIME_TO = "2025-04-03T00:00:00Z"
 
-def get_orchestrator():
-    global _orchestrator
-    if _orchestrator is None:
-        measurement_service = MeasurementService(OpenAQApi())
-        history_service = HistoryService(WeatherAPI())
-        database = Database()
-        _orchestrator = OrchestratorService(measurement_service, history_service, database)
-    return _orchestrator
+# Dias previstos por padrão e no máximo em /forecast_pm25/batch
+FORECAST_BATCH_DEFAULT_HORIZON = int(os.getenv("FORECAST_BATCH_DEFAULT_HORIZON", "7"))
+FORECAST_BATCH_MAX_HORIZON = int(os.getenv("FORECAST_BATCH_MAX_HORIZON", "30"))
+
+# Formato de /sensor-data em streaming: um objeto JSON por linha
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Formato texto de exposição do Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Gerenciador global das execuções do orquestrador
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+def create_orchestrator() -> OrchestratorService:
+    measurement_service = MeasurementService(OpenAQApi())
+    history_service = HistoryService(WeatherAPI())
+    return OrchestratorService(measurement_service, history_service, Database())
+
+def with_model_headers(response, loaded_model):
+    """Identifica na resposta a versão do modelo usada na previsão"""
+    response.headers["X-Model-Version"] = loaded_model.version
+    response.headers["X-Model-Loaded-At"] = loaded_model.loaded_at.isoformat()
+    return response
+
+def measurement_to_dict(measurement) -> dict:
+    return {
+        "sensor_id": measurement.sensor_id,
+        "value": measurement.value,
+        "datetimeFrom_local": measurement.datetime_from.isoformat(),
+        "datetimeTo_local": measurement.datetime_to.isoformat(),
+        "city": measurement.city
+    }
+
+def measurement_repository():
+    """Banco com lacunas buscadas na OpenAQ (padrão) ou só a OpenAQ (`?source=live`)"""
+    source = request.args.get("source", "db" if SENSOR_DATA_READ_THROUGH else "live")
+    if source == "live":
+        return OpenAQApi()
+    return ReadThroughMeasurementRepository(OpenAQApi())
+
+def wants_ndjson() -> bool:
+    """Resposta em streaming pedida por `?stream=1` ou `Accept: application/x-ndjson`"""
+    if request.args.get("stream", "").lower() in ("1", "true"):
+        return True
+    # só o tipo explícito conta: curingas como */* continuam recebendo a lista JSON
+    return any(value == NDJSON_MIMETYPE and quality > 0 for value, quality in request.accept_mimetypes)
+
+def ndjson_lines(measurements) -> Iterator[str]:
+    """Uma medição JSON por linha, gerada conforme chegam da OpenAQ; uma falha no meio vira uma linha de erro"""
+    try:
+        for measurement in measurements:
+            yield json.dumps(measurement_to_dict(measurement), ensure_ascii=False, default=str) + "\n"
+    except Exception as e:
+        print(f"Erro durante o streaming de medições: {str(e)}")
+        yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+def get_job_manager() -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager(create_orchestrator, JobStore(Database()))
+    return _job_manager
+
+@sensor_bp.errorhandler(OpenAQError)
+def openaq_error(error: OpenAQError):
+    # falha na OpenAQ não vira lista vazia: o cliente distingue "sem dados" de "não foi possível buscar"
+    print(str(error))
+    return jsonify({"error": str(error)}), 502
 
 @sensor_bp.route("/sensors/pm25/chile", methods=["GET"])
 def get_pm25_sensors():
@@ -38,16 +113,15 @@ def get_sensor_measurements():
     if not datetime_from or not datetime_to:
         return jsonify({"error": "Parâmetros 'datetime_from' e 'datetime_to' são obrigatórios"}), 400
 
-    service = MeasurementService(OpenAQApi())
-    measurements = service.get_measurements_for_all_sensors(datetime_from, datetime_to)
+    service = MeasurementService(measurement_repository())
+    if wants_ndjson():
+        return Response(
+            stream_with_context(ndjson_lines(service.stream_measurements_for_all_sensors(datetime_from, datetime_to))),
+            mimetype=NDJSON_MIMETYPE
+        )
 
-    return jsonify([{
-        "sensor_id": m.sensor_id,
-        "value": m.value,
-        "datetimeFrom_local": m.datetime_from,
-        "datetimeTo_local": m.datetime_to,
-        "city": m.city
-    } for m in measurements])
+    measurements = service.iter_measurements_for_all_sensors(datetime_from, datetime_to)
+    return jsonify([measurement_to_dict(m) for m in measurements])
 
 @weather_bp.route("/weather-history", methods=["GET"])
 def get_weather_history():
@@ -75,23 +149,109 @@ def get_weather_future():
 
     return jsonify({"data": resp})
 
+@weather_bp.route("/weather-cache/stats", methods=["GET"])
+def get_weather_cache_stats():
+    return jsonify(get_response_cache().stats())
+
+@orchestrator_bp.route("/db-pool/stats", methods=["GET"])
+def get_db_pool_stats():
+    return jsonify(pool_stats())
+
+@weather_bp.route("/forecast_pm25/cache/stats", methods=["GET"])
+def get_forecast_cache_stats():
+    return jsonify(get_forecast_cache().stats())
+
+@metrics_bp.before_app_request
+def start_request_metrics():
+    if METRICS_ENABLED:
+        g.metrics_started = time.perf_counter()
+        begin_request()
+
+@metrics_bp.after_app_request
+def finish_request_metrics(response):
+    """Registra a duração da requisição e devolve as etapas medidas no cabeçalho Server-Timing.
+
+    Respostas em streaming são medidas até o início do envio.
+    """
+    if not METRICS_ENABLED or "metrics_started" not in g:
+        return response
+    elapsed = time.perf_counter() - g.metrics_started
+    endpoint = request.url_rule.rule if request.url_rule is not None else "desconhecido"
+    HTTP_SERVER_SECONDS.observe(elapsed, request.method, endpoint, str(response.status_code))
+    response.headers["Server-Timing"] = server_timing(request_stages(), elapsed)
+    return response
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Métricas desabilitadas (METRICS_ENABLED=false)"}), 404
+    return Response(metrics_registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@weather_bp.route("/forecast_pm25/model", methods=["GET"])
+def get_forecast_model():
+    loaded_model = get_model_registry().get()
+    return jsonify(loaded_model.to_dict())
+
 @orchestrator_bp.route("/orchestrator", methods=["POST"])
 def process_and_save_data():
+    body = request.get_json(silent=True) or {}
+    incremental = bool(body.get("incremental", False))
+    datetime_from = body.get("datetime_from", DEFAULT_DATETIME_FROM)
+    if incremental:
+        # Sem data final explícita, a carga incremental vai até o início do dia atual
+        default_to = format_iso_datetime(datetime.combine(datetime.now(timezone.utc).date(), datetime.min.time()))
+    else:
+        default_to = DEFAULT_DATETIME_TO
+    datetime_to = body.get("datetime_to", default_to)
+
     try:
-        datetime_from = "2024-04-03T00:00:00Z"
-        datetime_to = "2025-04-03T00:00:00Z"
-        
-        orchestrator = get_orchestrator()
-        result = orchestrator.process_and_save_data(datetime_from, datetime_to)
-        return jsonify(result)
-        
+        if parse_iso_datetime(datetime_from) > parse_iso_datetime(datetime_to):
+            return jsonify({"error": "'datetime_from' deve ser anterior a 'datetime_to'"}), 400
+    except (TypeError, ValueError):
+        return jsonify({"error": "Parâmetros 'datetime_from' e 'datetime_to' devem estar no formato ISO 8601"}), 400
+
+    params = {"datetime_from": datetime_from, "datetime_to": datetime_to, "incremental": incremental}
+    try:
+        job = get_job_manager().submit(params)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 429
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    return jsonify({
+        "job_id": job.job_id,
+        "status": job.status,
+        "progress_url": f"/orchestrator/progress/{job.job_id}"
+    }), 202
+
 @orchestrator_bp.route("/orchestrator/progress", methods=["GET"])
 def get_progress():
-    orchestrator = get_orchestrator()
-    return jsonify(orchestrator.get_progress())
+    """Progresso da execução mais recente"""
+    job = get_job_manager().latest()
+    if job is None:
+        return jsonify({"status": "not_started"})
+    return jsonify(job.to_dict())
+
+@orchestrator_bp.route("/orchestrator/progress/<job_id>", methods=["GET"])
+def get_job_progress(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"error": f"Execução {job_id} não encontrada"}), 404
+    return jsonify(job.to_dict())
+
+@orchestrator_bp.route("/orchestrator/jobs", methods=["GET"])
+def list_jobs():
+    limit = request.args.get("limit", default=50, type=int)
+    return jsonify({"jobs": [job.to_dict() for job in get_job_manager().list_jobs(limit)]})
+
+@orchestrator_bp.route("/orchestrator/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id: str):
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Execução {job_id} não encontrada"}), 404
+    if job.finished and job.status != "cancelled":
+        return jsonify({"error": f"Execução {job_id} já finalizada", "status": job.status}), 409
+    return jsonify(job.to_dict()), 202
 
 
 @weather_bp.route("/forecast_pm25", methods=["GET"])
@@ -102,12 +262,38 @@ def forecast_pm25():
     if not city or not date:
         return jsonify({"error": "Parâmetros 'city' e 'date' são obrigatórios"}), 400
 
-    service = WeatherAPI()
-    forecast = service.forecast_pm25(city, date)
+    # a pilha de ML (pandas, scikit-learn) só é importada no primeiro pedido de previsão
+    from infra.forecast import PM25Forecaster
+
+    service = PM25Forecaster()
+    loaded_model = get_model_registry().get()
+    forecast, cache_hit = service.forecast_pm25_cached(city, date, loaded_model)
 
     #if not forecast:
     #    return jsonify({"error": "Não foi possível gerar a previsão de PM2.5"}), 404
 
-    return forecast
+    response = with_model_headers(make_response(forecast), loaded_model)
+    response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+    return response
+
+    #return jsonify({"data": forecast})
+
+
+@weather_bp.route("/forecast_pm25/batch", methods=["GET"])
+def forecast_pm25_batch():
+    """Previsão de várias cidades (`cities=A,B` ou repetido; padrão: todas) por `horizon` dias a partir de `start_date`"""
+    cities = [city.strip() for value in request.args.getlist("cities") for city in value.split(",") if city.strip()]
+    cities = list(dict.fromkeys(cities)) or [remove_accents(city) for city in CHILE_CITIES]
+    try:
+        horizon = int(request.args.get("horizon", FORECAST_BATCH_DEFAULT_HORIZON))
+        start_date = date.fromisoformat(request.args["start_date"]) if request.args.get("start_date") else date.today()
+    except ValueError:
+        return jsonify({"error": "Parâmetros 'horizon' (inteiro) e 'start_date' (YYYY-MM-DD) inválidos"}), 400
+    if not 1 <= horizon <= FORECAST_BATCH_MAX_HORIZON:
+        return jsonify({"error": f"'horizon' deve estar entre 1 e {FORECAST_BATCH_MAX_HORIZON}"}), 400
+
+    from infra.forecast import PM25Forecaster
 
-    #return jsonify({"data": forecast})
\ No newline at end of file
+    loaded_model = get_model_registry().get()
+    forecast = PM25Forecaster().forecast_pm25_batch(cities, start_date, horizon, model=loaded_model.model)
+    return with_model_headers(jsonify(forecast), loaded_model)
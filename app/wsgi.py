@@ -0,0 +1,5 @@
+# app/wsgi.py
+# Ponto de entrada WSGI para servidores de produção (ex.: gunicorn -c app/gunicorn.conf.py wsgi:app)
+from main import create_app
+
+app = create_app()
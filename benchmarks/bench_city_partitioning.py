@@ -0,0 +1,94 @@
+# benchmarks/bench_city_partitioning.py
+"""Compara a conversão de medições em linhas de tbl_measurements, cidade a cidade.
+
+- antigo: para cada cidade, nova varredura da lista inteira, strptime por linha
+  e remove_accents a cada medição;
+- novo: um único MeasurementBatch, particionado por cidade em uma passada (as
+  datas já chegam convertidas nas medições, na leitura da API).
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_city_partitioning.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import unicodedata
+from datetime import date, datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from domain.models import Measurement, MeasurementBatch  # noqa: E402
+from application.services import remove_accents  # noqa: E402
+
+CITIES = ["Santiago", "Puerto Montt", "Puerto Varas", "Valparaíso", "Viña del Mar"]
+
+
+def strip_accents(text: str) -> str:
+    # remove_accents original, sem memoização
+    return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
+
+
+class LegacyMeasurement:
+    # Measurement original: datas como texto ISO
+    def __init__(self, sensor_id, value, datetime_from, datetime_to, city):
+        self.sensor_id = sensor_id
+        self.value = value
+        self.datetime_from = datetime_from
+        self.datetime_to = datetime_to
+        self.city = city
+
+
+def make_measurements(n_rows: int, n_sensors: int, cls=Measurement):
+    days = [f"{date.fromordinal(date(2024, 1, 1).toordinal() + day)}T00:00:00-03:00" for day in range(367)]
+    return [
+        cls(i % n_sensors, float(i % 97), days[i % 366], days[i % 366 + 1], CITIES[(i % n_sensors) % len(CITIES)])
+        for i in range(n_rows)
+    ]
+
+
+def legacy(measurements):
+    rows = {}
+    for city in CITIES:
+        city_measurements = [m for m in measurements if m.city == city]
+        rows[city] = [
+            (m.sensor_id, strip_accents(m.city),
+             datetime.strptime(m.datetime_from, "%Y-%m-%dT%H:%M:%S%z"),
+             datetime.strptime(m.datetime_to, "%Y-%m-%dT%H:%M:%S%z"),
+             m.value)
+            for m in city_measurements
+        ]
+    return rows
+
+
+def partitioned(measurements):
+    parts = MeasurementBatch.from_measurements(measurements).partition_by_city()
+    return {city: batch.to_rows(remove_accents(city)) for city, batch in parts.items()}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sensors", type=int, default=200)
+    args = parser.parse_args()
+
+    legacy_seconds, legacy_rows = timed(legacy, make_measurements(args.rows, args.sensors, LegacyMeasurement))
+    new_seconds, new_rows = timed(partitioned, make_measurements(args.rows, args.sensors))
+
+    assert {city: len(rows) for city, rows in legacy_rows.items()} == {city: len(rows) for city, rows in new_rows.items()}
+    for city in new_rows:
+        old, new = legacy_rows[city][0], new_rows[city][0]
+        assert new[2] == old[2].astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"), "datas divergiram"
+
+    print(f"{'linhas':>9} {'antigo (s)':>11} {'novo (s)':>9} {'speedup':>8}")
+    print(f"{args.rows:>9} {legacy_seconds:>11.2f} {new_seconds:>9.2f} {legacy_seconds / new_seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/bench_concurrent_fetch.py
+"""Compara a busca sequencial e a concorrente de medições contra um servidor OpenAQ local.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_concurrent_fetch.py --latency 0.05 --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from application.services import MeasurementService  # noqa: E402
+from infra.openaq_api import OpenAQApi  # noqa: E402
+from infra.rate_limiter import TokenBucket  # noqa: E402
+from stub_servers import StubOpenAQServer  # noqa: E402
+
+
+def run(n_sensors: int, latency: float, workers: int):
+    # O limitador é aberto aqui para medir apenas o ganho de concorrência
+    unlimited = TokenBucket(rate=1e9, capacity=1e9)
+    timings = {}
+    with StubOpenAQServer(n_sensors, latency=latency) as server:
+        for label, max_workers in (("sequential", 1), ("concurrent", workers)):
+            service = MeasurementService(OpenAQApi(base_url=server.base_url, rate_limiter=unlimited), max_workers=max_workers)
+            start = time.perf_counter()
+            measurements = service.get_measurements_for_all_sensors("2024-01-01T00:00:00Z", "2024-01-31T00:00:00Z")
+            timings[label] = time.perf_counter() - start
+            timings[f"{label}_rows"] = len(measurements)
+            timings[f"{label}_order"] = [m.sensor_id for m in measurements]
+    assert timings["sequential_order"] == timings["concurrent_order"], "ordem dos resultados divergiu"
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05, help="latência simulada por requisição (s)")
+    parser.add_argument("--workers", type=int, default=8, help="limite de concorrência do modo concorrente")
+    parser.add_argument("--sensors", type=int, nargs="+", default=[10, 50, 200])
+    args = parser.parse_args()
+
+    print(f"{'sensores':>9} {'sequencial (s)':>15} {'concorrente (s)':>16} {'speedup':>8}")
+    for n_sensors in args.sensors:
+        timings = run(n_sensors, args.latency, args.workers)
+        speedup = timings["sequential"] / timings["concurrent"]
+        print(f"{n_sensors:>9} {timings['sequential']:>15.2f} {timings['concurrent']:>16.2f} {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
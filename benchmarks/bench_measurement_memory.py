@@ -0,0 +1,101 @@
+# benchmarks/bench_measurement_memory.py
+"""Memória por medição: objeto original, Measurement com __slots__ e MeasurementBatch.
+
+As medições são montadas a partir de respostas sintéticas no formato da OpenAQ
+(/sensors/{id}/measurements/daily), com strings novas em cada resultado, como
+ao interpretar o JSON. tracemalloc mede o que fica alocado após a conversão.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_measurement_memory.py --rows 100000 300000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from domain.models import Measurement, MeasurementBatch  # noqa: E402
+
+CITIES = ["Santiago", "Puerto Montt", "Puerto Varas", "Valparaíso", "Viña del Mar"]
+SENSORS = 200
+
+
+class LegacyMeasurement:
+    # Measurement original: __dict__ por instância e datas como texto ISO
+    def __init__(self, sensor_id, value, datetime_from, datetime_to, city):
+        self.sensor_id = sensor_id
+        self.value = value
+        self.datetime_from = datetime_from
+        self.datetime_to = datetime_to
+        self.city = city
+
+
+def api_pages(n_rows: int, page_size: int = 1000):
+    """Páginas de resultados por sensor; cada string é um objeto novo, como vindo do json.loads"""
+    start = date(2024, 1, 1)
+    for first in range(0, n_rows, page_size):
+        sensor_id = (first // page_size) % SENSORS
+        page = []
+        for index in range(first, min(first + page_size, n_rows)):
+            day = start + timedelta(days=index % 365)
+            page.append({
+                "value": float(index % 97),
+                "period": {
+                    "datetimeFrom": {"local": "".join([day.isoformat(), "T00:00:00-03:00"])},
+                    "datetimeTo": {"local": "".join([(day + timedelta(days=1)).isoformat(), "T00:00:00-03:00"])},
+                },
+            })
+        yield sensor_id, "".join(CITIES[sensor_id % len(CITIES)]), page
+
+
+def legacy(pages):
+    return [
+        LegacyMeasurement(sensor_id, result["value"], result["period"]["datetimeFrom"]["local"],
+                          result["period"]["datetimeTo"]["local"], city)
+        for sensor_id, city, page in pages for result in page
+    ]
+
+
+def slots(pages):
+    return [
+        Measurement(sensor_id, result["value"], result["period"]["datetimeFrom"]["local"],
+                    result["period"]["datetimeTo"]["local"], city)
+        for sensor_id, city, page in pages for result in page
+    ]
+
+
+def batch(pages):
+    return MeasurementBatch.concat([MeasurementBatch.from_api_results(sensor_id, city, page) for sensor_id, city, page in pages])
+
+
+def retained_bytes(func, n_rows: int) -> int:
+    gc.collect()
+    # as páginas entram na medição para contar as strings que a representação mantém vivas
+    tracemalloc.start()
+    pages = list(api_pages(n_rows))
+    result = func(pages)
+    del pages
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 300_000])
+    args = parser.parse_args()
+
+    print(f"{'linhas':>9} {'representação':>14} {'MB':>8} {'bytes/linha':>12}")
+    for n_rows in args.rows:
+        for label, func in (("original", legacy), ("__slots__", slots), ("lote NumPy", batch)):
+            retained = retained_bytes(func, n_rows)
+            print(f"{n_rows:>9} {label:>14} {retained / 2 ** 20:>8.1f} {retained / n_rows:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
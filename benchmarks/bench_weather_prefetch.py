@@ -0,0 +1,70 @@
+# benchmarks/bench_weather_prefetch.py
+"""Compara a busca dia a dia da previsão do tempo (get_future) com get_future_range.
+
+Usa um servidor WeatherAPI local com latência simulada e o cache de respostas
+desligado, para medir apenas as idas e voltas de rede do horizonte de previsão.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_weather_prefetch.py --latency 0.05 --horizons 7 14 30
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from infra.openaq_api import WeatherAPI  # noqa: E402
+from infra.response_cache import NullResponseCache  # noqa: E402
+from stub_servers import StubWeatherServer  # noqa: E402
+
+CITY = "Santiago"
+
+
+def serial(api, days):
+    # get_future imprime a resposta inteira; o texto não interessa aqui
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {day.isoformat(): api.get_future(CITY, day.isoformat()) for day in days}
+
+
+def prefetch(api, days):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return api.get_future_range(CITY, days)
+
+
+def run(server, horizon):
+    api = WeatherAPI(base_url=server.base_url, cache=NullResponseCache())
+    days = [date.today() + timedelta(days=step) for step in range(horizon)]
+    timings = {}
+    results = {}
+    for label, func in (("serial", serial), ("prefetch", prefetch)):
+        requests_before = server.requests
+        start = time.perf_counter()
+        results[label] = func(api, days)
+        timings[label] = time.perf_counter() - start
+        timings[f"{label}_requests"] = server.requests - requests_before
+    assert results["serial"] == results["prefetch"], "previsões divergiram"
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="latência simulada por requisição (s)")
+    parser.add_argument("--horizons", type=int, nargs="+", default=[7, 14, 30])
+    args = parser.parse_args()
+
+    print(f"{'dias':>5} {'dia a dia (s)':>14} {'req':>4} {'prefetch (s)':>13} {'req':>4} {'speedup':>8}")
+    with StubWeatherServer(latency=args.latency) as server:
+        for horizon in args.horizons:
+            timings = run(server, horizon)
+            speedup = timings["serial"] / timings["prefetch"]
+            print(f"{horizon:>5} {timings['serial']:>14.2f} {timings['serial_requests']:>4} "
+                  f"{timings['prefetch']:>13.2f} {timings['prefetch_requests']:>4} {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/pg_fixture.py
+"""Postgres descartável para os benchmarks, com o esquema de docker/postgres/init.sql.
+
+Com BENCH_DATABASE_URL, cria um banco temporário nesse servidor (o usuário
+precisa de CREATE DATABASE). Sem ela, sobe um cluster próprio em um diretório
+temporário com initdb/pg_ctl (do PATH ou de PG_BIN), ouvindo só em socket Unix
+e com fsync desligado. Em ambos os casos tudo é removido na saída.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import psycopg2
+
+INIT_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docker", "postgres", "init.sql")
+
+
+def _with_database(url: str, name: str) -> str:
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(path=f"/{name}"))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ThrowawayPostgres:
+    def __init__(self, url: str = None):
+        self.server_url = url or os.getenv("BENCH_DATABASE_URL")
+        self.name = f"bench_{os.getpid()}_{int(time.time())}"
+        self.url = None
+        self._cluster_dir = None
+
+    @property
+    def sqlalchemy_url(self) -> str:
+        """URL para DATABASE_URL (connection_pool), com o driver psycopg2 explícito"""
+        return self.url.replace("postgresql://", "postgresql+psycopg2://", 1).replace("postgres://", "postgresql+psycopg2://", 1)
+
+    def _binary(self, name: str) -> str:
+        path = shutil.which(name, path=os.getenv("PG_BIN")) or shutil.which(name)
+        if path is None:
+            raise RuntimeError(f"{name} não encontrado: defina BENCH_DATABASE_URL ou PG_BIN com os binários do Postgres")
+        return path
+
+    def _start_cluster(self) -> str:
+        self._cluster_dir = tempfile.mkdtemp(prefix="bench-pg-")
+        data = os.path.join(self._cluster_dir, "data")
+        port = _free_port()
+        # initdb se recusa a rodar como root; nesse caso use BENCH_DATABASE_URL
+        subprocess.run([self._binary("initdb"), "-D", data, "-U", "postgres", "-A", "trust", "--no-sync"],
+                       check=True, capture_output=True)
+        options = f"-k {self._cluster_dir} -p {port} -c listen_addresses='' -c fsync=off -c synchronous_commit=off"
+        subprocess.run([self._binary("pg_ctl"), "-D", data, "-l", os.path.join(self._cluster_dir, "postgres.log"),
+                        "-o", options, "-w", "start"], check=True, capture_output=True)
+        return f"postgresql://postgres@/postgres?host={self._cluster_dir}&port={port}"
+
+    def _stop_cluster(self):
+        if self._cluster_dir is None:
+            return
+        subprocess.run([self._binary("pg_ctl"), "-D", os.path.join(self._cluster_dir, "data"), "-m", "immediate", "stop"],
+                       capture_output=True)
+        shutil.rmtree(self._cluster_dir, ignore_errors=True)
+        self._cluster_dir = None
+
+    @staticmethod
+    def _execute(url: str, sql: str):
+        conn = psycopg2.connect(url)
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        if self.server_url is None:
+            self.server_url = self._start_cluster()
+        try:
+            self._execute(self.server_url, f"CREATE DATABASE {self.name}")
+            self.url = _with_database(self.server_url, self.name)
+            with open(INIT_SQL, encoding="utf-8") as file:
+                self._execute(self.url, file.read())
+        except Exception:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if self.url is not None:
+                # FORCE encerra as conexões que o pool da API ainda mantiver abertas
+                self._execute(self.server_url, f"DROP DATABASE IF EXISTS {self.name} WITH (FORCE)")
+        finally:
+            self._stop_cluster()
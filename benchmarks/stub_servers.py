@@ -0,0 +1,228 @@
+# benchmarks/stub_servers.py
+"""Servidores HTTP locais que imitam o formato das respostas da OpenAQ e da WeatherAPI."""
+import json
+import re
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from zoneinfo import ZoneInfo
+
+# Fuso do horário "local" devolvido pela OpenAQ para as cidades chilenas
+STUB_TIMEZONE = ZoneInfo("America/Santiago")
+
+
+class StubOpenAQServer:
+    """Servidor OpenAQ falso com `n_sensors` sensores de PM2.5 e latência fixa por requisição.
+
+    Cada sensor tem uma medição diária de `start` até `start + days` (o atributo
+    `days` pode crescer para simular dados novos), filtrada por datetime_from e
+    datetime_to como na API real. Os sensores são distribuídos entre `cities`.
+    Com `fail_every=N`, cada N-ésima requisição responde 429 com Retry-After,
+    permitindo exercitar as novas tentativas do cliente HTTP.
+    """
+
+    def __init__(self, n_sensors: int, latency: float = 0.05, days: int = 30, fail_every: int = 0,
+                 cities=("Santiago",), start: date = date(2024, 1, 1)):
+        self.n_sensors = n_sensors
+        self.latency = latency
+        self.days = days
+        self.fail_every = fail_every
+        self.cities = list(cities)
+        self.start = start.toordinal()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v3"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def _page(results, query):
+        limit = int(query.get("limit", ["100"])[0])
+        page = int(query.get("page", ["1"])[0])
+        return {"meta": {"page": page, "limit": limit, "found": len(results)},
+                "results": results[(page - 1) * limit:page * limit]}
+
+    def locations(self, query):
+        return self._page(
+            [
+                {
+                    "id": sensor_id,
+                    "locality": self.cities[(sensor_id - 1) % len(self.cities)],
+                    "country": {"code": "CL"},
+                    "sensors": [{"id": sensor_id, "parameter": {"name": "pm25"}}],
+                }
+                for sensor_id in range(1, self.n_sensors + 1)
+            ],
+            query,
+        )
+
+    @staticmethod
+    def _instant(value: str) -> datetime:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+    @staticmethod
+    def _local_midnight(ordinal: int) -> str:
+        return datetime.combine(date.fromordinal(ordinal), dt_time(), STUB_TIMEZONE).isoformat()
+
+    def measurements(self, sensor_id: int, query):
+        # os períodos começam à meia-noite local (-03:00 ou -04:00, conforme o horário de verão); o filtro compara o início do período
+        lower = self._instant(query["datetime_from"][0]) if "datetime_from" in query else None
+        upper = self._instant(query["datetime_to"][0]) if "datetime_to" in query else None
+        results = []
+        for day in range(self.days):
+            period_from = self._local_midnight(self.start + day)
+            instant = self._instant(period_from)
+            if (lower is not None and instant < lower) or (upper is not None and instant >= upper):
+                continue
+            results.append({
+                "value": float(sensor_id + day),
+                "period": {
+                    "datetimeFrom": {"local": period_from},
+                    "datetimeTo": {"local": self._local_midnight(self.start + day + 1)},
+                },
+            })
+        return self._page(results, query)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    fail = stub.fail_every and stub.requests % stub.fail_every == 0
+                time.sleep(stub.latency)
+                if fail:
+                    self.send_response(429)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                match = re.fullmatch(r"/v3/sensors/(\d+)/measurements/daily", url.path)
+                if url.path == "/v3/locations":
+                    body = stub.locations(query)
+                elif match:
+                    body = stub.measurements(int(match.group(1)), query)
+                else:
+                    self.send_error(404)
+                    return
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class StubWeatherServer:
+    """WeatherAPI falsa: history.json (com dt/end_dt), forecast.json (com days) e future.json
+
+    Com `fail_every=N`, cada N-ésima requisição responde 503 com Retry-After.
+    """
+
+    def __init__(self, latency: float = 0.05, supports_end_dt: bool = True, fail_every: int = 0):
+        self.latency = latency
+        self.supports_end_dt = supports_end_dt
+        self.fail_every = fail_every
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def forecastday(day: date):
+        seed = day.toordinal() % 17
+        return {
+            "date": day.isoformat(),
+            "day": {
+                "avghumidity": 40 + seed,
+                "avgtemp_c": 10.0 + seed / 2,
+                "avgvis_km": 10.0,
+                "maxwind_kph": 5.0 + seed,
+                "totalprecip_mm": 0.1 * (seed % 3),
+            },
+            "hour": [{"pressure_mb": 1010.0 + seed + hour / 24} for hour in range(24)],
+        }
+
+    def days_for(self, path: str, query):
+        start = date.fromisoformat(query.get("dt", [date.today().isoformat()])[0])
+        if path.endswith("/history.json") and self.supports_end_dt and "end_dt" in query:
+            end = date.fromisoformat(query["end_dt"][0])
+        elif path.endswith("/forecast.json") and "days" in query:
+            start = date.today() if "dt" not in query else start
+            end = start + timedelta(days=int(query["days"][0]) - 1)
+        else:
+            end = start
+        return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    fail = stub.fail_every and stub.requests % stub.fail_every == 0
+                time.sleep(stub.latency)
+                if fail:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                url = urlparse(self.path)
+                if not url.path.endswith(("/history.json", "/forecast.json", "/future.json")):
+                    self.send_error(404)
+                    return
+                query = parse_qs(url.query)
+                body = {
+                    "location": {"name": query.get("q", ["Santiago"])[0]},
+                    "forecast": {"forecastday": [stub.forecastday(day) for day in stub.days_for(url.path, query)]},
+                }
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -21,7 +21,8 @@ CREATE TABLE public.tbl_measurements (
 	dt_date_from timestamp NOT NULL,
 	dt_date_to timestamp NOT NULL,
 	qt_pm25 numeric(10, 2) NOT NULL,
-    CONSTRAINT pk_tbl_measurements PRIMARY KEY (id)
+    CONSTRAINT pk_tbl_measurements PRIMARY KEY (id),
+    CONSTRAINT uq_tbl_measurements_sensor_period UNIQUE (id_sensor, dt_date_from, dt_date_to)
 );
 
 CREATE SEQUENCE public.tbl_weather_history_id_seq
@@ -42,5 +43,13 @@ CREATE TABLE public.tbl_weather_history (
 	qt_max_wind_kph numeric(10, 2) NOT NULL,
 	qt_total_precip_mm numeric(10, 2) NOT NULL,
 	qt_pressure_mb numeric(10, 2) NOT NULL,
-    CONSTRAINT pk_tbl_weather_history PRIMARY KEY (id)
-);
\ No newline at end of file
+    CONSTRAINT pk_tbl_weather_history PRIMARY KEY (id),
+    CONSTRAINT uq_tbl_weather_history_city_date UNIQUE (ds_city, dt_date)
+);
+
+-- Migrações já aplicadas sobre este esquema (infra/migrations.py, docker/postgres/migrations)
+CREATE TABLE public.schema_migrations (
+	ds_version varchar(250) NOT NULL,
+	dt_applied timestamp NOT NULL DEFAULT now(),
+    CONSTRAINT pk_schema_migrations PRIMARY KEY (ds_version)
+);
@@ -0,0 +1,27 @@
+-- Índices únicos nas chaves naturais usadas por check_measurement_exists,
+-- check_weather_history_exists e pelos ON CONFLICT das cargas em lote.
+-- Bases criadas antes dessas constraints podem ter duplicatas: mantém a primeira linha.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_tbl_measurements_sensor_period') THEN
+        DELETE FROM public.tbl_measurements a
+        USING public.tbl_measurements b
+        WHERE a.id_sensor = b.id_sensor
+          AND a.dt_date_from = b.dt_date_from
+          AND a.dt_date_to = b.dt_date_to
+          AND a.id > b.id;
+        ALTER TABLE public.tbl_measurements
+            ADD CONSTRAINT uq_tbl_measurements_sensor_period UNIQUE (id_sensor, dt_date_from, dt_date_to);
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_tbl_weather_history_city_date') THEN
+        DELETE FROM public.tbl_weather_history a
+        USING public.tbl_weather_history b
+        WHERE a.ds_city = b.ds_city
+          AND a.dt_date = b.dt_date
+          AND a.id > b.id;
+        ALTER TABLE public.tbl_weather_history
+            ADD CONSTRAINT uq_tbl_weather_history_city_date UNIQUE (ds_city, dt_date);
+    END IF;
+END $$;
@@ -0,0 +1,71 @@
+-- tbl_measurements passa a ser particionada por mês de dt_date_from.
+-- Chaves únicas de tabelas particionadas precisam conter a coluna de partição,
+-- por isso a chave primária vira (id, dt_date_from). Meses sem partição caem
+-- em tbl_measurements_default até fn_ensure_measurement_partitions criá-la.
+
+ALTER TABLE public.tbl_measurements RENAME TO tbl_measurements_old;
+ALTER INDEX IF EXISTS public.pk_tbl_measurements RENAME TO pk_tbl_measurements_old;
+ALTER INDEX IF EXISTS public.uq_tbl_measurements_sensor_period RENAME TO uq_tbl_measurements_sensor_period_old;
+
+CREATE TABLE public.tbl_measurements (
+	id integer NOT NULL DEFAULT nextval('public.tbl_measurements_id_measurements_seq'),
+	id_sensor integer NOT NULL,
+	ds_city varchar(250) NOT NULL,
+	dt_date_from timestamp NOT NULL,
+	dt_date_to timestamp NOT NULL,
+	qt_pm25 numeric(10, 2) NOT NULL,
+    CONSTRAINT pk_tbl_measurements PRIMARY KEY (id, dt_date_from),
+    CONSTRAINT uq_tbl_measurements_sensor_period UNIQUE (id_sensor, dt_date_from, dt_date_to)
+) PARTITION BY RANGE (dt_date_from);
+
+CREATE TABLE public.tbl_measurements_default PARTITION OF public.tbl_measurements DEFAULT;
+
+-- Cria as partições mensais (tbl_measurements_AAAAMM) que faltam entre p_from e p_to.
+-- Linhas do mês que já estiverem na partição padrão são movidas para a nova partição.
+CREATE OR REPLACE FUNCTION public.fn_ensure_measurement_partitions(p_from timestamp, p_to timestamp)
+RETURNS integer AS $$
+DECLARE
+    v_month date := date_trunc('month', p_from)::date;
+    v_next date;
+    v_name text;
+    v_created integer := 0;
+BEGIN
+    WHILE v_month <= p_to LOOP
+        v_next := (v_month + interval '1 month')::date;
+        v_name := 'tbl_measurements_' || to_char(v_month, 'YYYYMM');
+        IF to_regclass('public.' || v_name) IS NULL THEN
+            -- Serializa a criação entre cargas concorrentes e confere de novo
+            PERFORM pg_advisory_xact_lock(hashtext('public.tbl_measurements partitions'));
+            IF to_regclass('public.' || v_name) IS NULL THEN
+                EXECUTE format('CREATE TABLE public.%I (LIKE public.tbl_measurements INCLUDING DEFAULTS)', v_name);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM public.tbl_measurements_default WHERE dt_date_from >= %L AND dt_date_from < %L RETURNING *) '
+                    'INSERT INTO public.%I SELECT * FROM moved',
+                    v_month, v_next, v_name
+                );
+                EXECUTE format(
+                    'ALTER TABLE public.tbl_measurements ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+                    v_name, v_month, v_next
+                );
+                v_created := v_created + 1;
+            END IF;
+        END IF;
+        v_month := v_next;
+    END LOOP;
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partições do período já carregado até três meses à frente
+SELECT public.fn_ensure_measurement_partitions(
+    LEAST(COALESCE(MIN(dt_date_from), now()::timestamp), now()::timestamp),
+    GREATEST(COALESCE(MAX(dt_date_from), now()::timestamp), now()::timestamp + interval '3 months')
+)
+FROM public.tbl_measurements_old;
+
+INSERT INTO public.tbl_measurements (id, id_sensor, ds_city, dt_date_from, dt_date_to, qt_pm25)
+SELECT id, id_sensor, ds_city, dt_date_from, dt_date_to, qt_pm25
+FROM public.tbl_measurements_old
+ON CONFLICT (id_sensor, dt_date_from, dt_date_to) DO NOTHING;
+
+DROP TABLE public.tbl_measurements_old;
@@ -0,0 +1,6 @@
+-- Leituras por cidade e data: a origem das features diárias (get_daily_feature_source)
+-- agrega tbl_measurements por ds_city a partir de uma data; o índice é propagado a
+-- todas as partições mensais, atuais e futuras. Em tbl_weather_history o mesmo
+-- papel é cumprido pela constraint única (ds_city, dt_date).
+CREATE INDEX IF NOT EXISTS ix_tbl_measurements_city_date
+    ON public.tbl_measurements (ds_city, dt_date_from);
@@ -0,0 +1,29 @@
+-- Trechos já ingeridos de cada sensor: todo período com dt_date_from em [dt_from, dt_to)
+-- foi pedido à OpenAQ e gravado (ou a OpenAQ não tinha medição). Cargas com intervalos
+-- escolhidos pelo usuário deixam buracos entre os trechos, que /sensor-data busca na OpenAQ.
+CREATE TABLE IF NOT EXISTS public.tbl_measurement_coverage (
+	id_sensor integer NOT NULL,
+	dt_from timestamp NOT NULL,
+	dt_to timestamp NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_tbl_measurement_coverage_sensor
+    ON public.tbl_measurement_coverage (id_sensor, dt_from);
+
+-- Bases existentes: cada sequência de períodos encerrados sem intervalo entre si vira um trecho
+INSERT INTO public.tbl_measurement_coverage (id_sensor, dt_from, dt_to)
+WITH ordered AS (
+    SELECT id_sensor, dt_date_from, dt_date_to,
+           CASE WHEN dt_date_from <= LAG(dt_date_to) OVER (PARTITION BY id_sensor ORDER BY dt_date_from)
+                THEN 0 ELSE 1 END AS starts_run
+    FROM public.tbl_measurements
+    WHERE dt_date_to <= now() AT TIME ZONE 'UTC'
+), runs AS (
+    SELECT id_sensor, dt_date_from, dt_date_to,
+           SUM(starts_run) OVER (PARTITION BY id_sensor ORDER BY dt_date_from) AS id_run
+    FROM ordered
+)
+SELECT id_sensor, MIN(dt_date_from), MAX(dt_date_to)
+FROM runs
+WHERE NOT EXISTS (SELECT 1 FROM public.tbl_measurement_coverage)
+GROUP BY id_sensor, id_run;
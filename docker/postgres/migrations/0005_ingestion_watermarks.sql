@@ -0,0 +1,8 @@
+-- Marca d'água da ingestão incremental: último período já carregado por sensor/cidade
+CREATE TABLE IF NOT EXISTS public.tbl_ingestion_watermarks (
+	ds_source varchar(50) NOT NULL,
+	ds_key varchar(250) NOT NULL,
+	dt_watermark timestamp NOT NULL,
+	dt_updated timestamp NOT NULL DEFAULT now(),
+    CONSTRAINT pk_tbl_ingestion_watermarks PRIMARY KEY (ds_source, ds_key)
+);
@@ -0,0 +1,11 @@
+-- Execuções assíncronas do orquestrador (POST /orchestrator)
+CREATE TABLE IF NOT EXISTS public.tbl_orchestrator_jobs (
+	id_job varchar(36) NOT NULL,
+	ds_status varchar(20) NOT NULL,
+	js_params jsonb NOT NULL,
+	js_progress jsonb NULL,
+	ds_error text NULL,
+	dt_created timestamp NOT NULL DEFAULT now(),
+	dt_updated timestamp NOT NULL DEFAULT now(),
+    CONSTRAINT pk_tbl_orchestrator_jobs PRIMARY KEY (id_job)
+);
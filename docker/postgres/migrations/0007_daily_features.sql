@@ -0,0 +1,27 @@
+-- Features diárias por cidade usadas por /forecast_pm25 (clima + média diária de PM2.5 + janelas móveis)
+CREATE TABLE IF NOT EXISTS public.tbl_daily_features (
+	ds_city varchar(250) NOT NULL,
+	dt_date date NOT NULL,
+	qt_avg_humidity double precision NOT NULL,
+	qt_avg_temp_c double precision NOT NULL,
+	qt_avg_vis_km double precision NOT NULL,
+	qt_max_wind_kph double precision NOT NULL,
+	qt_total_precip_mm double precision NOT NULL,
+	qt_pressure_mb double precision NOT NULL,
+	qt_pm25 double precision NOT NULL,
+	qt_pm25_ma3 double precision NOT NULL,
+	qt_pm25_ma7 double precision NOT NULL,
+	qt_pm25_ma14 double precision NOT NULL,
+	qt_pm25_ema double precision NOT NULL,
+	qt_pm25_std7 double precision NOT NULL,
+	qt_pm25_trend double precision NOT NULL,
+	dt_updated timestamp NOT NULL DEFAULT now(),
+    CONSTRAINT pk_tbl_daily_features PRIMARY KEY (ds_city, dt_date)
+);
+
+-- Cidades com dados novos desde a última atualização das features (a partir de dt_since)
+CREATE TABLE IF NOT EXISTS public.tbl_daily_features_pending (
+	ds_city varchar(250) NOT NULL,
+	dt_since date NOT NULL,
+    CONSTRAINT pk_tbl_daily_features_pending PRIMARY KEY (ds_city)
+);
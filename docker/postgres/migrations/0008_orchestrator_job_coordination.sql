@@ -0,0 +1,11 @@
+-- Coordenação das execuções do orquestrador entre processos (workers do gunicorn, réplicas):
+-- o processo dono da execução renova dt_heartbeat enquanto ela está na fila ou rodando,
+-- qualquer processo pode pedir o cancelamento por dt_cancel_requested, e execuções cujo
+-- dono parou de renovar são assumidas por outro processo.
+ALTER TABLE public.tbl_orchestrator_jobs
+    ADD COLUMN IF NOT EXISTS ds_owner varchar(250) NULL,
+    ADD COLUMN IF NOT EXISTS dt_heartbeat timestamp NULL,
+    ADD COLUMN IF NOT EXISTS dt_cancel_requested timestamp NULL;
+
+CREATE INDEX IF NOT EXISTS ix_tbl_orchestrator_jobs_status
+    ON public.tbl_orchestrator_jobs (ds_status, dt_created);
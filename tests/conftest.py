@@ -0,0 +1,9 @@
+# tests/conftest.py
+# Os módulos da API são importados a partir de app/ (como em main.py e wsgi.py)
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "app"))
+# benchmarks/ traz o laço antigo de previsão, usado como referência nos testes do forecaster
+sys.path.insert(0, ROOT)
@@ -0,0 +1,84 @@
+# tests/test_forecaster.py
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from benchmarks.bench_recursive_forecast import CITIES, CITY, legacy, make_history, make_models, recursive, weather_for
+from infra.forecaster import RecursiveForecaster, feature_columns, steps_until
+
+# Colunas que o laço antigo e o RecursiveForecaster devem produzir iguais (a EMA mudou de propósito)
+COMPARED = [
+    "qt_avg_humidity", "qt_avg_temp_c", "qt_avg_vis_km", "qt_max_wind_kph", "qt_total_precip_mm", "qt_pressure_mb",
+    "qt_pm25", "ano", "mes", "dia", "qt_pm25_ma3", "qt_pm25_ma7", "qt_pm25_ma14", "qt_pm25_std7", "qt_pm25_trend",
+    "dia_semana", "mes_ano", "estacao", "temp_umidade", "pressao_umidade", "vento_umidade",
+] + [f"ds_city_{city}" for city in CITIES]
+
+@pytest.fixture(scope="module")
+def models():
+    return make_models(feature_columns(CITIES))
+
+@pytest.mark.parametrize("horizon", [1, 6, 7, 14, 40])
+def test_matches_legacy_loop(models, horizon):
+    # O modelo linear ignora a EMA, então as trajetórias antigas e novas não divergem por causa dela
+    _, linear = models
+    history = make_history()
+    old_rows = legacy(linear, history, horizon)
+    new_rows = recursive(linear, history, horizon)
+
+    assert len(new_rows) == len(old_rows) == horizon
+    for old, new in zip(old_rows, new_rows):
+        for column in COMPARED:
+            assert new[column] == pytest.approx(float(old[column]), rel=1e-9, abs=1e-9), column
+
+def test_matches_legacy_loop_with_short_history(models):
+    # Com menos de 7 dias de histórico o desvio padrão fica 0 até a janela encher, como no laço antigo
+    _, linear = models
+    history = make_history(days=3)
+    for old, new in zip(legacy(linear, history, 10), recursive(linear, history, 10)):
+        for column in ("qt_pm25", "qt_pm25_ma3", "qt_pm25_ma7", "qt_pm25_ma14", "qt_pm25_std7"):
+            assert new[column] == pytest.approx(float(old[column]), rel=1e-9, abs=1e-9), column
+
+def test_ema_continues_from_history(models):
+    forest, _ = models
+    history = make_history(days=30)
+    rows = recursive(forest, history, 20)
+    series = pd.Series([row["qt_pm25"] for row in history] + [row["qt_pm25"] for row in rows])
+    expected = series.ewm(span=7, adjust=False).mean().tail(20).tolist()
+    assert [row["qt_pm25_ema"] for row in rows] == pytest.approx(expected, rel=1e-9)
+
+def test_batched_series_match_single_series(models):
+    forest, _ = models
+    history = make_history()
+    last_date = history[-1]["dt_date"]
+    cities = ["Santiago", "Valparaiso", "Puerto Montt"]
+    horizons = [5, 12, 1]
+    weather = [
+        [weather_for(pd.Timestamp(last_date + timedelta(days=step))) for step in range(1, horizon + 1)]
+        for horizon in horizons
+    ]
+    batched = RecursiveForecaster(forest, CITIES).forecast(cities, [history] * len(cities), weather)
+
+    for city, days, trajectory in zip(cities, weather, batched):
+        single = RecursiveForecaster(forest, CITIES).forecast([city], [history], [days])[0]
+        assert len(trajectory) == len(days)
+        assert [row["qt_pm25"] for row in trajectory] == pytest.approx([row["qt_pm25"] for row in single], rel=1e-12)
+        assert trajectory[-1][f"ds_city_{city}"] == 1.0
+
+def test_model_without_feature_names():
+    columns = feature_columns(CITIES)
+    rng = np.random.default_rng(2)
+    model = LinearRegression().fit(rng.random((50, len(columns))), rng.random(50))
+    forecaster = RecursiveForecaster(model, CITIES)
+    forecaster.warm_up()
+    history = make_history()
+    weather = [weather_for(pd.Timestamp(history[-1]["dt_date"] + timedelta(days=1)))]
+    rows = forecaster.forecast([CITY], [history], [weather])[0]
+    assert len(rows) == 1 and np.isfinite(rows[0]["qt_pm25"])
+
+def test_steps_until():
+    assert steps_until(date(2025, 1, 14), date(2025, 1, 14)) == 0
+    assert steps_until(date(2025, 1, 14), date(2025, 1, 10)) == 0
+    assert steps_until(date(2025, 1, 14), date(2025, 2, 1)) == 18
@@ -0,0 +1,73 @@
+# tests/test_models.py
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from domain.models import Measurement, MeasurementBatch, parse_iso_to_utc
+
+def utc(*args) -> np.datetime64:
+    return np.datetime64(datetime(*args), "s")
+
+def api_result(value: float, start: str, end: str) -> dict:
+    return {"value": value, "period": {"datetimeFrom": {"local": start}, "datetimeTo": {"local": end}}}
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-01-01T00:00:00-03:00", utc(2024, 1, 1, 3)),
+    ("2024-06-01T00:00:00-04:00", utc(2024, 6, 1, 4)),
+    ("2024-01-01T00:00:00+05:30", utc(2023, 12, 31, 18, 30)),
+    ("2024-01-01T00:00:00Z", utc(2024, 1, 1)),
+    ("2024-01-01T00:00:00", utc(2024, 1, 1)),
+    ("2024-01-01T00:00:00.500-03:00", utc(2024, 1, 1, 3)),
+    ("2024-01-01T00:00:00.123456Z", utc(2024, 1, 1)),
+])
+def test_parse_iso_to_utc_matches_fromisoformat(value, expected):
+    assert parse_iso_to_utc([value])[0] == expected
+
+def test_parse_iso_to_utc_mixed_formats_in_one_batch():
+    # um único valor fora do formato de 25 caracteres não pode desalinhar os deslocamentos dos demais
+    values = ["2024-01-01T00:00:00-03:00", "2024-01-02T00:00:00Z", "2024-01-03T00:00:00.250-03:00"]
+    assert parse_iso_to_utc(values).tolist() == [datetime(2024, 1, 1, 3), datetime(2024, 1, 2), datetime(2024, 1, 3, 3)]
+
+def test_parse_iso_to_utc_empty():
+    result = parse_iso_to_utc([])
+    assert result.dtype == np.dtype("datetime64[s]") and len(result) == 0
+
+def test_from_api_results_matches_measurements():
+    results = [api_result(10.5, "2024-04-06T00:00:00-03:00", "2024-04-07T00:00:00-04:00"),
+               api_result(12.0, "2024-04-07T00:00:00-04:00", "2024-04-08T00:00:00-04:00")]
+    batch = MeasurementBatch.from_api_results(7, "Santiago", results)
+    expected = MeasurementBatch.from_measurements(
+        Measurement(7, result["value"], result["period"]["datetimeFrom"]["local"], result["period"]["datetimeTo"]["local"], "Santiago")
+        for result in results
+    )
+    assert batch.to_rows("Santiago") == expected.to_rows("Santiago")
+
+def test_to_rows_formats_utc():
+    batch = MeasurementBatch.from_measurements([
+        Measurement(1, 3.25, "2024-01-01T00:00:00-03:00", "2024-01-02T00:00:00-03:00", "Valparaíso")
+    ])
+    assert batch.to_rows("Valparaiso") == [(1, "Valparaiso", "2024-01-01T03:00:00Z", "2024-01-02T03:00:00Z", 3.25)]
+
+def test_partition_by_city_keeps_order_within_city():
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    cities = ["Santiago", "Puerto Montt", "Santiago", "Viña del Mar", "Puerto Montt", "Santiago"]
+    measurements = [
+        Measurement(index, float(index), start + timedelta(days=index), start + timedelta(days=index + 1), city)
+        for index, city in enumerate(cities)
+    ]
+    parts = MeasurementBatch.from_measurements(measurements).partition_by_city()
+
+    assert list(parts) == ["Santiago", "Puerto Montt", "Viña del Mar"]
+    for city, part in parts.items():
+        expected = [m for m in measurements if m.city == city]
+        assert part.sensor_id.tolist() == [m.sensor_id for m in expected]
+        assert part.value.tolist() == [m.value for m in expected]
+        assert part.for_city(city).sensor_id.tolist() == part.sensor_id.tolist()
+
+def test_partition_by_city_after_concat_unifies_city_codes():
+    first = MeasurementBatch.from_api_results(1, "Santiago", [api_result(1.0, "2024-01-01T00:00:00-03:00", "2024-01-02T00:00:00-03:00")])
+    second = MeasurementBatch.from_api_results(2, "Puerto Varas", [api_result(2.0, "2024-01-01T00:00:00-03:00", "2024-01-02T00:00:00-03:00")])
+    third = MeasurementBatch.from_api_results(3, "Santiago", [api_result(3.0, "2024-01-01T00:00:00-03:00", "2024-01-02T00:00:00-03:00")])
+    parts = MeasurementBatch.concat([first, second, third]).partition_by_city()
+    assert {city: part.sensor_id.tolist() for city, part in parts.items()} == {"Santiago": [1, 3], "Puerto Varas": [2]}
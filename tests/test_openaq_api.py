@@ -0,0 +1,98 @@
+# tests/test_openaq_api.py
+import threading
+
+import pytest
+
+import infra.openaq_api as openaq_api
+from infra.openaq_api import OpenAQApi, OpenAQError
+
+class FakeResponse:
+    def __init__(self, status_code: int, results=None):
+        self.status_code = status_code
+        self._results = results or []
+
+    def json(self):
+        return {"results": self._results}
+
+class FakeHttpClient:
+    """Cliente HTTP com respostas por página; registra as páginas pedidas"""
+    def __init__(self, pages, errors=None):
+        self.pages = pages
+        self.errors = errors or {}
+        self.requested = []
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, params=None):
+        page = params["page"]
+        with self.lock:
+            self.requested.append((url, page, params["limit"]))
+        if page in self.errors:
+            return FakeResponse(self.errors[page])
+        return FakeResponse(200, self.pages[page - 1] if page <= len(self.pages) else [])
+
+class FakeRateLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self, tokens: float = 1):
+        self.acquired += 1
+
+def daily(day: int, value: float) -> dict:
+    return {"value": value, "period": {"datetimeFrom": {"local": f"2024-01-{day:02d}T00:00:00-03:00"},
+                                       "datetimeTo": {"local": f"2024-01-{day + 1:02d}T00:00:00-03:00"}}}
+
+def api(pages, errors=None):
+    http = FakeHttpClient(pages, errors)
+    limiter = FakeRateLimiter()
+    return OpenAQApi(base_url="http://openaq.test", rate_limiter=limiter, http_client=http), http, limiter
+
+@pytest.fixture(autouse=True)
+def page_size(monkeypatch):
+    monkeypatch.setattr(openaq_api, "OPENAQ_MEASUREMENTS_PAGE_SIZE", 2)
+    monkeypatch.setattr(openaq_api, "OPENAQ_LOCATIONS_PAGE_SIZE", 2)
+
+def test_measurements_follow_pages_until_short_page():
+    client, http, limiter = api([[daily(1, 1.0), daily(2, 2.0)], [daily(3, 3.0), daily(4, 4.0)], [daily(5, 5.0)]])
+    measurements = client.get_measurements(7, "2024-01-01", "2024-01-06", "Santiago")
+    assert [m.value for m in measurements] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert [page for _, page, _ in http.requested] == [1, 2, 3]
+    assert {limit for _, _, limit in http.requested} == {2}
+    assert http.requested[0][0] == "http://openaq.test/sensors/7/measurements/daily"
+    assert limiter.acquired == 3
+
+def test_full_last_page_ends_on_empty_page():
+    client, http, _ = api([[daily(1, 1.0), daily(2, 2.0)]])
+    batches = list(client.iter_measurement_batches(7, "2024-01-01", "2024-01-03", "Santiago"))
+    # a página vazia que encerra a paginação não vira um lote
+    assert [len(batch) for batch in batches] == [2]
+    assert [page for _, page, _ in http.requested] == [1, 2]
+
+def test_batches_are_yielded_per_page():
+    client, _, _ = api([[daily(1, 1.0), daily(2, 2.0)], [daily(3, 3.0)]])
+    batches = list(client.iter_measurement_batches(7, "2024-01-01", "2024-01-04", "Santiago"))
+    assert [batch.value.tolist() for batch in batches] == [[1.0, 2.0], [3.0]]
+    assert client.get_measurement_batch(7, "2024-01-01", "2024-01-04", "Santiago").value.tolist() == [1.0, 2.0, 3.0]
+
+def test_error_page_raises_after_previous_pages():
+    client, _, _ = api([[daily(1, 1.0), daily(2, 2.0)]], errors={2: 500})
+    iterator = client.iter_measurements(7, "2024-01-01", "2024-01-06", "Santiago")
+    assert [next(iterator).value, next(iterator).value] == [1.0, 2.0]
+    with pytest.raises(OpenAQError):
+        next(iterator)
+
+def test_error_on_first_page_is_not_empty_result():
+    client, _, _ = api([], errors={1: 429})
+    with pytest.raises(OpenAQError):
+        client.get_measurements(7, "2024-01-01", "2024-01-06", "Santiago")
+
+def test_sensors_from_chile_filter_city_and_parameter():
+    def location(city, sensors, country="CL"):
+        return {"country": {"code": country}, "locality": city,
+                "sensors": [{"id": sensor_id, "parameter": {"name": name}} for sensor_id, name in sensors]}
+    pages = [
+        [location("Santiago", [(1, "pm25"), (2, "pm10")]), location("Arica", [(3, "pm25")])],
+        [location("Viña del Mar", [(4, "pm25")])],
+    ]
+    client, http, _ = api(pages)
+    assert client.get_pm25_sensors_from_chile() == [{"id": 1, "city": "Santiago"}, {"id": 4, "city": "Viña del Mar"}]
+    assert http.requested[0][0] == "http://openaq.test/locations"
@@ -0,0 +1,190 @@
+# tests/test_read_through_repository.py
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+import pytest
+
+import infra.read_through_repository as read_through
+from domain.models import Measurement
+from infra.openaq_api import CHILE_TIMEZONE, OpenAQError
+from infra.read_through_repository import ReadThroughMeasurementRepository
+
+SENSOR_ID = 42
+CITY = "Santiago"
+
+def local_midnight(day: datetime) -> datetime:
+    """Início do período diário da OpenAQ (meia-noite local) em UTC sem fuso, como em tbl_measurements"""
+    return day.replace(tzinfo=CHILE_TIMEZONE).astimezone(timezone.utc).replace(tzinfo=None)
+
+def daily_periods(first: datetime, days: int) -> List[Tuple[datetime, datetime]]:
+    starts = [local_midnight(first + timedelta(days=day)) for day in range(days + 1)]
+    return list(zip(starts, starts[1:]))
+
+def value_for(start: datetime) -> float:
+    return float(start.toordinal() % 50)
+
+class FakeUpstream:
+    """OpenAQ com um período por dia local; registra os intervalos pedidos"""
+    def __init__(self, periods, error: Exception = None):
+        self.periods = periods
+        self.error = error
+        self.requests = []
+
+    def iter_measurements(self, sensor_id, datetime_from, datetime_to, city):
+        self.requests.append((datetime_from, datetime_to))
+        if self.error:
+            raise self.error
+        start = read_through._parse_utc(datetime_from)
+        end = read_through._parse_utc(datetime_to)
+        for period_from, period_to in self.periods:
+            # como a OpenAQ, devolve também o período que cruza o início do pedido
+            if period_to > start and period_from < end:
+                yield Measurement(sensor_id, value_for(period_from),
+                                  period_from.replace(tzinfo=timezone.utc).astimezone(CHILE_TIMEZONE),
+                                  period_to.replace(tzinfo=timezone.utc).astimezone(CHILE_TIMEZONE), city)
+
+class FakeDatabase:
+    """Database com tbl_measurement_coverage e tbl_measurements em memória"""
+    coverage: List[Tuple[datetime, datetime]] = []
+    rows: List[tuple] = []
+    calls: List[str] = []
+
+    def get_measurement_coverage(self, id_sensor, dt_from, dt_to):
+        return [(start, end) for start, end in self.coverage if start < dt_to and end > dt_from]
+
+    def get_measurements(self, id_sensor, dt_from, dt_to):
+        self.calls.append("get_measurements")
+        return [row for row in self.rows if dt_from <= row[0] < dt_to]
+
+    def insert_measurements_bulk(self, rows):
+        rows = list(rows)
+        self.calls.append(("insert", len(rows)))
+        return len(rows)
+
+    def get_watermark(self, ds_source, ds_key):
+        return None
+
+    def set_watermark(self, ds_source, ds_key, dt_watermark):
+        self.calls.append(("watermark", dt_watermark))
+
+    def mark_features_pending(self, ds_city, dt_since):
+        self.calls.append(("pending", ds_city))
+
+    def add_measurement_coverage(self, id_sensor, dt_from, dt_to):
+        self.calls.append(("coverage", dt_from, dt_to))
+
+    def commit(self):
+        self.calls.append("commit")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def database(monkeypatch):
+    monkeypatch.setattr(read_through, "Database", FakeDatabase)
+    monkeypatch.setattr(FakeDatabase, "coverage", [])
+    monkeypatch.setattr(FakeDatabase, "rows", [])
+    monkeypatch.setattr(FakeDatabase, "calls", [])
+    return FakeDatabase
+
+# Janela que cruza a mudança de horário do Chile (7/4/2024, -03:00 para -04:00)
+PERIODS = daily_periods(datetime(2024, 4, 1), 12)
+
+def store(database, first: int, last: int):
+    """Grava e registra como cobertos os períodos PERIODS[first:last]"""
+    database.rows.extend((start, end, value_for(start)) for start, end in PERIODS[first:last])
+    database.coverage.append((PERIODS[first][0], PERIODS[last - 1][1]))
+
+def fmt(value: datetime) -> str:
+    return read_through._format_utc(value)
+
+def request(repository, first: int, last: int):
+    return repository.get_measurements(SENSOR_ID, fmt(PERIODS[first][0]), fmt(PERIODS[last - 1][1]), CITY)
+
+def as_tuples(measurements):
+    return [(m.sensor_id, m.value, m.datetime_from, m.datetime_to, m.city) for m in measurements]
+
+def live(first: int, last: int):
+    return list(FakeUpstream(PERIODS).iter_measurements(SENSOR_ID, fmt(PERIODS[first][0]), fmt(PERIODS[last - 1][1]), CITY))
+
+def test_without_coverage_fetches_whole_range(database):
+    upstream = FakeUpstream(PERIODS)
+    result = request(ReadThroughMeasurementRepository(upstream, write_back=False), 0, 12)
+    assert upstream.requests == [(fmt(PERIODS[0][0]), fmt(PERIODS[11][1]))]
+    assert "get_measurements" not in database.calls
+    assert as_tuples(result) == as_tuples(live(0, 12))
+
+def test_fully_covered_range_skips_upstream(database):
+    store(database, 0, 12)
+    upstream = FakeUpstream(PERIODS)
+    result = request(ReadThroughMeasurementRepository(upstream, write_back=False), 0, 12)
+    assert upstream.requests == []
+    # datas do banco voltam ao horário local, com o deslocamento de cada data (-03:00 e depois -04:00)
+    assert as_tuples(result) == as_tuples(live(0, 12))
+    assert {m.datetime_from.utcoffset() for m in result} == {timedelta(hours=-3), timedelta(hours=-4)}
+
+def test_gaps_before_between_and_after_coverage(database):
+    store(database, 2, 4)
+    store(database, 6, 9)
+    upstream = FakeUpstream(PERIODS)
+    result = request(ReadThroughMeasurementRepository(upstream, write_back=False), 0, 12)
+    assert upstream.requests == [
+        (fmt(PERIODS[0][0]), fmt(PERIODS[2][0])),
+        (fmt(PERIODS[4][0]), fmt(PERIODS[6][0])),
+        (fmt(PERIODS[9][0]), fmt(PERIODS[11][1])),
+    ]
+    assert as_tuples(result) == as_tuples(live(0, 12))
+
+def test_coverage_is_clipped_to_request(database):
+    store(database, 0, 12)
+    upstream = FakeUpstream(PERIODS)
+    result = request(ReadThroughMeasurementRepository(upstream, write_back=False), 3, 8)
+    assert upstream.requests == []
+    assert as_tuples(result) == as_tuples(live(3, 8))
+
+def test_request_inside_first_stored_period_skips_leading_gap(database):
+    # Pedido às 00:00Z: o período local começa às 03:00Z, e nenhum outro período cabe nessas 3 horas
+    store(database, 0, 5)
+    upstream = FakeUpstream(PERIODS)
+    start = datetime(2024, 4, 1)
+    result = ReadThroughMeasurementRepository(upstream, write_back=False).get_measurements(
+        SENSOR_ID, fmt(start), fmt(PERIODS[4][1]), CITY)
+    assert upstream.requests == []
+    assert [m.value for m in result] == [value_for(period_from) for period_from, _ in PERIODS[0:5]]
+
+def test_gap_results_are_clipped_to_gap(database):
+    # A OpenAQ devolve o período que cruza o início da lacuna; ele já veio do banco e não pode repetir
+    store(database, 0, 3)
+    upstream = FakeUpstream(PERIODS)
+    result = request(ReadThroughMeasurementRepository(upstream, write_back=False), 0, 6)
+    starts = [m.datetime_from for m in result]
+    assert len(starts) == len(set(starts)) == 6
+
+def test_upstream_error_propagates_without_write_back(database):
+    store(database, 0, 3)
+    upstream = FakeUpstream(PERIODS, error=OpenAQError("Erro na API OpenAQ"))
+    repository = ReadThroughMeasurementRepository(upstream, write_back=True)
+    with pytest.raises(OpenAQError):
+        request(repository, 0, 6)
+    assert not [call for call in database.calls if isinstance(call, tuple)]
+
+def test_write_back_records_fetched_gap(database):
+    store(database, 0, 3)
+    upstream = FakeUpstream(PERIODS)
+    request(ReadThroughMeasurementRepository(upstream, write_back=True), 0, 6)
+    assert ("insert", 3) in database.calls
+    assert ("coverage", PERIODS[3][0], PERIODS[5][1]) in database.calls
+    assert ("watermark", PERIODS[5][0].replace(tzinfo=timezone.utc)) in database.calls
+    assert database.calls[-1] == "commit"
+
+def test_write_back_keeps_watermark_behind_later_gap(database, monkeypatch):
+    # Lacuna que começa depois da marca d'água: avançá-la pularia os dias entre as duas
+    monkeypatch.setattr(FakeDatabase, "get_watermark", lambda self, ds_source, ds_key: PERIODS[0][0])
+    store(database, 0, 3)
+    upstream = FakeUpstream(PERIODS)
+    request(ReadThroughMeasurementRepository(upstream, write_back=True), 0, 6)
+    assert ("insert", 3) in database.calls
+    assert not [call for call in database.calls if call[0] == "watermark"]